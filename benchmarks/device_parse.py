@@ -0,0 +1,102 @@
+"""Measure Device construction from a synthetic /v1/devices payload.
+
+Compares ``Device(**filtered)`` per device (the previous coerce path) with
+:func:`coerce_device_payloads`, and reports the memory held by the resulting
+Device objects.
+
+Usage::
+
+    python benchmarks/device_parse.py --devices 10000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import fields
+
+from pymbrewclient.rest.models import Device, coerce_device_payloads
+
+
+def _payload(count: int) -> list[dict[str, object]]:
+    devices = []
+    for i in range(count):
+        devices.append(
+            {
+                "uuid": f"dev-{i:05d}",
+                "serial_number": f"SER{i:05d}",
+                "current_state": 1,
+                "process_type": 4,
+                "process_state": 80,
+                "user_action": 0,
+                "active_session": 1000 + i,
+                "connection_status": 1,
+                # Real fleets report online times to the second, so many repeat.
+                "last_time_online": f"2026-03-01T12:{i % 60:02d}:00Z",
+                "software_version": "2.1.0",
+                "custom_name": f"Fermenter {i}",
+                "device_type": 1,
+                "image": "https://example.invalid/craft.png",
+                "last_process_state_change": f"2026-03-01T{i % 24:02d}:00:00.123456Z",
+                "process_estimate_remaining": f"2026-03-0{2 + i % 7}T08:00:00Z",
+                "text": "Fermenting",
+                "updating": False,
+                "stage": "fermenting",
+                "beer_name": "Pils",
+                "beer_style": "Lager",
+                "target_temp": 12.0,
+                "current_temp": 12.4,
+                "online": True,
+                "unknown_field": {"nested": True},
+            }
+        )
+    # Round-trip through JSON so every value is a fresh object, as from requests.
+    return json.loads(json.dumps(devices))
+
+
+def legacy_coerce(payloads: list[dict[str, object]]) -> list[Device]:
+    result = []
+    for device in payloads:
+        names = {field.name for field in fields(Device)}
+        result.append(Device(**{key: value for key, value in device.items() if key in names}))
+    return result
+
+
+def _best(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = _payload(args.devices)
+    runs = {
+        "Device(**filtered) per device": lambda: legacy_coerce(payload),
+        "coerce_device_payloads": lambda: coerce_device_payloads(payload),
+    }
+    baseline = None
+    for name, func in runs.items():
+        elapsed = _best(func, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{name:32} {elapsed * 1e3:8.1f} ms  {args.devices / elapsed:>10,.0f} devices/s  {baseline / elapsed:4.1f}x"
+        )
+
+    tracemalloc.start()
+    devices = coerce_device_payloads(payload)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(devices)} devices hold {held / 1e6:.1f} MB ({held / len(devices):,.0f} bytes each, excluding payload)")
+
+
+if __name__ == "__main__":
+    main()
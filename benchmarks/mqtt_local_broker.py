@@ -0,0 +1,78 @@
+"""Measure MqttClient connect time, resubscribe time, and throughput against a LocalBroker.
+
+Usage::
+
+    python benchmarks/mqtt_local_broker.py --devices 100 --messages 50000 --websocket
+"""
+
+import argparse
+import threading
+import time
+
+from pymbrewclient.mqtt import FixedDelay, LocalBroker, MqttClient, SyntheticPublisher
+
+
+def wait_for_all(broker: LocalBroker, devices: list[str]) -> None:
+    for device in devices:
+        broker.wait_for_subscribers(f"devices/logs/{device}", timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--websocket", action="store_true", help="use MQTT-over-WebSocket instead of TCP")
+    args = parser.parse_args()
+
+    devices = [f"bench-{i:05d}" for i in range(args.devices)]
+    with LocalBroker(websocket=args.websocket) as broker:
+        client = MqttClient(
+            api_token="bench",
+            user_uuid="bench",
+            host=broker.host,
+            port=broker.port,
+            transport=broker.transport,
+            tls=False,
+            reconnect_strategy=FixedDelay(0.05),
+        )
+        connected = threading.Event()
+        received = 0
+        done = threading.Event()
+
+        def count(_msg: object) -> None:
+            nonlocal received
+            received += 1
+            if received >= args.messages:
+                done.set()
+
+        client.on_connected(connected.set)
+        client.on_device_log(count)
+        for device in devices:
+            client.subscribe_device_logs(device)
+
+        started = time.perf_counter()
+        client.connect()
+        connected.wait(10)
+        wait_for_all(broker, devices)
+        print(f"connect + subscribe {len(devices)} devices: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        publisher = SyntheticPublisher(broker, devices, rate=None, seed=0)
+        started = time.perf_counter()
+        while publisher.sent < args.messages:
+            publisher.publish_once()
+        done.wait(60)
+        elapsed = time.perf_counter() - started
+        print(f"throughput: {received} messages in {elapsed:.2f} s ({received / elapsed:,.0f} msg/s)")
+
+        connected.clear()
+        started = time.perf_counter()
+        broker.drop_clients()
+        connected.wait(10)
+        wait_for_all(broker, devices)
+        print(f"reconnect + resubscribe: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
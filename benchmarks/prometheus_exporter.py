@@ -0,0 +1,72 @@
+"""Measure PrometheusExporter scrape cost for a fleet, cached and after a single-device update.
+
+Usage::
+
+    python benchmarks/prometheus_exporter.py --devices 500 --scrapes 1000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from pymbrewclient.mqtt import MqttMessage
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.proto import decode_device_log, encode_device_log
+from pymbrewclient.sinks import PrometheusExporter
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _message(device: int, second: int) -> MqttMessage:
+    timestamp = START + timedelta(seconds=second)
+    payload = encode_device_log(
+        sequence_number=second,
+        session_id=device,
+        timestamp_ms=int(timestamp.timestamp() * 1000),
+        current_state=1,
+        process_state=80,
+        current_temperature=18.0 + second % 10,
+        target_temperature=18.0,
+        measurements={sensor: float(second % 50) for sensor in SensorType},
+        seconds_until_next_action=3600 - second,
+    )
+    uuid = f"bench-{device:05d}"
+    return MqttMessage(topic=f"devices/logs/{uuid}", payload=payload, received_at=timestamp, device_uuid=uuid)
+
+
+def _per_scrape(exporter: PrometheusExporter, scrapes: int, before: Callable[[int], None] | None = None) -> float:
+    started = time.perf_counter()
+    for i in range(scrapes):
+        if before is not None:
+            before(i)
+        exporter.render()
+    return (time.perf_counter() - started) / scrapes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--scrapes", type=int, default=1000)
+    args = parser.parse_args()
+
+    exporter = PrometheusExporter()
+    for device in range(args.devices):
+        exporter.update(decode_device_log(_message(device, 0)))
+
+    started = time.perf_counter()
+    text = exporter.render()
+    first = time.perf_counter() - started
+    print(f"{args.devices} devices, {text.count(chr(10))} lines, {len(text):,} bytes")
+    print(f"first render:          {first * 1e3:8.3f} ms")
+
+    cached = _per_scrape(exporter, args.scrapes)
+    print(f"unchanged scrape:      {cached * 1e6:8.1f} us")
+
+    updates = [decode_device_log(_message(i % args.devices, i + 1)) for i in range(args.scrapes)]
+    changed = _per_scrape(exporter, args.scrapes, lambda i: exporter.update(updates[i]))
+    print(f"one device changed:    {changed * 1e6:8.1f} us (incl. update)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Compare cli.serialize_output with the previous isinstance-chain implementation.
+
+Usage::
+
+    python benchmarks/serialize_output.py --devices 10000 --messages 20000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel
+
+from pymbrewclient.cli import serialize_output
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.models import MqttMessage
+from pymbrewclient.mqtt.proto import decode_device_log, encode_device_log
+from pymbrewclient.rest.models import BreweryOverview, Device, datetime_to_api_string
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def legacy_serialize_output(data: object) -> object:
+    """The implementation serialize_output replaced, kept here as the baseline."""
+    if isinstance(data, BaseModel):
+        return legacy_serialize_output(data.dict())
+    if isinstance(data, datetime):
+        return datetime_to_api_string(data)
+    if isinstance(data, bytes):
+        return data.hex()
+    if isinstance(data, Device):
+        return data.to_dict()
+    if is_dataclass(data):
+        return legacy_serialize_output(asdict(data))
+    if isinstance(data, dict):
+        return {key: legacy_serialize_output(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [legacy_serialize_output(item) for item in data]
+    if hasattr(data, "to_dict"):
+        return legacy_serialize_output(data.to_dict())
+    if hasattr(data, "__dict__"):
+        return legacy_serialize_output(vars(data))
+    return data
+
+
+def _devices(count: int) -> list[Device]:
+    return [
+        Device(
+            uuid=f"dev-{i:05d}",
+            serial_number=f"SER{i:05d}",
+            current_state=1,
+            process_type=4,
+            process_state=80,
+            last_time_online="2026-03-01T12:00:00.123456Z",
+            process_estimate_remaining="2026-03-02T12:00:00Z",
+            software_version="2.1.0",
+            stage="fermenting",
+            beer_name="Pils",
+            target_temp=12.0,
+            current_temp=12.4,
+            online=True,
+        )
+        for i in range(count)
+    ]
+
+
+def _messages(count: int) -> list:
+    messages = []
+    for i in range(count):
+        timestamp = START + timedelta(seconds=i)
+        payload = encode_device_log(
+            sequence_number=i,
+            session_id=1,
+            timestamp_ms=int(timestamp.timestamp() * 1000),
+            current_state=1,
+            process_state=80,
+            current_temperature=18.5,
+            target_temperature=18.0,
+            measurements={sensor: 1.0 for sensor in SensorType},
+        )
+        raw = MqttMessage(topic="devices/logs/dev-1", payload=payload, received_at=timestamp, device_uuid="dev-1")
+        messages.append(decode_device_log(raw))
+    return messages
+
+
+def _time(func: Callable[[object], object], data: object, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    devices = _devices(args.devices)
+    quarter = args.devices // 4
+    overview = BreweryOverview(
+        brew_clean_idle=devices[:quarter],
+        fermenting=devices[quarter : 2 * quarter],
+        serving=devices[2 * quarter : 3 * quarter],
+        brew_acid_clean_idle=devices[3 * quarter :],
+    )
+    workloads = {
+        f"{args.devices} devices (list)": devices,
+        f"{args.devices} devices (overview)": overview,
+        f"{args.messages} device-log messages": _messages(args.messages),
+    }
+    for name, data in workloads.items():
+        legacy = _time(legacy_serialize_output, data, args.repeat)
+        current = _time(serialize_output, data, args.repeat)
+        print(f"{name:32} legacy {legacy * 1e3:8.1f} ms   registry {current * 1e3:8.1f} ms   {legacy / current:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure sustained SqliteSink throughput by replaying the captured device-log fixture.
+
+Usage::
+
+    python benchmarks/sqlite_sink.py --rows 200000 --devices 200 --batch-size 500
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from pymbrewclient.mqtt import MqttClient, MqttMessage, MqttRecorder, MqttReplay
+from pymbrewclient.sinks import SqliteSink
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "device_log_envelope.hex"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    payload = bytes.fromhex(FIXTURE.read_text().strip())
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "fixture.pmbr"
+        start = datetime.now(tz=timezone.utc)
+        with MqttRecorder(archive) as recorder:
+            for i in range(args.rows):
+                topic = f"devices/logs/bench-{i % args.devices:05d}"
+                recorder.write(MqttMessage(topic=topic, payload=payload, received_at=start + timedelta(milliseconds=i)))
+
+        # The client is never connected: replay drives its dispatch path directly.
+        client = MqttClient(api_token="bench", user_uuid="bench", track_sequence=False, track_shadow=False)
+
+        with SqliteSink(Path(tmp) / "bench.db", batch_size=args.batch_size, max_queue=args.rows) as sink:
+            sink.attach(client)
+            started = time.perf_counter()
+            replayed = MqttReplay(archive).replay(client)
+            ingest = time.perf_counter() - started
+            sink.flush()
+            total = time.perf_counter() - started
+
+        print(f"replayed {replayed} messages in {ingest:.2f} s ({replayed / ingest:,.0f} msg/s incl. decode)")
+        print(f"committed {sink.written} rows in {total:.2f} s ({sink.written / total:,.0f} rows/s sustained)")
+        print(f"dropped {sink.dropped}")
+
+
+if __name__ == "__main__":
+    main()
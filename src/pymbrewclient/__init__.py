@@ -35,6 +35,7 @@
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
 from .client import BreweryClient, BreweryClientError, DeviceLookupError
+from .fleet import FleetClient, FleetClientError, FleetDevice
 from .mqtt.client import MqttClient
 from .mqtt.enums import (
     ActuatorType,
@@ -48,11 +49,16 @@ from .mqtt.enums import (
 )
 from .mqtt.models import DeviceLogMessage, MqttMessage
 from .rest.models import Device, TokenResponse, ApiResponse, BreweryOverview, Session, DeviceDetails, Beer, UserProfile
+from .scheduler import PollIntervals, PollScheduler, PollTier, RequestBudget
+from .watch import DeviceChange, DeviceChangeKind, DeviceWatcher
 
 __all__ = [
     "BreweryClient",
     "BreweryClientError",
     "DeviceLookupError",
+    "FleetClient",
+    "FleetClientError",
+    "FleetDevice",
     "MqttClient",
     "MqttMessage",
     "DeviceLogMessage",
@@ -72,4 +78,11 @@ __all__ = [
     "DeviceDetails",
     "Beer",
     "UserProfile",
+    "DeviceChange",
+    "DeviceChangeKind",
+    "DeviceWatcher",
+    "PollIntervals",
+    "PollScheduler",
+    "PollTier",
+    "RequestBudget",
 ]
@@ -34,13 +34,16 @@
 # SOFTWARE.
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
-from dataclasses import asdict, is_dataclass
-from datetime import datetime
+from collections.abc import Callable
+from dataclasses import fields, is_dataclass
+from datetime import datetime, timezone
 from importlib.metadata import PackageNotFoundError, version as _pkg_version
 import json
 import logging
+import sys
 import threading
-from typing import Annotated
+import time
+from typing import IO, Annotated, Any
 
 import typer
 from pydantic import BaseModel
@@ -80,29 +83,123 @@ def initialize_brewery_client(base_url: str, username: str, password: str) -> Br
     return BreweryClient(base_url=base_url, username=username, password=password)
 
 
-def serialize_output(data: object) -> object:
-    """Convert output to JSON-serializable primitives."""
-    if isinstance(data, BaseModel):
-        return serialize_output(data.dict())
-    if isinstance(data, datetime):
-        return datetime_to_api_string(data)
-    if isinstance(data, bytes):
-        return data.hex()
-    if isinstance(data, Device):
-        return data.to_dict()
-    if is_dataclass(data):
-        return serialize_output(asdict(data))
-    if isinstance(data, dict):
-        return {key: serialize_output(value) for key, value in data.items()}
-    if isinstance(data, list):
-        return [serialize_output(item) for item in data]
-    if hasattr(data, "to_dict"):
-        return serialize_output(data.to_dict())
+_Serializer = Callable[[Any], object]
+
+_serializers: dict[type, _Serializer] = {}
+
+_PRIMITIVE_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _serialize_dict(data: dict) -> dict:
+    return {key: serialize_output(value) for key, value in data.items()}
+
+
+def _serialize_sequence(data: list | tuple) -> list:
+    if data and type(data[0]) is Device and _serializers.get(Device, Device.to_dict) is Device.to_dict:
+        return _serialize_devices(data)
+    primitive_types = _PRIMITIVE_TYPES
+    return [item if type(item) in primitive_types else serialize_output(item) for item in data]
+
+
+def _serialize_devices(devices: list | tuple) -> list:
+    # Every device's remaining-time estimate is taken against the same instant.
+    now = datetime.now(timezone.utc)
+    return [
+        device.to_dict(current_time=now) if type(device) is Device else serialize_output(device) for device in devices
+    ]
+
+
+def _serialize_via_to_dict(data: Any) -> object:  # noqa: ANN401
+    return serialize_output(data.to_dict())
+
+
+def _serialize_object(data: object) -> object:
     if hasattr(data, "__dict__"):
         return serialize_output(vars(data))
     return data
 
 
+def _identity(data: object) -> object:
+    return data
+
+
+def _dataclass_serializer(cls: type) -> _Serializer:
+    """Return a serializer that reads *cls*'s fields directly instead of via :func:`dataclasses.asdict`."""
+    return _attribute_serializer(tuple(field.name for field in fields(cls)))
+
+
+def _model_serializer(cls: type[BaseModel]) -> _Serializer:
+    """Return a serializer that reads a pydantic model's fields directly instead of via ``.dict()``."""
+    model_fields = getattr(cls, "model_fields", None)  # pydantic 2; 1.x only has __fields__
+    return _attribute_serializer(tuple(model_fields if model_fields is not None else cls.__fields__))
+
+
+def _attribute_serializer(names: tuple[str, ...]) -> _Serializer:
+    primitive_types = _PRIMITIVE_TYPES
+
+    def serialize(data: object) -> dict[str, object]:
+        result = {}
+        for name in names:
+            value = getattr(data, name)
+            result[name] = value if type(value) in primitive_types else serialize_output(value)
+        return result
+
+    return serialize
+
+
+def _build_serializer(cls: type) -> _Serializer:
+    if issubclass(cls, BaseModel):
+        return _model_serializer(cls)
+    if issubclass(cls, datetime):
+        return datetime_to_api_string
+    if issubclass(cls, bytes):
+        return bytes.hex
+    if issubclass(cls, Device):
+        return cls.to_dict
+    if is_dataclass(cls):
+        return _dataclass_serializer(cls)
+    if issubclass(cls, dict):
+        return _serialize_dict
+    if issubclass(cls, (list, tuple)):
+        return _serialize_sequence
+    if issubclass(cls, (str, int, float)):
+        # Includes str/int enums, which serialize as their value.
+        return _identity
+    if hasattr(cls, "to_dict"):
+        return _serialize_via_to_dict
+    return _serialize_object
+
+
+def register_serializer(cls: type, serializer: _Serializer) -> None:
+    """Make :func:`serialize_output` use *serializer* for instances of exactly *cls*.
+
+    *serializer* must return JSON-serializable primitives; call
+    :func:`serialize_output` from it for nested values.
+    """
+    _serializers[cls] = serializer
+
+
+def serialize_output(data: object) -> object:
+    """Convert output to JSON-serializable primitives.
+
+    Dispatches on the exact type of *data*.  The serializer for each class is
+    chosen once, on first use, and cached; dataclasses get one that reads their
+    fields directly, so nested values are converted in a single pass.
+    """
+    serializer = _serializers.get(type(data))
+    if serializer is None:
+        serializer = _serializers[type(data)] = _build_serializer(type(data))
+    return serializer(data)
+
+
+for _cls in _PRIMITIVE_TYPES:
+    register_serializer(_cls, _identity)
+register_serializer(dict, _serialize_dict)
+register_serializer(list, _serialize_sequence)
+register_serializer(datetime, datetime_to_api_string)
+register_serializer(bytes, bytes.hex)
+
+
 def print_output(data: BaseModel | dict | list, format: str) -> None:
     """Print output in the specified format."""
     serialized_data = serialize_output(data)
@@ -113,6 +210,44 @@ def print_output(data: BaseModel | dict | list, format: str) -> None:
         rich_print(Pretty(serialized_data))
 
 
+JSONL_FLUSH_INTERVAL: float = 0.5
+"""Seconds between stdout flushes in ``--format jsonl`` mode."""
+
+
+def _json_default(value: object) -> object:
+    serialized = serialize_output(value)
+    if serialized is value:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return serialized
+
+
+# One line of compact JSON, serializing models the way serialize_output does.
+_compact_json: Callable[[object], str] = json.JSONEncoder(
+    separators=(",", ":"), default=_json_default, check_circular=False
+).encode
+
+
+class _JsonLinesWriter:
+    """Write JSON lines to *stream* without flushing after every line.
+
+    Lines may be written from any thread; call :meth:`flush` periodically and
+    once at the end.
+    """
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, value: object) -> None:
+        line = _compact_json(value) + "\n"
+        with self._lock:
+            self._stream.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._stream.flush()
+
+
 def _enum_name(value: int | None, enum_cls: type) -> str | None:
     """Return enum member name for *value* when it exists, else ``None``."""
     if value is None:
@@ -413,6 +548,20 @@ def process_estimate(
         raise typer.Exit(code=1)
 
 
+def _wait_flushing(stop_event: threading.Event, duration: float | None, writer: _JsonLinesWriter) -> None:
+    """Wait like ``stop_event.wait(duration)``, flushing *writer* every :data:`JSONL_FLUSH_INTERVAL`."""
+    deadline = None if duration is None else time.monotonic() + duration
+    while True:
+        timeout = JSONL_FLUSH_INTERVAL
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+        if stop_event.wait(timeout=timeout):
+            return
+        writer.flush()
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+
+
 @app.command()
 def watch_device_logs(
     username: str = typer.Option(..., "--username", help="The username for authentication."),
@@ -422,7 +571,9 @@ def watch_device_logs(
         list[str],
         typer.Option("--serial", help="Device serial number to watch (can be specified multiple times)."),
     ] = [],
-    output_format: str = typer.Option("pretty", "--format", help="Output format: pretty or json."),
+    output_format: str = typer.Option(
+        "pretty", "--format", help="Output format: pretty, json, or jsonl (one compact JSON object per line)."
+    ),
     duration: int | None = typer.Option(
         None, "--duration", help="Stop automatically after this many seconds (default: run until Ctrl+C)."
     ),
@@ -437,6 +588,11 @@ def watch_device_logs(
         typer.echo("Error: at least one --serial is required.")
         raise typer.Exit(code=1)
 
+    output_format = output_format.lower()
+    # In jsonl mode stdout carries only data lines; status goes to stderr.
+    writer = _JsonLinesWriter(sys.stdout) if output_format == "jsonl" else None
+    status_to_stderr = writer is not None
+
     try:
         client = initialize_brewery_client(base_url, username, password)
         stop_event = threading.Event()
@@ -444,17 +600,20 @@ def watch_device_logs(
         with client.create_mqtt_client() as mqtt:
 
             def on_connected() -> None:
-                typer.echo(f"Connected. Watching: {', '.join(serials)}")
+                typer.echo(f"Connected. Watching: {', '.join(serials)}", err=status_to_stderr)
 
             def on_disconnected() -> None:
-                typer.echo("Disconnected.")
+                typer.echo("Disconnected.", err=status_to_stderr)
 
             def on_error(exc: Exception) -> None:
-                typer.echo(f"MQTT error: {exc}")
+                typer.echo(f"MQTT error: {exc}", err=status_to_stderr)
 
             def on_device_log(msg: DeviceLogMessage) -> None:
                 output = msg if debug else curate_device_log_output(msg)
-                print_output(output, output_format.lower())
+                if writer is not None:
+                    writer.write(output)
+                else:
+                    print_output(output, output_format)
 
             mqtt.on_connected(on_connected)
             mqtt.on_disconnected(on_disconnected)
@@ -465,9 +624,15 @@ def watch_device_logs(
                 mqtt.subscribe_device_logs(serial)
 
             try:
-                stop_event.wait(timeout=duration)
+                if writer is None:
+                    stop_event.wait(timeout=duration)
+                else:
+                    _wait_flushing(stop_event, duration, writer)
             except KeyboardInterrupt:
-                typer.echo("\nStopping...")
+                typer.echo("\nStopping...", err=status_to_stderr)
+            finally:
+                if writer is not None:
+                    writer.flush()
 
     except BreweryClientError as e:
         logger.error(f"Error: {e}")
@@ -34,8 +34,11 @@
 # SOFTWARE.
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+from collections.abc import Callable, Iterable
 from datetime import datetime
 
+import requests
+
 from pymbrewclient.rest.client import RestApiClient
 from pymbrewclient.rest.models import BreweryOverview, Device, Session, TokenResponse, UserProfile
 
@@ -53,15 +56,22 @@ class BreweryClient:
     A client for interacting with the Minibrew Pro Portal API.
     """
 
-    def __init__(self, username: str, password: str, base_url: str = "https://api.minibrew.io") -> None:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str = "https://api.minibrew.io",
+        session: requests.Session | None = None,
+    ) -> None:
         """
         Initialize the client with the base URL and user credentials.
 
         :param base_url: The base URL for the API.
         :param username: The username for authentication.
         :param password: The password for authentication.
+        :param session: Optional :class:`requests.Session` for connection pooling.
         """
-        self.client = RestApiClient(base_url=base_url, username=username, password=password)
+        self.client = RestApiClient(base_url=base_url, username=username, password=password, session=session)
 
     def get_token(self) -> TokenResponse:
         """
@@ -71,6 +81,10 @@ class BreweryClient:
         """
         return self.client._get_token()
 
+    def close(self) -> None:
+        """Close the pooled HTTP session passed to the constructor, if any."""
+        self.client.close()
+
     def get_brewery_overview(self) -> BreweryOverview:
         """
         Fetch and return the brewery overview.
@@ -138,14 +152,21 @@ class BreweryClient:
         """
         return self.client.get_user_profile()
 
-    def create_mqtt_client(self) -> "MqttClient":
+    def create_mqtt_client(
+        self,
+        track_sequence: bool = True,
+        reconnect_strategy: "ReconnectStrategy | None" = None,
+        track_shadow: bool = True,
+    ) -> "MqttClient":
         """
         Create and return a configured MQTT-over-WebSocket client.
 
         The current REST API token is reused as the MQTT password.  A fresh
-        token is obtained if the current one has expired.  A new random
-        ``client_uuid`` is generated for each call, so multiple independent
-        MQTT clients can be created from the same :class:`BreweryClient`.
+        token is obtained if the current one has expired, and again before
+        every automatic reconnect, so long-running clients survive token
+        expiry.  A new random ``client_uuid`` is generated for each call, so
+        multiple independent MQTT clients can be created from the same
+        :class:`BreweryClient`.
 
         .. warning::
 
@@ -153,17 +174,124 @@ class BreweryClient:
             returned :class:`~pymbrewclient.mqtt.MqttClient` instance in
             contexts that would reveal sensitive credentials.
 
+        :param track_sequence: Drop duplicate redeliveries and report sequence
+            gaps; see :class:`~pymbrewclient.mqtt.MqttClient`.
+        :param reconnect_strategy: Optional
+            :class:`~pymbrewclient.mqtt.reconnect.ReconnectStrategy`; defaults
+            to a fixed delay.
+        :param track_shadow: Keep the client's device shadow up to date.
+            Turn it off when every device-log subscriber uses a delivery
+            policy, so messages the policies drop are never decoded.
         :return: A ready-to-connect :class:`~pymbrewclient.mqtt.MqttClient`.
         """
-        from pymbrewclient.mqtt.client import MqttClient
+        self.client._ensure_token()
+        profile = self.get_user_profile()
+        return self._build_mqtt_client(profile.uuid, track_sequence, reconnect_strategy, track_shadow)
+
+    def create_mqtt_pool(
+        self,
+        shards: int = 2,
+        track_sequence: bool = True,
+        reconnect_strategy: "ReconnectStrategy | None" = None,
+        track_shadow: bool = True,
+    ) -> "MqttClientPool":
+        """
+        Create a pool of MQTT connections that shards device subscriptions.
+
+        Each shard is an independent :class:`~pymbrewclient.mqtt.MqttClient`
+        with its own ``client_id``; see
+        :class:`~pymbrewclient.mqtt.pool.MqttClientPool`.  The user profile is
+        fetched once and shared by all shards.
+
+        :param shards: Initial number of connections.
+        :param track_sequence: Passed to every shard.
+        :param reconnect_strategy: Passed to every shard.  Strategies are
+            stateless, so one jittered backoff can serve the whole pool.
+        :param track_shadow: Passed to every shard.
+        :return: A ready-to-connect :class:`~pymbrewclient.mqtt.pool.MqttClientPool`.
+        """
+        from pymbrewclient.mqtt.pool import MqttClientPool
 
         self.client._ensure_token()
         profile = self.get_user_profile()
-        return MqttClient(api_token=self.client.token, user_uuid=profile.uuid)
+        return MqttClientPool(
+            lambda: self._build_mqtt_client(profile.uuid, track_sequence, reconnect_strategy, track_shadow),
+            shards=shards,
+        )
+
+    def watch_devices(
+        self,
+        callback: "Callable[[DeviceChange], None] | None" = None,
+        interval: float = 30.0,
+        fields: "Iterable[str] | None" = None,
+    ) -> "DeviceWatcher":
+        """
+        Create a watcher that polls the device list and emits per-device changes.
+
+        The watcher is not started; use it as a context manager or call
+        :meth:`~pymbrewclient.watch.DeviceWatcher.start`.
+
+        :param callback: Optional callback for every
+            :class:`~pymbrewclient.watch.DeviceChange`.
+        :param interval: Seconds between refreshes.
+        :param fields: Device fields to compare; defaults to
+            :data:`~pymbrewclient.watch.WATCHED_FIELDS`, every field except
+            the ``last_time_online`` heartbeat.
+        :return: A :class:`~pymbrewclient.watch.DeviceWatcher`.
+        """
+        from pymbrewclient.watch import DeviceWatcher
+
+        watcher = DeviceWatcher(self, interval=interval, fields=fields)
+        if callback is not None:
+            watcher.on_change(callback)
+        return watcher
+
+    def create_poll_scheduler(
+        self,
+        intervals: "PollIntervals | None" = None,
+        budget: "RequestBudget | None" = None,
+    ) -> "PollScheduler":
+        """
+        Create a scheduler that polls devices, the overview, and active sessions adaptively.
+
+        Devices that are mashing or boiling are polled more often than idle
+        or serving ones, offline devices back off, and *budget* caps the
+        total request rate; see :class:`~pymbrewclient.scheduler.PollScheduler`.
+        The scheduler is not started.
+
+        :param intervals: Optional :class:`~pymbrewclient.scheduler.PollIntervals`.
+        :param budget: Optional :class:`~pymbrewclient.scheduler.RequestBudget`.
+        :return: A :class:`~pymbrewclient.scheduler.PollScheduler`.
+        """
+        from pymbrewclient.scheduler import PollScheduler
+
+        return PollScheduler(self, intervals=intervals, budget=budget)
+
+    def _build_mqtt_client(
+        self,
+        user_uuid: str,
+        track_sequence: bool,
+        reconnect_strategy: "ReconnectStrategy | None",
+        track_shadow: bool = True,
+    ) -> "MqttClient":
+        from pymbrewclient.mqtt.client import MqttClient
+
+        return MqttClient(
+            api_token=self.client.token,
+            user_uuid=user_uuid,
+            track_sequence=track_sequence,
+            reconnect_strategy=reconnect_strategy,
+            track_shadow=track_shadow,
+            credential_provider=self.client.get_valid_token,
+        )
 
 
-# Local alias for the forward reference in create_mqtt_client's type hint
+# Local aliases for the forward references in the type hints above
 try:
     from pymbrewclient.mqtt.client import MqttClient  # noqa: E402, F401
+    from pymbrewclient.mqtt.pool import MqttClientPool  # noqa: E402, F401
+    from pymbrewclient.mqtt.reconnect import ReconnectStrategy  # noqa: E402, F401
+    from pymbrewclient.scheduler import PollIntervals, PollScheduler, RequestBudget  # noqa: E402, F401
+    from pymbrewclient.watch import DeviceChange, DeviceWatcher  # noqa: E402, F401
 except ImportError:
     pass
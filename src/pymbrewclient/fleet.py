@@ -0,0 +1,369 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Fleet-level access to breweries spread over several MiniBrew accounts.
+
+:class:`FleetClient` owns one :class:`~pymbrewclient.client.BreweryClient` per
+account, each with its own token and pooled HTTP session, and runs per-account
+requests concurrently, so an all-accounts refresh takes about as long as the
+slowest account rather than the sum of all of them.
+"""
+
+import logging
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import TracebackType
+from typing import TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pymbrewclient.client import BreweryClient, BreweryClientError, DeviceLookupError
+from pymbrewclient.mqtt.client import MqttClient
+from pymbrewclient.mqtt.pool import MqttFanIn
+from pymbrewclient.rest.models import BreweryOverview, Device
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_BASE_URL = "https://api.minibrew.io"
+POOL_MAXSIZE: int = 4
+"""Pooled HTTP connections kept per account."""
+
+
+class FleetClientError(BreweryClientError):
+    """Raised when one or more accounts fail during a fleet-wide request.
+
+    Results from the accounts that succeeded are still available.
+    """
+
+    def __init__(self, errors: dict[str, Exception], results: dict[str, object]) -> None:
+        self.errors = errors
+        self.results = results
+        accounts = ", ".join(sorted(errors))
+        super().__init__(f"Request failed for account(s): {accounts}")
+
+
+@dataclass(frozen=True)
+class FleetDevice:
+    """A device together with the account it belongs to."""
+
+    account: str
+    device: Device
+
+
+def _pooled_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class FleetClient:
+    """A client for breweries managed under several MiniBrew accounts.
+
+    Example::
+
+        fleet = FleetClient({
+            "brewpub": ("pub@example.com", "secret-1"),
+            "taproom": ("tap@example.com", "secret-2"),
+        })
+        overviews = fleet.get_brewery_overviews()   # fetched concurrently
+        located = fleet.find_device("7391Q4827-5NZC8R2M")
+        print(located.account, located.device.stage)
+
+    :param accounts: Map of account name to ``(username, password)``.
+    :param base_url: The base URL for the API.
+    :param max_workers: Maximum concurrent per-account requests; defaults to
+        one per account.
+    """
+
+    def __init__(
+        self,
+        accounts: Mapping[str, tuple[str, str]],
+        base_url: str = DEFAULT_BASE_URL,
+        max_workers: int | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self._clients: dict[str, BreweryClient] = {}
+        self._index: dict[str, FleetDevice] = {}
+        self._indexed: set[str] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_workers = 0
+        self._lock = threading.Lock()
+        for name, (username, password) in accounts.items():
+            self.add_account(name, username, password)
+
+    # ------------------------------------------------------------------
+    # Accounts
+    # ------------------------------------------------------------------
+
+    def add_account(self, name: str, username: str, password: str) -> BreweryClient:
+        """Add an account with its own token and pooled HTTP session.
+
+        :raises BreweryClientError: If *name* is already registered.
+        """
+        with self._lock:
+            if name in self._clients:
+                raise BreweryClientError(f"Account '{name}' is already registered.")
+            client = BreweryClient(
+                username=username, password=password, base_url=self.base_url, session=_pooled_session()
+            )
+            self._clients[name] = client
+            self._resize_executor()
+        return client
+
+    def remove_account(self, name: str) -> None:
+        """Remove an account and forget its devices."""
+        with self._lock:
+            client = self._clients.pop(name, None)
+            self._index = {uuid: entry for uuid, entry in self._index.items() if entry.account != name}
+            self._indexed.discard(name)
+        if client is not None:
+            client.close()
+
+    @property
+    def accounts(self) -> dict[str, BreweryClient]:
+        """Map of account name to its :class:`BreweryClient`."""
+        with self._lock:
+            return dict(self._clients)
+
+    def _resize_executor(self) -> None:
+        """Drop the worker pool if it has too few workers for one per account.  Caller holds the lock."""
+        if self._executor is not None and self.max_workers is None and self._executor_workers < len(self._clients):
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor_workers = self.max_workers or max(len(self._clients), 1)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._executor_workers, thread_name_prefix="pymbrewclient-fleet"
+                )
+            return self._executor
+
+    def _map(self, fn: Callable[[BreweryClient], T], accounts: Iterable[str] | None = None) -> dict[str, T]:
+        """Run *fn* for every account, or just *accounts*, concurrently.
+
+        The worker threads are reused across calls until :meth:`close`.
+
+        :raises FleetClientError: If any account fails; successful results are
+            attached to the exception.
+        """
+        clients = self.accounts
+        if accounts is not None:
+            clients = {name: clients[name] for name in accounts if name in clients}
+        if not clients:
+            return {}
+        results: dict[str, T] = {}
+        errors: dict[str, Exception] = {}
+        executor = self._get_executor()
+        futures = {name: executor.submit(fn, client) for name, client in clients.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Fleet request failed for account %s: %s", name, exc)
+                errors[name] = exc
+        if errors:
+            raise FleetClientError(errors, results)
+        return results
+
+    # ------------------------------------------------------------------
+    # REST
+    # ------------------------------------------------------------------
+
+    def get_devices(self, accounts: Iterable[str] | None = None) -> dict[str, list[Device]]:
+        """Fetch every account's device list concurrently and refresh the device index.
+
+        :param accounts: Only fetch these accounts; the index keeps the others.
+        :return: Map of account name to its devices.
+        """
+        try:
+            devices = self._map(lambda client: client.get_devices(), accounts)
+        except FleetClientError as exc:
+            self._update_index(exc.results)
+            raise
+        self._update_index(devices)
+        return devices
+
+    def get_brewery_overviews(self) -> dict[str, BreweryOverview]:
+        """Fetch every account's brewery overview concurrently.
+
+        :return: Map of account name to its :class:`BreweryOverview`.
+        """
+        return self._map(lambda client: client.get_brewery_overview())
+
+    def _update_index(self, devices: Mapping[str, list[Device]]) -> None:
+        with self._lock:
+            index = {uuid: entry for uuid, entry in self._index.items() if entry.account not in devices}
+            for account, account_devices in devices.items():
+                for device in account_devices:
+                    index[device.uuid] = FleetDevice(account=account, device=device)
+            self._index = index
+            self._indexed.update(account for account in devices if account in self._clients)
+
+    @property
+    def device_index(self) -> dict[str, FleetDevice]:
+        """Devices of all accounts keyed by UUID, as of the last :meth:`get_devices`."""
+        return dict(self._index)
+
+    def find_device(self, device_uuid: str) -> FleetDevice:
+        """Return the device and owning account for *device_uuid*.
+
+        If the device is unknown, only the accounts whose devices have not
+        been listed yet (or whose last listing failed) are fetched.  Call
+        :meth:`get_devices` to pick up devices added to an indexed account.
+
+        :raises DeviceLookupError: If no account has the device.
+        """
+        entry = self._index.get(device_uuid)
+        if entry is None:
+            with self._lock:
+                missing = [name for name in self._clients if name not in self._indexed]
+            if missing:
+                try:
+                    self.get_devices(missing)
+                except FleetClientError:
+                    pass
+                entry = self._index.get(device_uuid)
+        if entry is None:
+            raise DeviceLookupError(f"No device found for UUID '{device_uuid}' in any account.")
+        return entry
+
+    # ------------------------------------------------------------------
+    # MQTT
+    # ------------------------------------------------------------------
+
+    def create_mqtt_client(self, track_shadow: bool = True) -> "FleetMqttClient":
+        """Create one MQTT connection per account behind a single interface.
+
+        Connections are set up concurrently.  See :class:`FleetMqttClient`.
+
+        :param track_shadow: Passed to every connection; see
+            :meth:`BreweryClient.create_mqtt_client`.
+        :raises FleetClientError: If any account fails; the connections already
+            created for the other accounts are disconnected first.
+        """
+        try:
+            clients = self._map(lambda client: client.create_mqtt_client(track_shadow=track_shadow))
+        except FleetClientError as exc:
+            for mqtt in exc.results.values():
+                mqtt.disconnect()
+            raise
+        return FleetMqttClient(self, clients)
+
+    def close(self) -> None:
+        """Close every account's pooled HTTP session and the worker threads."""
+        for name in list(self.accounts):
+            self.remove_account(name)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __repr__(self) -> str:
+        return f"FleetClient(accounts={sorted(self._clients)!r}, devices={len(self._index)})"
+
+
+class FleetMqttClient(MqttFanIn):
+    """MQTT connections for every account of a :class:`FleetClient`.
+
+    Device subscriptions are routed to the connection of the account that owns
+    the device; callbacks and queues receive messages from all accounts.
+
+    Do not instantiate directly; use :meth:`FleetClient.create_mqtt_client`.
+    """
+
+    def __init__(self, fleet: FleetClient, clients: dict[str, MqttClient]) -> None:
+        super().__init__()
+        self._fleet = fleet
+        self._clients = clients
+        for client in clients.values():
+            self._attach(client)
+
+    @property
+    def clients(self) -> dict[str, MqttClient]:
+        """Map of account name to its :class:`MqttClient`."""
+        return dict(self._clients)
+
+    def subscribe_device_logs(self, device_uuid: str, qos: int = 0) -> None:
+        """Subscribe to a device's telemetry on its account's connection.
+
+        :raises DeviceLookupError: If no account has the device.
+        """
+        account = self._fleet.find_device(device_uuid).account
+        self._clients[account].subscribe_device_logs(device_uuid, qos=qos)
+
+    def unsubscribe_device_logs(self, device_uuid: str) -> None:
+        """Unsubscribe from a device's telemetry."""
+        topic = MqttClient.device_log_topic(device_uuid)
+        for client in self._clients.values():
+            if client.is_subscribed(topic):
+                client.unsubscribe_device_logs(device_uuid)
+
+    def connect(self) -> None:
+        """Connect every account's client."""
+        for client in self._clients.values():
+            client.connect()
+
+    def disconnect(self) -> None:
+        """Disconnect every account's client."""
+        for client in self._clients.values():
+            client.disconnect()
+        self._close_policies()
+
+    def __enter__(self) -> "FleetMqttClient":
+        self.connect()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.disconnect()
+
+    def __repr__(self) -> str:
+        return f"FleetMqttClient(accounts={sorted(self._clients)!r})"
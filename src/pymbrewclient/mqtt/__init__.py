@@ -34,7 +34,9 @@
 # SOFTWARE.
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+from .broker import LocalBroker, SyntheticPublisher
 from .client import MqttClient
+from .delivery import Conflate, DeliveryPolicy, RateLimit, Sample
 from .enums import (
     ActuatorType,
     ErrorType,
@@ -45,12 +47,60 @@ from .enums import (
     ProcessType,
     SensorType,
 )
+from .filters import AllOf, AnyOf, FieldChanged, MessageFilter, Not, Predicate, Threshold
+from .hooks import CallbackStats, CallbackTimer, DispatchHook, SlowCallbackLogger
+from .metrics import MetricsServer, MetricsSnapshot, MqttMetrics
 from .models import DeviceLogMessage, MqttMessage
+from .pool import HashRing, MqttClientPool
+from .reconnect import ConnectAttempt, ExponentialBackoff, FixedDelay, ReconnectStrategy
+from .recording import MqttRecorder, MqttReplay
+from .rollup import RollupEngine, RollupWindow
+from .sequence import SequenceEvent, SequenceEventKind, SequenceStats, SequenceTracker
+from .shadow import DeviceShadow, DeviceShadowStore
+from .timeseries import RingBuffer, TimeSeriesStore
 
 __all__ = [
     "MqttClient",
     "MqttMessage",
+    "MqttMetrics",
+    "MetricsServer",
+    "MetricsSnapshot",
     "DeviceLogMessage",
+    "DeviceShadow",
+    "DeviceShadowStore",
+    "RingBuffer",
+    "TimeSeriesStore",
+    "RollupEngine",
+    "RollupWindow",
+    "Conflate",
+    "DeliveryPolicy",
+    "RateLimit",
+    "Sample",
+    "AllOf",
+    "AnyOf",
+    "FieldChanged",
+    "MessageFilter",
+    "Not",
+    "Predicate",
+    "Threshold",
+    "CallbackStats",
+    "CallbackTimer",
+    "DispatchHook",
+    "SlowCallbackLogger",
+    "ConnectAttempt",
+    "HashRing",
+    "LocalBroker",
+    "MqttClientPool",
+    "MqttRecorder",
+    "MqttReplay",
+    "ExponentialBackoff",
+    "FixedDelay",
+    "ReconnectStrategy",
+    "SyntheticPublisher",
+    "SequenceEvent",
+    "SequenceEventKind",
+    "SequenceStats",
+    "SequenceTracker",
     "MachineType",
     "MachineConnectionStatus",
     "SensorType",
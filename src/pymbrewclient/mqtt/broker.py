@@ -0,0 +1,572 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+A minimal in-process MQTT broker stand-in for integration and load tests.
+
+:class:`LocalBroker` speaks just enough MQTT 3.1.1 for :class:`~pymbrewclient.mqtt.client.MqttClient`:
+CONNECT, SUBSCRIBE, UNSUBSCRIBE, PINGREQ, QoS 0/1 PUBLISH, and DISCONNECT,
+over plain TCP or MQTT-over-WebSocket.  There is no TLS, persistence, or
+retained-message support.  :class:`SyntheticPublisher` feeds it generated
+device-log envelopes at a controlled rate.
+
+Example::
+
+    with LocalBroker(websocket=True) as broker:
+        mqtt = MqttClient(api_token="t", user_uuid="u", host=broker.host, port=broker.port, tls=False)
+        mqtt.connect()
+        mqtt.subscribe_device_logs("dev-1")
+        broker.wait_for_subscribers("devices/logs/dev-1")
+        SyntheticPublisher(broker, ["dev-1"]).publish_once()
+"""
+
+import base64
+import hashlib
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+from collections.abc import Sequence
+from types import TracebackType
+
+from .client import WS_PATH
+from .enums import SensorType
+from .proto import encode_device_log
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_OP_CONTINUATION = 0x0
+_WS_OP_BINARY = 0x2
+_WS_OP_CLOSE = 0x8
+_WS_OP_PING = 0x9
+_WS_OP_PONG = 0xA
+
+_CONNECT = 1
+_PUBLISH = 3
+_SUBSCRIBE = 8
+_UNSUBSCRIBE = 10
+_PINGREQ = 12
+_DISCONNECT = 14
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Return ``True`` if *topic* matches *topic_filter* (``+`` and ``#`` wildcards)."""
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels) or (level != "+" and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def _encode_remaining_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, length = length & 0x7F, length >> 7
+        out.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(out)
+
+
+def _encode_string(value: bytes) -> bytes:
+    return struct.pack("!H", len(value)) + value
+
+
+class _Session:
+    """One connected client: reads packets on its own thread."""
+
+    def __init__(self, broker: "LocalBroker", sock: socket.socket) -> None:
+        self._broker = broker
+        self._sock = sock
+        self._websocket = broker.websocket
+        self._buffer = bytearray()
+        self._send_lock = threading.Lock()
+        self.subscriptions: set[str] = set()
+        self.client_id: str | None = None
+        self.username: str | None = None
+
+    # -- transport -------------------------------------------------------
+
+    def _recv_raw(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_frame(self) -> bytes:
+        """Return the next WebSocket data frame's payload, answering control frames."""
+        while True:
+            first, second = self._recv_raw(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", self._recv_raw(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", self._recv_raw(8))
+            mask = self._recv_raw(4) if second & 0x80 else b""
+            payload = self._recv_raw(length)
+            if mask:
+                key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+                payload = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+            if opcode == _WS_OP_CLOSE:
+                raise ConnectionError("client sent a WebSocket close frame")
+            if opcode == _WS_OP_PING:
+                self._send_frame(_WS_OP_PONG, payload)
+            elif opcode in (_WS_OP_BINARY, _WS_OP_CONTINUATION):
+                return payload
+
+    def _read(self, size: int) -> bytes:
+        if not self._websocket:
+            return self._recv_raw(size)
+        while len(self._buffer) < size:
+            self._buffer += self._read_frame()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self._sock.sendall(header + payload)
+
+    def send(self, packet: bytes) -> None:
+        with self._send_lock:
+            if self._websocket:
+                self._send_frame(_WS_OP_BINARY, packet)
+            else:
+                self._sock.sendall(packet)
+
+    def _handshake(self) -> None:
+        request = bytearray()
+        while b"\r\n\r\n" not in request:
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("client closed the connection during the WebSocket handshake")
+            request += chunk
+        head, _, rest = bytes(request).partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        path = lines[0].split(" ")[1] if len(lines[0].split(" ")) > 1 else ""
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if path != self._broker.ws_path or key is None:
+            self._sock.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            raise ConnectionError(f"unexpected WebSocket request for {path!r}")
+        accept = base64.b64encode(hashlib.sha1(key.encode("ascii") + _WS_GUID).digest()).decode("ascii")
+        self._sock.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n"
+                "Sec-WebSocket-Protocol: mqtt\r\n\r\n"
+            ).encode("ascii")
+        )
+        self._buffer += rest
+
+    # -- MQTT ------------------------------------------------------------
+
+    def _read_packet(self) -> tuple[int, int, bytes]:
+        (first,) = self._read(1)
+        length = 0
+        for shift in range(0, 28, 7):
+            (byte,) = self._read(1)
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+        else:
+            raise ConnectionError("malformed remaining length")
+        return first >> 4, first & 0x0F, self._read(length)
+
+    def run(self) -> None:
+        try:
+            if self._websocket:
+                self._handshake()
+            while True:
+                packet_type, flags, body = self._read_packet()
+                if not self._dispatch(packet_type, flags, body):
+                    return
+        except (ConnectionError, OSError, struct.error, IndexError) as exc:
+            logger.debug("Local broker session %s ended: %s", self.client_id, exc)
+        finally:
+            self._broker._remove_session(self)
+            self.close()
+
+    def _dispatch(self, packet_type: int, flags: int, body: bytes) -> bool:
+        if packet_type == _CONNECT:
+            return self._on_connect(body)
+        if packet_type == _PUBLISH:
+            self._on_publish(flags, body)
+        elif packet_type == _SUBSCRIBE:
+            self._on_subscribe(body)
+        elif packet_type == _UNSUBSCRIBE:
+            self._on_unsubscribe(body)
+        elif packet_type == _PINGREQ:
+            self.send(b"\xd0\x00")
+        elif packet_type == _DISCONNECT:
+            return False
+        return True
+
+    def _on_connect(self, body: bytes) -> bool:
+        pos = 2 + struct.unpack_from("!H", body)[0]  # protocol name
+        connect_flags = body[pos + 1]
+        pos += 4  # level, flags, keepalive
+
+        def field() -> bytes:
+            nonlocal pos
+            (size,) = struct.unpack_from("!H", body, pos)
+            value = body[pos + 2 : pos + 2 + size]
+            pos += 2 + size
+            return value
+
+        self.client_id = field().decode("utf-8")
+        if connect_flags & 0x04:  # will topic and message
+            field()
+            field()
+        self.username = field().decode("utf-8") if connect_flags & 0x80 else None
+        password = field().decode("utf-8") if connect_flags & 0x40 else None
+
+        expected = self._broker.password
+        if expected is not None and password != expected:
+            self.send(b"\x20\x02\x00\x04")  # bad user name or password
+            return False
+        self.send(b"\x20\x02\x00\x00")
+        self._broker._add_session(self)
+        return True
+
+    def _on_publish(self, flags: int, body: bytes) -> None:
+        (size,) = struct.unpack_from("!H", body)
+        topic = body[2 : 2 + size].decode("utf-8")
+        pos = 2 + size
+        qos = (flags >> 1) & 0x03
+        if qos:
+            self.send(b"\x40\x02" + body[pos : pos + 2])  # PUBACK
+            pos += 2
+        self._broker.publish(topic, body[pos:])
+
+    def _on_subscribe(self, body: bytes) -> None:
+        packet_id, pos = body[:2], 2
+        granted = bytearray()
+        topics = []
+        while pos < len(body):
+            (size,) = struct.unpack_from("!H", body, pos)
+            topics.append(body[pos + 2 : pos + 2 + size].decode("utf-8"))
+            pos += 3 + size  # topic plus requested QoS byte
+            granted.append(0)
+        self._broker._subscribe(self, topics)
+        self.send(b"\x90" + _encode_remaining_length(2 + len(granted)) + packet_id + granted)
+
+    def _on_unsubscribe(self, body: bytes) -> None:
+        packet_id, pos = body[:2], 2
+        topics = []
+        while pos < len(body):
+            (size,) = struct.unpack_from("!H", body, pos)
+            topics.append(body[pos + 2 : pos + 2 + size].decode("utf-8"))
+            pos += 2 + size
+        self._broker._unsubscribe(self, topics)
+        self.send(b"\xb0\x02" + packet_id)
+
+    def close(self) -> None:
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+
+class LocalBroker:
+    """A small threaded MQTT 3.1.1 broker listening on localhost.
+
+    :param host: Interface to bind.
+    :param port: Port to bind; ``0`` picks a free one (see :attr:`port`).
+    :param websocket: Accept MQTT-over-WebSocket on *ws_path* instead of plain TCP.
+    :param ws_path: WebSocket endpoint path.
+    :param password: If set, reject CONNECTs whose password differs.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        websocket: bool = False,
+        ws_path: str = WS_PATH,
+        password: str | None = None,
+    ) -> None:
+        self.host = host
+        self.websocket = websocket
+        self.ws_path = ws_path
+        self.password = password
+        self._requested_port = port
+        self._server: socket.socket | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Condition()
+        self._sessions: list[_Session] = []
+        self.published = 0
+
+    @property
+    def port(self) -> int:
+        """The bound port (valid after :meth:`start`)."""
+        if self._server is None:
+            return self._requested_port
+        return self._server.getsockname()[1]
+
+    @property
+    def transport(self) -> str:
+        """The matching ``MqttClient`` *transport* argument."""
+        return "websockets" if self.websocket else "tcp"
+
+    @property
+    def client_count(self) -> int:
+        """Number of currently connected clients."""
+        with self._lock:
+            return len(self._sessions)
+
+    def start(self) -> "LocalBroker":
+        """Bind the listening socket and start accepting clients."""
+        server = socket.create_server((self.host, self._requested_port))
+        self._server = server
+        self._thread = threading.Thread(target=self._accept_loop, args=(server,), name="local-mqtt-broker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop accepting clients and close every connection."""
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)  # unblocks accept()
+            except OSError:
+                pass
+            self._server.close()
+            self._server = None
+        self.drop_clients()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def drop_clients(self) -> None:
+        """Close every client connection, e.g. to exercise reconnects."""
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+            self._lock.notify_all()
+        for session in sessions:
+            session.close()
+
+    def _accept_loop(self, server: socket.socket) -> None:
+        while True:
+            try:
+                sock, _ = server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self, sock)
+            threading.Thread(target=session.run, name="local-mqtt-session", daemon=True).start()
+
+    def _add_session(self, session: _Session) -> None:
+        with self._lock:
+            self._sessions.append(session)
+            self._lock.notify_all()
+
+    def _remove_session(self, session: _Session) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            self._lock.notify_all()
+
+    def _subscribe(self, session: _Session, topics: list[str]) -> None:
+        with self._lock:
+            session.subscriptions.update(topics)
+            self._lock.notify_all()
+
+    def _unsubscribe(self, session: _Session, topics: list[str]) -> None:
+        with self._lock:
+            session.subscriptions.difference_update(topics)
+            self._lock.notify_all()
+
+    def subscribers(self, topic: str) -> int:
+        """Number of connected clients with a filter matching *topic*."""
+        with self._lock:
+            return sum(1 for s in self._sessions if any(topic_matches(f, topic) for f in s.subscriptions))
+
+    def wait_for_subscribers(self, topic: str, count: int = 1, timeout: float = 5.0) -> bool:
+        """Block until at least *count* clients are subscribed to *topic*.
+
+        :returns: ``False`` if *timeout* seconds passed first.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                matched = sum(1 for s in self._sessions if any(topic_matches(f, topic) for f in s.subscriptions))
+                remaining = deadline - time.monotonic()
+                if matched >= count:
+                    return True
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+
+    def publish(self, topic: str, payload: bytes) -> int:
+        """Deliver a QoS 0 message to every matching subscriber.
+
+        :returns: The number of clients it was sent to.
+        """
+        encoded_topic = topic.encode("utf-8")
+        body = _encode_string(encoded_topic) + payload
+        packet = b"\x30" + _encode_remaining_length(len(body)) + body
+        with self._lock:
+            targets = [s for s in self._sessions if any(topic_matches(f, topic) for f in s.subscriptions)]
+            self.published += 1
+        delivered = 0
+        for session in targets:
+            try:
+                session.send(packet)
+                delivered += 1
+            except OSError:
+                pass
+        return delivered
+
+    def __enter__(self) -> "LocalBroker":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+
+class SyntheticPublisher:
+    """Publish generated device-log envelopes to a :class:`LocalBroker`.
+
+    Each device gets its own increasing sequence number and a slowly drifting
+    temperature, so the messages decode like real fermentation telemetry.
+
+    :param broker: The broker to publish through.
+    :param device_uuids: Devices to publish for, round-robin.
+    :param rate: Total messages per second for :meth:`start`; ``None`` for
+        as fast as possible.
+    :param seed: Seed for the temperature random walk.
+    """
+
+    def __init__(
+        self,
+        broker: LocalBroker,
+        device_uuids: Sequence[str],
+        rate: float | None = 10.0,
+        seed: int | None = None,
+    ) -> None:
+        if not device_uuids:
+            raise ValueError("device_uuids must not be empty")
+        self._broker = broker
+        self._device_uuids = list(device_uuids)
+        self._rate = rate
+        self._rng = random.Random(seed)
+        self._sequence = dict.fromkeys(self._device_uuids, 0)
+        self._temperature = dict.fromkeys(self._device_uuids, 18.0)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.sent = 0
+
+    def payload_for(self, device_uuid: str) -> bytes:
+        """Build the next envelope for *device_uuid*."""
+        self._sequence[device_uuid] += 1
+        temperature = self._temperature[device_uuid] + self._rng.uniform(-0.05, 0.05)
+        self._temperature[device_uuid] = temperature
+        return encode_device_log(
+            sequence_number=self._sequence[device_uuid],
+            session_id=1,
+            timestamp_ms=int(time.time() * 1000),
+            current_state=1,
+            process_type=4,
+            process_state=80,
+            current_temperature=temperature,
+            target_temperature=18.0,
+            measurements={SensorType.TEMP_LIQUID: temperature},
+        )
+
+    def publish_once(self) -> int:
+        """Publish one message per device.
+
+        :returns: The number of messages published.
+        """
+        for device_uuid in self._device_uuids:
+            self._broker.publish(f"devices/logs/{device_uuid}", self.payload_for(device_uuid))
+        self.sent += len(self._device_uuids)
+        return len(self._device_uuids)
+
+    def start(self) -> None:
+        """Publish continuously on a background thread until :meth:`stop`."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="synthetic-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread started by :meth:`start`."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        interval = 1.0 / self._rate if self._rate else 0.0
+        next_due = time.monotonic()
+        index = 0
+        while not self._stop.is_set():
+            device_uuid = self._device_uuids[index % len(self._device_uuids)]
+            self._broker.publish(f"devices/logs/{device_uuid}", self.payload_for(device_uuid))
+            self.sent += 1
+            index += 1
+            if interval:
+                next_due += interval
+                wait = next_due - time.monotonic()
+                if wait > 0:
+                    self._stop.wait(wait)
@@ -46,18 +46,28 @@ and callback arguments.
 """
 
 import logging
+import queue
 import threading
+import time
 import uuid
 from collections.abc import Callable
+from functools import partial
 from datetime import datetime, timezone
 from types import TracebackType
-from typing import Any
+from typing import Any, NamedTuple
 
 import paho.mqtt.client as _paho
 from requests.certs import where as requests_ca_bundle
 
+from .delivery import DeliveryPolicy
+from .filters import MessageFilter
+from .hooks import DispatchHook, callback_name
+from .metrics import MqttMetrics, topic_family
 from .models import DeviceLogMessage, MqttMessage
-from .proto import decode_device_log
+from .proto import decode_device_log, peek_envelope_header
+from .reconnect import ConnectAttempt, FixedDelay, ReconnectStrategy
+from .sequence import SequenceEvent, SequenceEventKind, SequenceTracker
+from .shadow import DeviceShadowStore
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +81,7 @@ WS_PATH: str = "/ws"
 KEEPALIVE: int = 60
 RECONNECT_DELAY: int = 5
 
-_DEVICE_LOG_TOPIC_PREFIX = "devices/logs/"
+DEVICE_LOG_TOPIC_PREFIX: str = "devices/logs/"
 _DEVICE_TOPIC_PREFIX_PARTS = ("devices",)
 
 
@@ -83,6 +93,35 @@ def _extract_device_uuid(topic: str) -> str | None:
     return None
 
 
+def _put_latest(q: "queue.Queue[Any]", item: object) -> None:
+    """Put *item* on *q*, discarding the oldest entry if the queue is full."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class _DeviceLogSubscription(NamedTuple):
+    """A device-log callback registered with a delivery policy and/or filter."""
+
+    callback: Callable[[DeviceLogMessage], None]
+    policy: DeliveryPolicy | None
+    where: MessageFilter | None
+
+
+def _call_hook(method: Callable[..., None], *args: object) -> None:
+    """Run one hook method; a failing hook must not break dispatch."""
+    try:
+        method(*args)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Exception in dispatch hook %s: %r", callback_name(method), exc)
+
+
 # ---------------------------------------------------------------------------
 # Callback type aliases
 # ---------------------------------------------------------------------------
@@ -93,6 +132,9 @@ ReconnectingCallback = Callable[[], None]
 ErrorCallback = Callable[[Exception], None]
 RawMessageCallback = Callable[[MqttMessage], None]
 DeviceLogCallback = Callable[[DeviceLogMessage], None]
+SequenceEventCallback = Callable[[SequenceEvent], None]
+ConnectAttemptCallback = Callable[[ConnectAttempt], None]
+CredentialProvider = Callable[[], str]
 
 
 # ---------------------------------------------------------------------------
@@ -103,8 +145,10 @@ DeviceLogCallback = Callable[[DeviceLogMessage], None]
 class MqttClient:
     """MQTT-over-WebSocket client for the MiniBrew Brewery Portal.
 
-    Do not instantiate directly; use
-    :meth:`~pymbrewclient.client.BreweryClient.create_mqtt_client` instead.
+    Normally created via
+    :meth:`~pymbrewclient.client.BreweryClient.create_mqtt_client`.  Instantiate
+    directly only to point at another broker, such as a
+    :class:`~pymbrewclient.mqtt.broker.LocalBroker` in tests.
 
     Example::
 
@@ -122,15 +166,63 @@ class MqttClient:
         sensitive fields.
     """
 
-    def __init__(self, api_token: str, user_uuid: str) -> None:
+    def __init__(
+        self,
+        api_token: str,
+        user_uuid: str,
+        track_sequence: bool = True,
+        reconnect_strategy: ReconnectStrategy | None = None,
+        credential_provider: CredentialProvider | None = None,
+        host: str = BROKER_HOST,
+        port: int = BROKER_PORT,
+        transport: str = "websockets",
+        ws_path: str = WS_PATH,
+        tls: bool = True,
+        collect_metrics: bool = True,
+        track_shadow: bool = True,
+    ) -> None:
         """
         :param api_token: A valid MiniBrew REST API token.  Used as the MQTT
             password.  **Never log this value.**
         :param user_uuid: The authenticated user's UUID, used to construct the
             MQTT username (``breweryportal-{user_uuid}``).
+        :param track_sequence: Track live envelope sequence numbers per device,
+            dropping duplicate redeliveries and reporting gaps, reordering, and
+            resets via :meth:`on_sequence_event`.
+        :param reconnect_strategy: Decides how long to wait before each
+            automatic reconnect.  Defaults to a fixed :data:`RECONNECT_DELAY`;
+            pass an :class:`~pymbrewclient.mqtt.reconnect.ExponentialBackoff`
+            to spread reconnects out when many clients drop at once.
+        :param credential_provider: Zero-argument callable returning a
+            currently valid API token, e.g.
+            :meth:`RestApiClient.get_valid_token <pymbrewclient.rest.client.RestApiClient.get_valid_token>`.
+            It is called before every (re)connection attempt, so automatic
+            reconnects keep working after the original token expires.
+        :param host: Broker host name.
+        :param port: Broker port.
+        :param transport: ``"websockets"`` (as used by MiniBrew) or ``"tcp"``.
+        :param ws_path: WebSocket endpoint path; ignored for ``"tcp"``.
+        :param tls: Verify and encrypt the connection with the ``requests``
+            CA bundle.  Disable only for a local test broker.
+        :param collect_metrics: Record ingestion counters and timings, exposed
+            via :attr:`metrics`.
+        :param track_shadow: Keep :attr:`shadow` up to date.  The shadow needs
+            every message decoded; with it off, and every device-log subscriber
+            behind a delivery policy, messages no subscriber admits are never
+            decoded.
+        :raises ValueError: If *transport* is not supported.
         """
+        if transport not in ("websockets", "tcp"):
+            raise ValueError(f"Unsupported MQTT transport: {transport!r}")
         self._api_token = api_token  # intentionally private — never logged
         self._user_uuid = user_uuid
+        self._credential_provider = credential_provider
+
+        self._host = host
+        self._port = port
+        self._transport = transport
+        self._ws_path = ws_path
+        self._tls = tls
 
         self._client_uuid = str(uuid.uuid4())
         self._client_id = f"breweryportal-{self._client_uuid}"
@@ -142,6 +234,11 @@ class MqttClient:
         self._connected = False
         self._ever_connected = False
 
+        self._reconnect_strategy = reconnect_strategy or FixedDelay(RECONNECT_DELAY)
+        self._connect_attempt = 0
+        self._attempt_started: float | None = None
+        self._reconnect_delay: float | None = None
+
         # Callbacks
         self._on_connected_callbacks: list[ConnectedCallback] = []
         self._on_disconnected_callbacks: list[DisconnectedCallback] = []
@@ -149,6 +246,25 @@ class MqttClient:
         self._on_error_callbacks: list[ErrorCallback] = []
         self._on_raw_message_callbacks: list[RawMessageCallback] = []
         self._on_device_log_callbacks: list[DeviceLogCallback] = []
+        self._on_sequence_event_callbacks: list[SequenceEventCallback] = []
+        self._on_connect_attempt_callbacks: list[ConnectAttemptCallback] = []
+        self._device_log_queues: list[queue.Queue[DeviceLogMessage]] = []
+        self._hooks: tuple[DispatchHook, ...] = ()
+        self._device_log_subscriptions: list[_DeviceLogSubscription] = []
+        self._policies: list[DeliveryPolicy] = []
+        self._previous_logs: dict[str, DeviceLogMessage] = {}
+        self._track_shadow = track_shadow
+
+        self._sequence_tracker = SequenceTracker() if track_sequence else None
+        self._shadow = DeviceShadowStore()
+        self._metrics = (
+            MqttMetrics(
+                queue_depths=lambda: [q.qsize() for q in self._device_log_queues],
+                sequence_stats=lambda: self._sequence_tracker.stats() if self._sequence_tracker is not None else None,
+            )
+            if collect_metrics
+            else None
+        )
 
         self._paho_client = self._build_paho_client()
 
@@ -164,32 +280,79 @@ class MqttClient:
             callback_api_version=_paho.CallbackAPIVersion.VERSION2,
             client_id=self._client_id,
             protocol=_paho.MQTTv311,
-            transport="websockets",
+            transport=self._transport,
             clean_session=True,
         )
-        client.ws_set_options(path=WS_PATH)
-        client.tls_set(ca_certs=requests_ca_bundle())
+        if self._transport == "websockets":
+            client.ws_set_options(path=self._ws_path)
+        if self._tls:
+            client.tls_set(ca_certs=requests_ca_bundle())
         client.username_pw_set(self._username, self._api_token)
         client.will_set(topic=will_topic, payload="offline", qos=0, retain=False)
-        client.reconnect_delay_set(min_delay=RECONNECT_DELAY, max_delay=RECONNECT_DELAY)
+        self._schedule_reconnect(client)
 
         client.on_connect = self._on_paho_connect
+        client.on_connect_fail = self._on_paho_connect_fail
         client.on_disconnect = self._on_paho_disconnect
         client.on_message = self._on_paho_message
         client.on_pre_connect = self._on_paho_pre_connect
 
         return client
 
+    def _schedule_reconnect(self, client: _paho.Client) -> None:
+        """Ask the reconnect strategy for the next delay and hand it to paho.
+
+        paho doubles its delay between ``min_delay`` and ``max_delay``;
+        pinning both to the same value (which also resets paho's own backoff)
+        gives the strategy full control over the wait.
+        """
+        delay = self._reconnect_strategy.next_delay(self._connect_attempt, self._reconnect_delay)
+        self._reconnect_delay = delay
+        client.reconnect_delay_set(min_delay=delay, max_delay=delay)
+
+    def _finish_connect_attempt(self, succeeded: bool, reason: str | None = None) -> None:
+        """Report the outcome of the attempt started in :meth:`_on_paho_pre_connect`."""
+        started = self._attempt_started
+        self._attempt_started = None
+        latency = time.monotonic() - started if started is not None else None
+        attempt = ConnectAttempt(attempt=self._connect_attempt, succeeded=succeeded, latency=latency, reason=reason)
+        if succeeded:
+            self._connect_attempt = 0
+            self._reconnect_delay = None
+        elif self._metrics is not None:
+            self._metrics.record_connect_failure()
+        self._fire_connect_attempt(attempt)
+
     # ------------------------------------------------------------------
     # paho callbacks
     # ------------------------------------------------------------------
 
     def _on_paho_pre_connect(self, client: _paho.Client, userdata: Any) -> None:  # noqa: ANN401
         """Called by paho just before a (re)connection attempt."""
+        self._connect_attempt += 1
+        self._attempt_started = time.monotonic()
+        if self._credential_provider is not None:
+            self._refresh_credentials(client)
         if self._ever_connected:
-            logger.debug("MQTT reconnecting to %s:%d", BROKER_HOST, BROKER_PORT)
+            logger.debug("MQTT reconnecting to %s:%d", self._host, self._port)
+            if self._metrics is not None:
+                self._metrics.record_reconnect()
             self._fire_reconnecting()
 
+    def _refresh_credentials(self, client: _paho.Client) -> None:
+        """Fetch the current token from the credential provider and use it as the MQTT password."""
+        try:
+            token = self._credential_provider()
+        except Exception as exc:  # noqa: BLE001
+            # The exception text is not forwarded: it may echo request details.
+            logger.warning("MQTT credential refresh failed (%s); retrying with the previous token", type(exc).__name__)
+            self._fire_error(ConnectionError("MQTT credential refresh failed"))
+            return
+        if token and token != self._api_token:
+            logger.debug("MQTT credentials refreshed")
+            self._api_token = token
+            client.username_pw_set(self._username, token)
+
     def _on_paho_connect(
         self,
         client: _paho.Client,
@@ -201,10 +364,12 @@ class MqttClient:
         """Called when paho establishes or re-establishes the connection."""
         if reason_code.is_failure:
             logger.warning("MQTT connect failed: %s", reason_code)
+            self._finish_connect_attempt(succeeded=False, reason=str(reason_code))
             self._fire_error(ConnectionError(f"MQTT connect failed: {reason_code}"))
             return
 
         logger.debug("MQTT connected (session_present=%s)", connect_flags.session_present)
+        self._finish_connect_attempt(succeeded=True)
         self._connected = True
         self._ever_connected = True
 
@@ -228,98 +393,294 @@ class MqttClient:
         """Called when paho loses the connection."""
         self._connected = False
         logger.debug("MQTT disconnected: %s", reason_code)
+        self._schedule_reconnect(client)
         self._fire_disconnected()
 
+    def _on_paho_connect_fail(self, client: _paho.Client, userdata: Any) -> None:  # noqa: ANN401
+        """Called by paho when a connection attempt fails before the broker answers."""
+        logger.debug("MQTT connection attempt %d failed", self._connect_attempt)
+        self._finish_connect_attempt(succeeded=False, reason="connection failed")
+        self._schedule_reconnect(client)
+
     def _on_paho_message(self, client: _paho.Client, userdata: Any, msg: _paho.MQTTMessage) -> None:  # noqa: ANN401
         """Called for every incoming MQTT PUBLISH."""
-        received_at = datetime.now(tz=timezone.utc)
-        device_uuid = _extract_device_uuid(msg.topic)
+        self._handle_message(msg.topic, bytes(msg.payload), datetime.now(tz=timezone.utc))
+
+    def _handle_message(self, topic: str, payload: bytes, received_at: datetime) -> None:
+        """Run one message through sequence tracking, decoding, and dispatch.
+
+        Shared by live traffic and :class:`~pymbrewclient.mqtt.recording.MqttReplay`.
+        """
+        device_uuid = _extract_device_uuid(topic)
+        is_device_log = topic.startswith(DEVICE_LOG_TOPIC_PREFIX)
+
+        if is_device_log and device_uuid is not None and self._sequence_tracker is not None:
+            if self._is_duplicate_device_log(device_uuid, payload):
+                return
 
         raw_msg = MqttMessage(
-            topic=msg.topic,
-            payload=bytes(msg.payload),
+            topic=topic,
+            payload=payload,
             received_at=received_at,
             device_uuid=device_uuid,
         )
 
+        started = time.perf_counter()
         self._fire_raw_message(raw_msg)
-
-        if msg.topic.startswith(_DEVICE_LOG_TOPIC_PREFIX):
-            decoded = decode_device_log(raw_msg)
-            if decoded.decode_error:
-                logger.debug("MQTT device-log decode error on %s: %s", msg.topic, decoded.decode_error)
-            self._fire_device_log(decoded)
+        callback_time = time.perf_counter() - started
+
+        decoded = None
+        decode_time = None
+        if is_device_log:
+            # Unfiltered delivery policies only need the raw message, so they
+            # run first and decoding is skipped when nobody wants the result.
+            admitted: list[DeviceLogCallback] = []
+            filtered: list[_DeviceLogSubscription] = []
+            for sub in self._device_log_subscriptions:
+                if sub.where is not None:
+                    filtered.append(sub)
+                elif sub.policy.offer(raw_msg):
+                    admitted.append(sub.callback)
+            if admitted or filtered or self._on_device_log_callbacks or self._track_shadow:
+                decoded, decode_time = self._decode(raw_msg)
+                if self._track_shadow:
+                    self._shadow.update(decoded)
+                if filtered:
+                    admitted.extend(self._apply_filters(filtered, raw_msg, decoded))
+                started = time.perf_counter()
+                self._fire_device_log(decoded)
+                if admitted:
+                    self._invoke("on_device_log", admitted, decoded)
+                callback_time += time.perf_counter() - started
+
+        if self._metrics is not None:
+            self._metrics.record_message(topic_family(topic), len(payload), callback_time, decode_time, decoded)
+
+    def _decode(self, raw_msg: MqttMessage) -> tuple[DeviceLogMessage, float]:
+        """Decode a device log, running dispatch hooks around it; returns the message and seconds taken."""
+        hooks = self._hooks
+        for hook in hooks:
+            _call_hook(hook.before_decode, raw_msg)
+        started = time.perf_counter()
+        decoded = decode_device_log(raw_msg)
+        decode_time = time.perf_counter() - started
+        for hook in hooks:
+            _call_hook(hook.after_decode, raw_msg, decoded, decode_time)
+        if decoded.decode_error:
+            logger.debug("MQTT device-log decode error on %s: %s", raw_msg.topic, decoded.decode_error)
+        return decoded, decode_time
+
+    def _apply_filters(
+        self, subscriptions: list[_DeviceLogSubscription], raw_msg: MqttMessage, decoded: DeviceLogMessage
+    ) -> list[DeviceLogCallback]:
+        """Return the callbacks of filtered subscriptions that accept *decoded*.
+
+        Each distinct filter is evaluated once, against the device's previous
+        successfully decoded message; a subscription's policy then thins the
+        messages its filter accepted.
+        """
+        if decoded.decode_error:
+            return []
+        key = raw_msg.device_uuid or raw_msg.topic
+        previous = self._previous_logs.get(key)
+        self._previous_logs[key] = decoded
+        results: dict[int, bool] = {}
+        callbacks = []
+        for sub in subscriptions:
+            matched = results.get(id(sub.where))
+            if matched is None:
+                try:
+                    matched = sub.where.matches(decoded, previous)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Exception in device-log filter %r: %r", sub.where, exc)
+                    matched = False
+                results[id(sub.where)] = matched
+            if matched and (sub.policy is None or sub.policy.offer(raw_msg)):
+                callbacks.append(sub.callback)
+        return callbacks
+
+    def _deliver_deferred(self, callback: DeviceLogCallback, raw_msg: MqttMessage) -> None:
+        """Decode and deliver a message a delivery policy held back, with hooks and metrics as usual."""
+        decoded, decode_time = self._decode(raw_msg)
+        started = time.perf_counter()
+        self._invoke("on_device_log", [callback], decoded)
+        if self._metrics is not None:
+            self._metrics.record_deferred(time.perf_counter() - started, decode_time)
+
+    def _transfer_device_state(self, device_uuid: str, target: "MqttClient") -> None:
+        """Move per-device shadow, sequence, and filter state to *target*."""
+        self._shadow.transfer(device_uuid, target._shadow)
+        if self._sequence_tracker is not None and target._sequence_tracker is not None:
+            self._sequence_tracker.transfer(device_uuid, target._sequence_tracker)
+        previous = self._previous_logs.pop(device_uuid, None)
+        if previous is not None:
+            target._previous_logs[device_uuid] = previous
+
+    def _is_duplicate_device_log(self, device_uuid: str, payload: bytes) -> bool:
+        """Track the envelope sequence number; return ``True`` for a redelivery."""
+        sequence_number, session_id = peek_envelope_header(payload)
+        if sequence_number is None:
+            return False
+        event = self._sequence_tracker.check(device_uuid, sequence_number, session_id)
+        if event is None:
+            return False
+        if event.kind is SequenceEventKind.DUPLICATE:
+            logger.debug("MQTT dropping duplicate device log %d from %s", sequence_number, device_uuid)
+        else:
+            logger.debug("MQTT sequence %s for %s at %d", event.kind.value, device_uuid, sequence_number)
+        self._fire_sequence_event(event)
+        return event.kind is SequenceEventKind.DUPLICATE
 
     # ------------------------------------------------------------------
     # Callback firing helpers
     # ------------------------------------------------------------------
 
-    def _fire_connected(self) -> None:
-        for cb in self._on_connected_callbacks:
+    def _invoke(self, event: str, callbacks: list[Callable[..., None]], *args: object) -> None:
+        """Run *callbacks* with *args*, isolating the client from their exceptions."""
+        hooks = self._hooks
+        if hooks:
+            self._invoke_hooked(event, callbacks, args, hooks)
+            return
+        for cb in callbacks:
             try:
-                cb()
+                cb(*args)
             except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_connected callback: %s", exc)
+                logger.warning("Exception in %s callback %s: %r", event, callback_name(cb), exc)
 
-    def _fire_disconnected(self) -> None:
-        for cb in self._on_disconnected_callbacks:
+    def _invoke_hooked(
+        self,
+        event: str,
+        callbacks: list[Callable[..., None]],
+        args: tuple[object, ...],
+        hooks: tuple[DispatchHook, ...],
+    ) -> None:
+        message = args[0] if args else None
+        for cb in callbacks:
+            for hook in hooks:
+                _call_hook(hook.before_callback, event, cb, message)
+            error = None
+            started = time.perf_counter()
             try:
-                cb()
+                cb(*args)
             except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_disconnected callback: %s", exc)
+                error = exc
+                logger.warning("Exception in %s callback %s: %r", event, callback_name(cb), exc)
+            elapsed = time.perf_counter() - started
+            for hook in hooks:
+                _call_hook(hook.after_callback, event, cb, message, elapsed, error)
+
+    def _fire_connected(self) -> None:
+        self._invoke("on_connected", self._on_connected_callbacks)
+
+    def _fire_disconnected(self) -> None:
+        self._invoke("on_disconnected", self._on_disconnected_callbacks)
 
     def _fire_reconnecting(self) -> None:
-        for cb in self._on_reconnecting_callbacks:
-            try:
-                cb()
-            except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_reconnecting callback: %s", exc)
+        self._invoke("on_reconnecting", self._on_reconnecting_callbacks)
 
     def _fire_error(self, error: Exception) -> None:
-        for cb in self._on_error_callbacks:
-            try:
-                cb(error)
-            except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_error callback: %s", exc)
+        self._invoke("on_error", self._on_error_callbacks, error)
 
     def _fire_raw_message(self, msg: MqttMessage) -> None:
-        for cb in self._on_raw_message_callbacks:
-            try:
-                cb(msg)
-            except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_message callback: %s", exc)
+        self._invoke("on_message", self._on_raw_message_callbacks, msg)
 
     def _fire_device_log(self, msg: DeviceLogMessage) -> None:
-        for cb in self._on_device_log_callbacks:
-            try:
-                cb(msg)
-            except Exception as exc:  # noqa: BLE001
-                logger.debug("Exception in on_device_log callback: %s", exc)
+        self._invoke("on_device_log", self._on_device_log_callbacks, msg)
+
+    def _fire_connect_attempt(self, attempt: ConnectAttempt) -> None:
+        self._invoke("on_connect_attempt", self._on_connect_attempt_callbacks, attempt)
+
+    def _fire_sequence_event(self, event: SequenceEvent) -> None:
+        self._invoke("on_sequence_event", self._on_sequence_event_callbacks, event)
+
+    # ------------------------------------------------------------------
+    # Dispatch hooks
+    # ------------------------------------------------------------------
+
+    def add_hook(self, hook: DispatchHook) -> None:
+        """Register a :class:`~pymbrewclient.mqtt.hooks.DispatchHook`.
+
+        Hooks observe every decode and every callback invocation, e.g.
+        :class:`~pymbrewclient.mqtt.hooks.CallbackTimer` to find a slow
+        subscriber or :class:`~pymbrewclient.mqtt.hooks.SlowCallbackLogger`
+        to warn about one.  With no hooks registered, dispatch does no extra work.
+        """
+        self._hooks = (*self._hooks, hook)
+
+    def remove_hook(self, hook: DispatchHook) -> None:
+        """Unregister a hook added with :meth:`add_hook`; unknown hooks are ignored."""
+        self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    # ------------------------------------------------------------------
+    # Device shadow
+    # ------------------------------------------------------------------
+
+    @property
+    def track_shadow(self) -> bool:
+        """Whether :attr:`shadow` is kept up to date; see the constructor's *track_shadow*."""
+        return self._track_shadow
+
+    @property
+    def shadow(self) -> DeviceShadowStore:
+        """Latest-known state per device, kept up to date from device-log messages.
+
+        The shadow is updated before :meth:`on_device_log` callbacks fire, so a
+        callback reading it sees the message it was just handed.  Reads never
+        block message ingestion::
+
+            state = mqtt.shadow.get("7391Q4827-5NZC8R2M")
+            if state is not None:
+                print(state.current_temperature, state.process_phase)
+
+        Stays empty for a client created with ``track_shadow=False``.
+        """
+        return self._shadow
+
+    @property
+    def metrics(self) -> MqttMetrics | None:
+        """Ingestion counters and timings, or ``None`` if ``collect_metrics`` was off.
+
+        Take a consistent copy with ``mqtt.metrics.snapshot()``; serve it to
+        Prometheus with :class:`~pymbrewclient.mqtt.metrics.MetricsServer`.
+        """
+        return self._metrics
+
+    @property
+    def sequence_tracker(self) -> SequenceTracker | None:
+        """Per-device sequence tracker, or ``None`` when tracking is disabled.
+
+        Use :meth:`~pymbrewclient.mqtt.sequence.SequenceTracker.stats` for
+        duplicate, gap, reordering, and reset counters.
+        """
+        return self._sequence_tracker
 
     # ------------------------------------------------------------------
     # Public connection API
     # ------------------------------------------------------------------
 
     def connect(self) -> None:
-        """Open the WebSocket connection to the MiniBrew MQTT broker.
+        """Open the connection to the configured broker (MiniBrew's by default).
 
         Starts a background network thread.  Returns immediately; connection
         events are delivered via :meth:`on_connected` / :meth:`on_disconnected`
         callbacks.
         """
-        logger.debug("MQTT connecting to %s:%d%s", BROKER_HOST, BROKER_PORT, WS_PATH)
-        self._paho_client.connect(host=BROKER_HOST, port=BROKER_PORT, keepalive=KEEPALIVE)
+        logger.debug("MQTT connecting to %s:%d (%s)", self._host, self._port, self._transport)
+        self._paho_client.connect(host=self._host, port=self._port, keepalive=KEEPALIVE)
         self._paho_client.loop_start()
 
     def disconnect(self) -> None:
         """Disconnect from the broker and stop the background network thread.
 
-        Safe to call even when not connected.
+        Delivery policies registered on this client are closed, dropping any
+        messages they were holding back.  Safe to call even when not connected.
         """
         logger.debug("MQTT disconnecting")
         self._paho_client.disconnect()
         self._paho_client.loop_stop()
         self._connected = False
+        for policy in self._policies:
+            policy.close()
 
     # ------------------------------------------------------------------
     # Subscription API
@@ -355,13 +716,18 @@ class MqttClient:
             self._paho_client.unsubscribe(topic)
         logger.debug("MQTT unsubscribed from %s", topic)
 
+    def is_subscribed(self, topic: str) -> bool:
+        """Return ``True`` if *topic* is in the subscription set restored after each reconnect."""
+        with self._subscription_lock:
+            return topic in self._subscriptions
+
     @staticmethod
     def device_log_topic(device_uuid: str) -> str:
         """Return the ``devices/logs/{device_uuid}`` topic for a device.
 
         :param device_uuid: Device serial number or UUID.
         """
-        return f"{_DEVICE_LOG_TOPIC_PREFIX}{device_uuid}"
+        return f"{DEVICE_LOG_TOPIC_PREFIX}{device_uuid}"
 
     def subscribe_device_logs(self, device_uuid: str, qos: int = 0) -> None:
         """Subscribe to real-time telemetry logs for a specific device.
@@ -409,6 +775,18 @@ class MqttClient:
         """
         self._on_reconnecting_callbacks.append(callback)
 
+    def on_connect_attempt(self, callback: ConnectAttemptCallback) -> None:
+        """Register a callback invoked when each connection attempt completes.
+
+        The callback receives a :class:`~pymbrewclient.mqtt.reconnect.ConnectAttempt`
+        with the attempt number since the last successful connection and the
+        time the attempt took, for both successes and failures.
+
+        :param callback: A callable accepting one
+            :class:`~pymbrewclient.mqtt.reconnect.ConnectAttempt` argument.
+        """
+        self._on_connect_attempt_callbacks.append(callback)
+
     def on_error(self, callback: ErrorCallback) -> None:
         """Register a callback invoked when a connection-level error occurs.
 
@@ -430,7 +808,12 @@ class MqttClient:
         """
         self._on_raw_message_callbacks.append(callback)
 
-    def on_device_log(self, callback: DeviceLogCallback) -> None:
+    def on_device_log(
+        self,
+        callback: DeviceLogCallback,
+        policy: DeliveryPolicy | None = None,
+        where: MessageFilter | None = None,
+    ) -> None:
         """Register a callback invoked for decoded device-log messages.
 
         The callback receives a :class:`~pymbrewclient.mqtt.models.DeviceLogMessage`.
@@ -439,8 +822,65 @@ class MqttClient:
 
         :param callback: A callable accepting one
             :class:`~pymbrewclient.mqtt.models.DeviceLogMessage` argument.
+        :param policy: Optional :class:`~pymbrewclient.mqtt.delivery.DeliveryPolicy`
+            (e.g. ``RateLimit(1)``) limiting which messages this callback gets,
+            per device.  Use a separate policy instance per callback.  With
+            :class:`~pymbrewclient.mqtt.delivery.Conflate`, messages held back
+            for a window are delivered on its ``mqtt-conflate`` thread,
+            concurrently with the network thread, so the callback must be
+            thread-safe.
+        :param where: Optional :class:`~pymbrewclient.mqtt.filters.MessageFilter`
+            (e.g. ``FieldChanged("process_state")``) selecting which decoded
+            messages this callback gets.  A policy then applies to the
+            messages the filter accepted.
+        """
+        if policy is not None:
+            policy.bind(partial(self._deliver_deferred, callback))
+            self._policies.append(policy)
+        self._add_device_log_subscription(callback, policy, where)
+
+    def _add_device_log_subscription(
+        self, callback: DeviceLogCallback, policy: DeliveryPolicy | None, where: MessageFilter | None
+    ) -> None:
+        """Register a device-log callback whose policy, if any, is already bound."""
+        if policy is None and where is None:
+            self._on_device_log_callbacks.append(callback)
+            return
+        self._device_log_subscriptions.append(_DeviceLogSubscription(callback, policy, where))
+
+    def on_sequence_event(self, callback: SequenceEventCallback) -> None:
+        """Register a callback invoked when a device's sequence numbers misbehave.
+
+        The callback receives a :class:`~pymbrewclient.mqtt.sequence.SequenceEvent`
+        for every dropped duplicate, gap, late (reordered) arrival, and counter
+        reset.  Only live envelopes carry sequence numbers.
+
+        :param callback: A callable accepting one
+            :class:`~pymbrewclient.mqtt.sequence.SequenceEvent` argument.
+        """
+        self._on_sequence_event_callbacks.append(callback)
+
+    def device_log_queue(
+        self,
+        maxsize: int = 1000,
+        policy: DeliveryPolicy | None = None,
+        where: MessageFilter | None = None,
+    ) -> "queue.Queue[DeviceLogMessage]":
+        """Return a new queue that receives every decoded device-log message.
+
+        Use this instead of :meth:`on_device_log` to consume messages on your
+        own thread.  When the queue is full the oldest message is discarded,
+        so a slow consumer always sees the most recent telemetry and never
+        blocks the network thread.
+
+        :param maxsize: Maximum number of queued messages (``0`` = unbounded).
+        :param policy: Optional delivery policy, as for :meth:`on_device_log`.
+        :param where: Optional filter, as for :meth:`on_device_log`.
         """
-        self._on_device_log_callbacks.append(callback)
+        q: queue.Queue[DeviceLogMessage] = queue.Queue(maxsize=maxsize)
+        self._device_log_queues.append(q)
+        self.on_device_log(lambda msg: _put_latest(q, msg), policy=policy, where=where)
+        return q
 
     # ------------------------------------------------------------------
     # Context manager
@@ -467,7 +907,7 @@ class MqttClient:
             f"MqttClient("
             f"client_id={self._client_id!r}, "
             f"username={self._username!r}, "
-            f"broker={BROKER_HOST!r}:{BROKER_PORT}, "
+            f"broker={self._host!r}:{self._port}, "
             f"connected={self._connected!r}"
             f")"
         )
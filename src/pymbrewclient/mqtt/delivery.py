@@ -0,0 +1,213 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Per-subscription delivery policies for device-log callbacks.
+
+Pass a policy to :meth:`MqttClient.on_device_log <pymbrewclient.mqtt.client.MqttClient.on_device_log>`
+to thin out what one callback receives, per device:
+
+* :class:`RateLimit` delivers at most *max_per_second* messages,
+* :class:`Sample` delivers every *n*-th message, and
+* :class:`Conflate` delivers the first message, then at most the latest one
+  per *window* seconds.
+
+Policies look only at the raw message (topic and ``received_at``), so they run
+before decoding; a message no subscriber admits is not decoded for them.  Each
+policy instance keeps its own per-device state, so use one instance per
+subscription.
+"""
+
+import heapq
+import threading
+import time
+from collections.abc import Callable
+
+from .models import MqttMessage
+
+DeferredDelivery = Callable[[MqttMessage], None]
+
+
+def _device_key(msg: MqttMessage) -> str:
+    return msg.device_uuid if msg.device_uuid is not None else msg.topic
+
+
+class DeliveryPolicy:
+    """Base class: decides, per raw message, whether a subscriber gets it now."""
+
+    def offer(self, msg: MqttMessage) -> bool:
+        """Return ``True`` to deliver *msg* to the subscriber immediately."""
+        return True
+
+    def bind(self, deliver: DeferredDelivery) -> None:
+        """Called once at registration with a function for delivering messages later.
+
+        Only policies that hold messages back (such as :class:`Conflate`) need it.
+        """
+
+    def close(self) -> None:
+        """Release background resources and drop any held messages.
+
+        Called when the client disconnects; the policy works again if the
+        client reconnects.
+        """
+
+
+class RateLimit(DeliveryPolicy):
+    """Deliver at most *max_per_second* messages per device; drop the rest.
+
+    Spacing is measured on ``received_at``, so replays behave like live traffic.
+
+    :param max_per_second: Maximum deliveries per device per second.
+    """
+
+    def __init__(self, max_per_second: float) -> None:
+        if max_per_second <= 0:
+            raise ValueError("max_per_second must be positive")
+        self.interval = 1.0 / max_per_second
+        self._last: dict[str, float] = {}
+
+    def offer(self, msg: MqttMessage) -> bool:
+        key = _device_key(msg)
+        now = msg.received_at.timestamp()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last[key] = now
+        return True
+
+
+class Sample(DeliveryPolicy):
+    """Deliver every *every*-th message per device, starting with the first.
+
+    :param every: Sampling interval in messages.
+    """
+
+    def __init__(self, every: int) -> None:
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self._seen: dict[str, int] = {}
+
+    def offer(self, msg: MqttMessage) -> bool:
+        key = _device_key(msg)
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        return seen % self.every == 0
+
+
+class Conflate(DeliveryPolicy):
+    """Deliver the latest message per device at most once per *window* seconds.
+
+    The first message for an idle device is delivered immediately and opens
+    a window.  Messages arriving inside the window replace each other; the
+    last one is delivered when the window closes, from a background thread,
+    and opens the next window.
+
+    Windows are timed with :func:`time.monotonic`, not ``received_at``:
+    unlike :class:`RateLimit`, conflation follows real time, so under
+    :class:`~pymbrewclient.mqtt.recording.MqttReplay` it is not compressed
+    along with the recording.
+
+    :param window: Conflation window in seconds of real (monotonic) time.
+    """
+
+    def __init__(self, window: float) -> None:
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.window = window
+        self._deliver: DeferredDelivery | None = None
+        self._cond = threading.Condition()
+        self._deadlines: dict[str, float] = {}
+        self._pending: dict[str, MqttMessage] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._thread: threading.Thread | None = None
+
+    def bind(self, deliver: DeferredDelivery) -> None:
+        self._deliver = deliver
+
+    def offer(self, msg: MqttMessage) -> bool:
+        key = _device_key(msg)
+        now = time.monotonic()
+        with self._cond:
+            deadline = self._deadlines.get(key)
+            if deadline is not None and now < deadline:
+                self._pending[key] = msg
+                return False
+            self._open_window(key, now)
+            return True
+
+    def _open_window(self, key: str, now: float) -> None:
+        deadline = now + self.window
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if self._thread is None:
+            # Started on first use, and again after close().
+            self._thread = threading.Thread(target=self._run, name="mqtt-conflate", daemon=True)
+            self._thread.start()
+        self._cond.notify()
+
+    def _run(self) -> None:
+        me = threading.current_thread()
+        while True:
+            with self._cond:
+                while self._thread is me:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                if self._thread is not me:
+                    return  # closed
+                deadline, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) != deadline:
+                    continue  # superseded by a newer window
+                msg = self._pending.pop(key, None)
+                if msg is None:
+                    del self._deadlines[key]
+                    continue
+                self._open_window(key, time.monotonic())
+            if self._deliver is not None:
+                self._deliver(msg)
+
+    def close(self) -> None:
+        with self._cond:
+            self._pending.clear()
+            self._deadlines.clear()
+            self._heap.clear()
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
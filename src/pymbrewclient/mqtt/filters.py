@@ -0,0 +1,183 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Filters for device-log subscriptions.
+
+Pass a filter as ``where=`` to
+:meth:`MqttClient.on_device_log <pymbrewclient.mqtt.client.MqttClient.on_device_log>`
+so a callback only receives the messages it cares about::
+
+    mqtt.on_device_log(alert, where=FieldChanged("process_state") | Threshold("temp_control_power", 0.0))
+
+Filters are evaluated once per message in the client's dispatch stage,
+against the shared decoded message and the previous decoded message from
+the same device.  A filter instance shared by several subscriptions is
+evaluated only once per message.  Messages that failed to decode never match.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+from .models import DeviceLogMessage
+
+FieldRef = str | int
+"""A :class:`~pymbrewclient.mqtt.models.DeviceLogMessage` attribute name, or a measurement ID / ``SensorType``."""
+
+
+def _field_value(msg: DeviceLogMessage, field: FieldRef) -> object:
+    if isinstance(field, int):
+        return msg.measurements.get(field)
+    return getattr(msg, field)
+
+
+class MessageFilter(ABC):
+    """Base class for device-log filters; combine with ``&``, ``|``, and ``~``."""
+
+    @abstractmethod
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        """Return ``True`` if *msg* should be delivered.
+
+        :param msg: The newly decoded message.
+        :param previous: The previous successfully decoded message from the
+            same device, or ``None`` for the first one.
+        """
+
+    def __and__(self, other: "MessageFilter") -> "MessageFilter":
+        return AllOf(self, other)
+
+    def __or__(self, other: "MessageFilter") -> "MessageFilter":
+        return AnyOf(self, other)
+
+    def __invert__(self) -> "MessageFilter":
+        return Not(self)
+
+
+class Predicate(MessageFilter):
+    """Match when *func(msg)* is truthy.
+
+    :param func: A callable accepting a decoded message.
+    """
+
+    def __init__(self, func: Callable[[DeviceLogMessage], object]) -> None:
+        self.func = func
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        return bool(self.func(msg))
+
+
+class FieldChanged(MessageFilter):
+    """Match when any of *fields* differs from the device's previous message.
+
+    The first message from a device always matches.
+
+    :param fields: Attribute names or measurement IDs to compare.
+    """
+
+    def __init__(self, *fields: FieldRef) -> None:
+        if not fields:
+            raise ValueError("FieldChanged needs at least one field")
+        self.fields = fields
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        if previous is None:
+            return True
+        return any(_field_value(msg, f) != _field_value(previous, f) for f in self.fields)
+
+
+class Threshold(MessageFilter):
+    """Match when *field* crosses *value* between the previous message and this one.
+
+    A rise matches when the previous reading was below *value* and the new one
+    is at or above it; a fall matches the other way round.  Missing readings
+    never match.
+
+    :param field: Attribute name or measurement ID to watch.
+    :param value: The threshold.
+    :param direction: ``"both"``, ``"rising"``, or ``"falling"``.
+    """
+
+    def __init__(self, field: FieldRef, value: float, direction: str = "both") -> None:
+        if direction not in ("both", "rising", "falling"):
+            raise ValueError(f"Unknown threshold direction: {direction!r}")
+        self.field = field
+        self.value = value
+        self.direction = direction
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        if previous is None:
+            return False
+        current = _field_value(msg, self.field)
+        before = _field_value(previous, self.field)
+        if not isinstance(current, (int, float)) or not isinstance(before, (int, float)):
+            return False
+        rising = before < self.value <= current
+        falling = current < self.value <= before
+        if self.direction == "rising":
+            return rising
+        if self.direction == "falling":
+            return falling
+        return rising or falling
+
+
+class AllOf(MessageFilter):
+    """Match when every filter matches."""
+
+    def __init__(self, *filters: MessageFilter) -> None:
+        self.filters = filters
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        return all(f.matches(msg, previous) for f in self.filters)
+
+
+class AnyOf(MessageFilter):
+    """Match when at least one filter matches."""
+
+    def __init__(self, *filters: MessageFilter) -> None:
+        self.filters = filters
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        return any(f.matches(msg, previous) for f in self.filters)
+
+
+class Not(MessageFilter):
+    """Match when *inner* does not."""
+
+    def __init__(self, inner: MessageFilter) -> None:
+        self.inner = inner
+
+    def matches(self, msg: DeviceLogMessage, previous: DeviceLogMessage | None) -> bool:
+        return not self.inner.matches(msg, previous)
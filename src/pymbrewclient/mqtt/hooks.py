@@ -0,0 +1,171 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Instrumentation hooks around MQTT decoding and callback dispatch.
+
+Register a :class:`DispatchHook` with
+:meth:`MqttClient.add_hook <pymbrewclient.mqtt.client.MqttClient.add_hook>` to
+trace, time, or sample the client's message path.  Override only the methods
+you need; when no hook is registered the client skips all hook bookkeeping.
+
+Hooks run on the paho network thread, so they should be quick.  An exception
+raised by a hook is logged and otherwise ignored.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from .models import DeviceLogMessage, MqttMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_CALLBACK_THRESHOLD: float = 0.1
+
+
+def callback_name(callback: Callable[..., Any]) -> str:
+    """Return a readable name for *callback*, for logs and per-callback stats."""
+    name = getattr(callback, "__qualname__", None)
+    if name is None:
+        return repr(callback)
+    module = getattr(callback, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+class DispatchHook:
+    """Base class for dispatch hooks; every method is a no-op by default."""
+
+    def before_decode(self, msg: MqttMessage) -> None:
+        """Called before a device-log payload is decoded."""
+
+    def after_decode(self, msg: MqttMessage, decoded: DeviceLogMessage, seconds: float) -> None:
+        """Called after decoding, with the wall time it took."""
+
+    def before_callback(self, event: str, callback: Callable[..., Any], message: object) -> None:
+        """Called before each user callback.
+
+        :param event: The registration the callback came from, e.g. ``"on_device_log"``.
+        :param callback: The callback about to run.
+        :param message: Its argument, or ``None`` for argument-less events.
+        """
+
+    def after_callback(
+        self,
+        event: str,
+        callback: Callable[..., Any],
+        message: object,
+        seconds: float,
+        error: Exception | None,
+    ) -> None:
+        """Called after each user callback, with its run time and any exception it raised."""
+
+
+class SlowCallbackLogger(DispatchHook):
+    """Log a warning whenever a callback runs longer than *threshold* seconds.
+
+    :param threshold: Run time in seconds above which a callback is reported.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_SLOW_CALLBACK_THRESHOLD) -> None:
+        self.threshold = threshold
+
+    def after_callback(
+        self,
+        event: str,
+        callback: Callable[..., Any],
+        message: object,
+        seconds: float,
+        error: Exception | None,
+    ) -> None:
+        if seconds > self.threshold:
+            logger.warning("Slow %s callback %s took %.3f s", event, callback_name(callback), seconds)
+
+
+@dataclass(frozen=True)
+class CallbackStats:
+    """Accumulated run time for one callback."""
+
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float | None:
+        return self.total_seconds / self.calls if self.calls else None
+
+
+class CallbackTimer(DispatchHook):
+    """Accumulate call counts, errors, and run time per callback.
+
+    Use :meth:`stats` to find the subscriber that is slowing ingestion down.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, CallbackStats] = {}
+
+    def after_callback(
+        self,
+        event: str,
+        callback: Callable[..., Any],
+        message: object,
+        seconds: float,
+        error: Exception | None,
+    ) -> None:
+        key = f"{event}:{callback_name(callback)}"
+        with self._lock:
+            current = self._stats.get(key, CallbackStats())
+            self._stats[key] = CallbackStats(
+                calls=current.calls + 1,
+                errors=current.errors + (error is not None),
+                total_seconds=current.total_seconds + seconds,
+                max_seconds=max(current.max_seconds, seconds),
+            )
+
+    def stats(self) -> dict[str, CallbackStats]:
+        """Return ``{"event:callback": CallbackStats}``, slowest total first."""
+        with self._lock:
+            items = list(self._stats.items())
+        return dict(sorted(items, key=lambda item: item[1].total_seconds, reverse=True))
+
+    def reset(self) -> None:
+        """Forget all accumulated stats."""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,397 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Ingestion metrics for :class:`~pymbrewclient.mqtt.client.MqttClient`.
+
+:class:`MqttMetrics` counts messages, bytes, decode errors, and reconnects,
+and keeps fixed-bucket histograms of decode time, callback time, and
+end-to-end lag (``received_at`` minus ``device_timestamp``).  Read it with
+:meth:`MqttMetrics.snapshot`, render it with :func:`render_prometheus`, or
+serve it over HTTP with :class:`MetricsServer`.
+
+Counters are keyed by *topic family*: the message type for
+``devices/{type}/{uuid}`` topics (``"logs"``), otherwise the first topic level.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+
+from .models import DeviceLogMessage
+from .sequence import SequenceStats
+
+DURATION_BUCKETS: tuple[float, ...] = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+"""Upper bounds, in seconds, of the decode- and callback-time histograms."""
+
+LAG_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+"""Upper bounds, in seconds, of the end-to-end lag histogram."""
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def topic_family(topic: str) -> str:
+    """Return the metrics label for *topic* (``devices/logs/x`` → ``"logs"``)."""
+    parts = topic.split("/", 2)
+    if parts[0] == "devices" and len(parts) > 1:
+        return parts[1]
+    return parts[0]
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    """A point-in-time copy of one histogram."""
+
+    buckets: tuple[float, ...]
+    """Bucket upper bounds in seconds; an implicit ``+Inf`` bucket follows."""
+
+    counts: tuple[int, ...]
+    """Observations per bucket (not cumulative), one more entry than :attr:`buckets`."""
+
+    count: int = 0
+    sum: float = 0.0
+
+    @property
+    def mean(self) -> float | None:
+        """Mean observation, or ``None`` if nothing was observed."""
+        return self.sum / self.count if self.count else None
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(buckets=self.buckets, counts=tuple(self.counts), count=self.count, sum=self.sum)
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    """A point-in-time copy of an :class:`MqttMetrics`."""
+
+    received: dict[str, int] = field(default_factory=dict)
+    """Messages received per topic family (after duplicate suppression)."""
+
+    decoded: dict[str, int] = field(default_factory=dict)
+    """Messages decoded without error per topic family."""
+
+    decode_errors: dict[str, int] = field(default_factory=dict)
+    """Messages whose decode set ``decode_error``, per topic family."""
+
+    bytes_received: int = 0
+    reconnects: int = 0
+    connect_failures: int = 0
+    decode_time: HistogramSnapshot | None = None
+    callback_time: HistogramSnapshot | None = None
+    """Time spent dispatching one message to all callbacks and queues."""
+
+    lag: HistogramSnapshot | None = None
+    queue_depths: tuple[int, ...] = ()
+    """Current size of each :meth:`~pymbrewclient.mqtt.client.MqttClient.device_log_queue`."""
+
+    sequence: SequenceStats | None = None
+    """Sequence-tracking counters, or ``None`` when tracking is off."""
+
+
+class MqttMetrics:
+    """Thread-safe ingestion counters and histograms for one client.
+
+    :param queue_depths: Returns the current depth of each consumer queue.
+    :param sequence_stats: Returns the client's sequence counters, if tracked.
+    """
+
+    def __init__(
+        self,
+        queue_depths: Callable[[], Sequence[int]] | None = None,
+        sequence_stats: Callable[[], SequenceStats | None] | None = None,
+    ) -> None:
+        self._queue_depths = queue_depths
+        self._sequence_stats = sequence_stats
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._received: defaultdict[str, int] = defaultdict(int)
+        self._decoded: defaultdict[str, int] = defaultdict(int)
+        self._decode_errors: defaultdict[str, int] = defaultdict(int)
+        self._bytes_received = 0
+        self._reconnects = 0
+        self._connect_failures = 0
+        self._decode_time = _Histogram(DURATION_BUCKETS)
+        self._callback_time = _Histogram(DURATION_BUCKETS)
+        self._lag = _Histogram(LAG_BUCKETS)
+
+    def reset(self) -> None:
+        """Zero every counter and histogram."""
+        with self._lock:
+            self._reset()
+
+    def record_message(
+        self,
+        family: str,
+        size: int,
+        callback_seconds: float,
+        decode_seconds: float | None = None,
+        decoded: DeviceLogMessage | None = None,
+    ) -> None:
+        """Record one dispatched message; *decoded* is set for device logs."""
+        lag = None
+        if decoded is not None and decoded.device_timestamp is not None:
+            lag = (decoded.received_at - decoded.device_timestamp).total_seconds()
+        with self._lock:
+            self._received[family] += 1
+            self._bytes_received += size
+            self._callback_time.observe(callback_seconds)
+            if decoded is not None:
+                if decoded.decode_error:
+                    self._decode_errors[family] += 1
+                else:
+                    self._decoded[family] += 1
+            if decode_seconds is not None:
+                self._decode_time.observe(decode_seconds)
+            if lag is not None:
+                self._lag.observe(lag)
+
+    def record_deferred(self, callback_seconds: float, decode_seconds: float) -> None:
+        """Record a delivery a policy held back; the message itself was counted on receipt."""
+        with self._lock:
+            self._callback_time.observe(callback_seconds)
+            self._decode_time.observe(decode_seconds)
+
+    def record_reconnect(self) -> None:
+        with self._lock:
+            self._reconnects += 1
+
+    def record_connect_failure(self) -> None:
+        with self._lock:
+            self._connect_failures += 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Return a consistent copy of all metrics."""
+        queue_depths = tuple(self._queue_depths()) if self._queue_depths is not None else ()
+        sequence = self._sequence_stats() if self._sequence_stats is not None else None
+        with self._lock:
+            return MetricsSnapshot(
+                received=dict(self._received),
+                decoded=dict(self._decoded),
+                decode_errors=dict(self._decode_errors),
+                bytes_received=self._bytes_received,
+                reconnects=self._reconnects,
+                connect_failures=self._connect_failures,
+                decode_time=self._decode_time.snapshot(),
+                callback_time=self._callback_time.snapshot(),
+                lag=self._lag.snapshot(),
+                queue_depths=queue_depths,
+                sequence=sequence,
+            )
+
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition
+# ---------------------------------------------------------------------------
+
+_PREFIX = "pymbrewclient_mqtt"
+
+
+def escape_label_value(value: str) -> str:
+    """Escape *value* for use inside a quoted Prometheus label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_counter_family(lines: list[str], name: str, help_text: str, values: dict[str, int]) -> None:
+    lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {_PREFIX}_{name} counter")
+    for family, value in sorted(values.items()):
+        lines.append(f'{_PREFIX}_{name}{{family="{escape_label_value(family)}"}} {value}')
+
+
+def _render_scalar(lines: list[str], name: str, kind: str, help_text: str, value: float) -> None:
+    lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+    lines.append(f"{_PREFIX}_{name} {_format_value(value)}")
+
+
+def _render_histogram(lines: list[str], name: str, help_text: str, hist: HistogramSnapshot) -> None:
+    lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {_PREFIX}_{name} histogram")
+    cumulative = 0
+    for bound, count in zip(hist.buckets, hist.counts):
+        cumulative += count
+        lines.append(f'{_PREFIX}_{name}_bucket{{le="{bound!r}"}} {cumulative}')
+    lines.append(f'{_PREFIX}_{name}_bucket{{le="+Inf"}} {hist.count}')
+    lines.append(f"{_PREFIX}_{name}_sum {_format_value(hist.sum)}")
+    lines.append(f"{_PREFIX}_{name}_count {hist.count}")
+
+
+def render_prometheus(snapshot: MetricsSnapshot) -> str:
+    """Render *snapshot* in the Prometheus text exposition format (0.0.4)."""
+    lines: list[str] = []
+    _render_counter_family(lines, "messages_received_total", "MQTT messages received.", snapshot.received)
+    _render_counter_family(lines, "messages_decoded_total", "MQTT messages decoded.", snapshot.decoded)
+    _render_counter_family(lines, "decode_errors_total", "MQTT messages that failed to decode.", snapshot.decode_errors)
+    _render_scalar(lines, "bytes_received_total", "counter", "MQTT payload bytes received.", snapshot.bytes_received)
+    _render_scalar(lines, "reconnects_total", "counter", "MQTT reconnection attempts.", snapshot.reconnects)
+    _render_scalar(
+        lines, "connect_failures_total", "counter", "Failed MQTT connection attempts.", snapshot.connect_failures
+    )
+    for name, help_text, hist in (
+        ("decode_seconds", "Time spent decoding one message.", snapshot.decode_time),
+        ("callback_seconds", "Time spent dispatching one message to callbacks.", snapshot.callback_time),
+        ("lag_seconds", "Delay between the device timestamp and receipt.", snapshot.lag),
+    ):
+        if hist is not None:
+            _render_histogram(lines, name, help_text, hist)
+    if snapshot.queue_depths:
+        lines.append(f"# HELP {_PREFIX}_queue_depth Messages waiting in each device-log queue.")
+        lines.append(f"# TYPE {_PREFIX}_queue_depth gauge")
+        for index, depth in enumerate(snapshot.queue_depths):
+            lines.append(f'{_PREFIX}_queue_depth{{queue="{index}"}} {depth}')
+    if snapshot.sequence is not None:
+        for name in ("duplicates", "gaps", "reordered", "resets"):
+            _render_scalar(
+                lines,
+                f"sequence_{name}_total",
+                "counter",
+                f"Sequence {name} detected.",
+                getattr(snapshot.sequence, name),
+            )
+        _render_scalar(lines, "sequence_missing", "gauge", "Sequence numbers believed lost.", snapshot.sequence.missing)
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# HTTP endpoint
+# ---------------------------------------------------------------------------
+
+
+class MetricsServer:
+    """Serve ``/metrics`` in Prometheus text format from a background thread.
+
+    :param source: Returns the snapshot to render, e.g. ``metrics.snapshot``,
+        or already-rendered exposition text.
+    :param host: Interface to bind.
+    :param port: Port to bind; ``0`` picks a free one (see :attr:`port`).
+    """
+
+    def __init__(self, source: Callable[[], MetricsSnapshot | str], host: str = "127.0.0.1", port: int = 0) -> None:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                text = source()
+                body = (text if isinstance(text, str) else render_prometheus(text)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass  # keep scrapes out of stderr
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        """Start serving on a daemon thread; does nothing if already started."""
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mqtt-metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.stop()
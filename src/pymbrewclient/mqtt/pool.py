@@ -0,0 +1,418 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Sharded pool of MQTT connections for large device fleets.
+
+A single :class:`~pymbrewclient.mqtt.client.MqttClient` runs one WebSocket and
+one paho network thread for every subscription.  :class:`MqttClientPool`
+spreads device-log subscriptions over several connections, each with its own
+``client_id``, and delivers everything through one set of callbacks and
+queues.
+
+Devices are assigned to shards by consistent hashing on the device UUID, so
+adding or removing a shard only moves the devices that hash to it.  A moved
+device takes its shadow, sequence-tracking, and filter state with it; a message
+still in flight on the old connection may briefly start fresh state there.
+"""
+
+import bisect
+import hashlib
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from functools import partial
+from types import TracebackType
+
+from .client import (
+    ConnectedCallback,
+    DeviceLogCallback,
+    DisconnectedCallback,
+    ErrorCallback,
+    MqttClient,
+    RawMessageCallback,
+    SequenceEventCallback,
+    _put_latest,
+)
+from .delivery import DeliveryPolicy
+from .filters import MessageFilter
+from .models import DeviceLogMessage, MqttMessage
+from .shadow import DeviceShadow
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLICAS: int = 64
+"""Virtual nodes per shard on the hash ring; more replicas give a more even spread."""
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to node names."""
+
+    def __init__(self, replicas: int = DEFAULT_REPLICAS) -> None:
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        self._replicas = replicas
+        self._points: list[int] = []
+        self._owners: dict[int, str] = {}
+
+    def add(self, node: str) -> None:
+        """Place *node* on the ring."""
+        for replica in range(self._replicas):
+            point = _ring_hash(f"{node}#{replica}")
+            if point in self._owners:
+                continue
+            bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: str) -> None:
+        """Take *node* off the ring."""
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+
+    def owner(self, key: str) -> str:
+        """Return the node responsible for *key*.
+
+        :raises LookupError: If the ring is empty.
+        """
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self._points, _ring_hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def __len__(self) -> int:
+        return len(set(self._owners.values()))
+
+
+class MqttFanIn:
+    """Deliver messages from several :class:`MqttClient` connections through one interface.
+
+    Callbacks and queues registered here are registered on every attached
+    client, including clients attached after registration, so they run
+    through each client's own dispatch path (hooks, metrics, filters, and
+    delivery policies).  Nothing is registered on a client until a callback
+    is registered here.
+    """
+
+    def __init__(self) -> None:
+        self._attached: list[MqttClient] = []
+        self._registrations: list[Callable[[MqttClient], None]] = []
+        self._policies: list[DeliveryPolicy] = []
+        self._fan_in_lock = threading.Lock()
+
+    def _attach(self, client: MqttClient) -> None:
+        """Apply every registration made so far, and every later one, to *client*."""
+        with self._fan_in_lock:
+            self._attached.append(client)
+            registrations = list(self._registrations)
+        for register in registrations:
+            register(client)
+
+    def _detach(self, client: MqttClient) -> None:
+        """Stop applying new registrations to *client*."""
+        with self._fan_in_lock:
+            self._attached = [attached for attached in self._attached if attached is not client]
+
+    def _register(self, register: Callable[[MqttClient], None]) -> None:
+        with self._fan_in_lock:
+            self._registrations.append(register)
+            clients = list(self._attached)
+        for client in clients:
+            register(client)
+
+    def _client_for(self, msg: MqttMessage) -> MqttClient | None:
+        """Return the attached client subscribed to *msg*'s topic, falling back to the first one."""
+        with self._fan_in_lock:
+            clients = list(self._attached)
+        for client in clients:
+            if client.is_subscribed(msg.topic):
+                return client
+        return clients[0] if clients else None
+
+    def _deliver_deferred(self, callback: DeviceLogCallback, msg: MqttMessage) -> None:
+        """Deliver a message a shared delivery policy held back, via the client that received it."""
+        client = self._client_for(msg)
+        if client is not None:
+            client._deliver_deferred(callback, msg)
+
+    def _close_policies(self) -> None:
+        """Close the delivery policies registered here; call after disconnecting every client."""
+        for policy in self._policies:
+            policy.close()
+
+    def on_connected(self, callback: ConnectedCallback) -> None:
+        """Register a callback invoked whenever any attached client connects."""
+        self._register(lambda client: client.on_connected(callback))
+
+    def on_disconnected(self, callback: DisconnectedCallback) -> None:
+        """Register a callback invoked whenever any attached client loses its connection."""
+        self._register(lambda client: client.on_disconnected(callback))
+
+    def on_error(self, callback: ErrorCallback) -> None:
+        """Register a callback invoked for connection-level errors on any connection."""
+        self._register(lambda client: client.on_error(callback))
+
+    def on_message(self, callback: RawMessageCallback) -> None:
+        """Register a callback invoked for every raw message on any connection."""
+        self._register(lambda client: client.on_message(callback))
+
+    def on_device_log(
+        self,
+        callback: DeviceLogCallback,
+        policy: DeliveryPolicy | None = None,
+        where: MessageFilter | None = None,
+    ) -> None:
+        """Register a callback invoked for decoded device-log messages from any connection.
+
+        *policy* and *where* behave as for :meth:`MqttClient.on_device_log`.
+        The policy is shared by all connections; its per-device state follows
+        each device, since a device is served by one connection at a time.
+        """
+        if policy is not None:
+            policy.bind(partial(self._deliver_deferred, callback))
+            self._policies.append(policy)
+        self._register(lambda client: client._add_device_log_subscription(callback, policy, where))
+
+    def on_sequence_event(self, callback: SequenceEventCallback) -> None:
+        """Register a callback invoked for sequence anomalies on any connection."""
+        self._register(lambda client: client.on_sequence_event(callback))
+
+    def device_log_queue(
+        self,
+        maxsize: int = 1000,
+        policy: DeliveryPolicy | None = None,
+        where: MessageFilter | None = None,
+    ) -> "queue.Queue[DeviceLogMessage]":
+        """Return a queue receiving decoded device-log messages from every connection.
+
+        Like :meth:`MqttClient.device_log_queue`, the oldest message is
+        discarded when the queue is full.  *policy* and *where* behave as for
+        :meth:`on_device_log`.
+        """
+        q: queue.Queue[DeviceLogMessage] = queue.Queue(maxsize=maxsize)
+        self.on_device_log(lambda msg: _put_latest(q, msg), policy=policy, where=where)
+        return q
+
+
+class MqttClientPool(MqttFanIn):
+    """Spread device-log subscriptions over several :class:`MqttClient` connections.
+
+    Do not instantiate directly; use
+    :meth:`~pymbrewclient.client.BreweryClient.create_mqtt_pool` instead.
+
+    Example::
+
+        with client.create_mqtt_pool(shards=4) as pool:
+            pool.on_device_log(handle_log)
+            for device in client.get_devices():
+                pool.subscribe_device_logs(device.uuid)
+
+    Callbacks and queues registered on the pool receive messages from every
+    shard, including shards added later with :meth:`add_shard`.
+
+    :param client_factory: Zero-argument callable returning a new, unconnected
+        :class:`MqttClient`.  Called once per shard.
+    :param shards: Initial number of connections.
+    :param replicas: Virtual nodes per shard on the hash ring.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], MqttClient],
+        shards: int = 2,
+        replicas: int = DEFAULT_REPLICAS,
+    ) -> None:
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        super().__init__()
+        self._client_factory = client_factory
+        self._ring = HashRing(replicas=replicas)
+        self._shards: dict[str, MqttClient] = {}
+        self._device_qos: dict[str, int] = {}
+        self._assignments: dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._connected = False
+
+        for _ in range(shards):
+            self._create_shard()
+
+    # ------------------------------------------------------------------
+    # Shard management
+    # ------------------------------------------------------------------
+
+    def _create_shard(self) -> MqttClient:
+        shard = self._client_factory()
+        self._attach(shard)
+        self._shards[shard._client_id] = shard
+        self._ring.add(shard._client_id)
+        return shard
+
+    @property
+    def shards(self) -> list[MqttClient]:
+        """The pool's connections, in creation order."""
+        with self._lock:
+            return list(self._shards.values())
+
+    def add_shard(self) -> MqttClient:
+        """Add a connection and move the devices that now hash to it.
+
+        The new shard connects immediately if the pool is connected.
+        """
+        with self._lock:
+            shard = self._create_shard()
+            if self._connected:
+                shard.connect()
+            self._rebalance()
+        logger.debug("MQTT pool added shard %s (%d shards)", shard._client_id, len(self._shards))
+        return shard
+
+    def remove_shard(self, shard: MqttClient) -> None:
+        """Remove a connection, moving its devices to the remaining shards.
+
+        :raises ValueError: If *shard* is not in the pool or is the last shard.
+        """
+        with self._lock:
+            if shard._client_id not in self._shards:
+                raise ValueError("Shard is not part of this pool")
+            if len(self._shards) == 1:
+                raise ValueError("Cannot remove the last shard")
+            self._ring.remove(shard._client_id)
+            self._rebalance()
+            del self._shards[shard._client_id]
+            self._detach(shard)
+        if self._connected:
+            shard.disconnect()
+        logger.debug("MQTT pool removed shard %s (%d shards)", shard._client_id, len(self._shards))
+
+    def _rebalance(self) -> None:
+        """Move every device whose owner changed.  Caller holds the lock."""
+        moved = 0
+        for device_uuid, qos in self._device_qos.items():
+            owner = self._ring.owner(device_uuid)
+            current = self._assignments.get(device_uuid)
+            if owner == current:
+                continue
+            if current in self._shards:
+                previous = self._shards[current]
+                previous.unsubscribe_device_logs(device_uuid)
+                previous._transfer_device_state(device_uuid, self._shards[owner])
+            self._shards[owner].subscribe_device_logs(device_uuid, qos=qos)
+            self._assignments[device_uuid] = owner
+            moved += 1
+        if moved:
+            logger.debug("MQTT pool moved %d device subscription(s)", moved)
+
+    def shard_for(self, device_uuid: str) -> MqttClient:
+        """Return the connection responsible for *device_uuid*."""
+        with self._lock:
+            return self._shards[self._ring.owner(device_uuid)]
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe_device_logs(self, device_uuid: str, qos: int = 0) -> None:
+        """Subscribe to a device's telemetry on the shard that owns it.
+
+        :param device_uuid: Device serial number or UUID.
+        :param qos: Quality of Service level (0 or 1).
+        """
+        with self._lock:
+            self._device_qos[device_uuid] = qos
+            owner = self._ring.owner(device_uuid)
+            self._assignments[device_uuid] = owner
+            self._shards[owner].subscribe_device_logs(device_uuid, qos=qos)
+
+    def unsubscribe_device_logs(self, device_uuid: str) -> None:
+        """Unsubscribe from a device's telemetry.
+
+        :param device_uuid: Device serial number or UUID.
+        """
+        with self._lock:
+            self._device_qos.pop(device_uuid, None)
+            owner = self._assignments.pop(device_uuid, None)
+            if owner in self._shards:
+                self._shards[owner].unsubscribe_device_logs(device_uuid)
+
+    @property
+    def subscribed_devices(self) -> dict[str, MqttClient]:
+        """Map of subscribed device UUID to the shard serving it."""
+        with self._lock:
+            return {device_uuid: self._shards[owner] for device_uuid, owner in self._assignments.items()}
+
+    def shadow(self, device_uuid: str) -> DeviceShadow | None:
+        """Return the latest shadow for *device_uuid* from the shard serving it."""
+        return self.shard_for(device_uuid).shadow.get(device_uuid)
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+
+    def connect(self) -> None:
+        """Connect every shard.  Returns immediately, like :meth:`MqttClient.connect`."""
+        with self._lock:
+            self._connected = True
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.connect()
+
+    def disconnect(self) -> None:
+        """Disconnect every shard."""
+        with self._lock:
+            self._connected = False
+            shards = list(self._shards.values())
+        for shard in shards:
+            shard.disconnect()
+        self._close_policies()
+
+    def __enter__(self) -> "MqttClientPool":
+        self.connect()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.disconnect()
+
+    def __repr__(self) -> str:
+        return f"MqttClientPool(shards={len(self._shards)}, devices={len(self._device_qos)}, connected={self._connected!r})"
@@ -222,6 +222,55 @@ def _unwrap_telemetry(raw: dict[int, list[object]]) -> tuple[dict[int, list[obje
     return decode_raw_fields(nested), True
 
 
+def peek_envelope_header(data: bytes) -> tuple[int | None, int | None]:
+    """Return ``(sequence_number, session_id)`` from a live envelope without full decoding.
+
+    Only top-level fields are scanned; length-delimited bodies such as the
+    nested telemetry message are skipped, not decoded.  This is cheap enough
+    to run on every message before deciding whether to decode it at all.
+
+    :param data: Raw MQTT payload bytes.
+    :returns: The envelope's sequence number and session ID, or
+              ``(None, None)`` when the payload is not a live envelope or is
+              structurally invalid.
+    """
+    sequence_number: int | None = None
+    session_id: int | None = None
+    has_timestamp = False
+    has_telemetry = False
+    pos = 0
+    try:
+        while pos < len(data):
+            tag, pos = _decode_varint(data, pos)
+            field_number = tag >> 3
+            wire_type = tag & 0x7
+            if wire_type == _WIRE_VARINT:
+                value, pos = _decode_varint(data, pos)
+                if field_number == 1 and sequence_number is None:
+                    sequence_number = value
+                elif field_number == 4 and session_id is None:
+                    session_id = value
+                elif field_number == 5:
+                    has_timestamp = True
+            elif wire_type == _WIRE_LEN_DELIM:
+                length, pos = _decode_varint(data, pos)
+                pos += length
+                if field_number == 3:
+                    has_telemetry = True
+            elif wire_type == _WIRE_64BIT:
+                pos += 8
+            elif wire_type == _WIRE_32BIT:
+                pos += 4
+            else:
+                return None, None
+    except ValueError:
+        return None, None
+
+    if pos > len(data) or not (has_timestamp and has_telemetry):
+        return None, None
+    return sequence_number, session_id
+
+
 def decode_device_log(msg: MqttMessage) -> DeviceLogMessage:
     """Attempt to decode a ``devices/logs/`` MQTT message as a DeviceLog.
 
@@ -298,3 +347,84 @@ def decode_device_log(msg: MqttMessage) -> DeviceLogMessage:
         base.next_action_at = base.device_timestamp + timedelta(seconds=base.seconds_until_next_action)
 
     return base
+
+
+# ---------------------------------------------------------------------------
+# Synthetic encoder
+# ---------------------------------------------------------------------------
+
+
+def _encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a protobuf base-128 varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _encode_varint_field(field_number: int, value: int) -> bytes:
+    return _encode_varint(field_number << 3 | _WIRE_VARINT) + _encode_varint(value)
+
+
+def _encode_float32_field(field_number: int, value: float) -> bytes:
+    return _encode_varint(field_number << 3 | _WIRE_32BIT) + struct.pack("<f", value)
+
+
+def _encode_bytes_field(field_number: int, value: bytes) -> bytes:
+    return _encode_varint(field_number << 3 | _WIRE_LEN_DELIM) + _encode_varint(len(value)) + value
+
+
+def encode_device_log(
+    sequence_number: int,
+    session_id: int,
+    timestamp_ms: int,
+    current_state: int | None = None,
+    process_type: int | None = None,
+    process_state: int | None = None,
+    user_action: int | None = None,
+    current_temperature: float | None = None,
+    target_temperature: float | None = None,
+    measurements: dict[int, float] | None = None,
+    process_phase: int | None = None,
+    machine_type: int | None = None,
+    seconds_until_next_action: int | None = None,
+) -> bytes:
+    """Encode a live device-log envelope using the field layout documented above.
+
+    Intended for synthetic traffic (tests, benchmarks, and
+    :class:`~pymbrewclient.mqtt.broker.SyntheticPublisher`); the output
+    round-trips through :func:`decode_device_log`.  ``None`` fields are omitted.
+
+    :returns: The envelope payload bytes.
+    """
+    state = b""
+    for field_number, value in ((1, current_state), (2, process_type), (3, process_state), (8, user_action)):
+        if value is not None:
+            state += _encode_varint_field(field_number, value)
+
+    telemetry = _encode_varint_field(1, timestamp_ms)
+    if state:
+        telemetry += _encode_bytes_field(2, state)
+    for measurement_id, measurement_value in (measurements or {}).items():
+        entry = _encode_varint_field(1, int(measurement_id)) + _encode_float32_field(2, measurement_value)
+        telemetry += _encode_bytes_field(3, entry)
+    telemetry += _encode_varint_field(11, session_id)
+    if target_temperature is not None:
+        telemetry += _encode_float32_field(18, target_temperature)
+    if current_temperature is not None:
+        telemetry += _encode_float32_field(19, current_temperature)
+    if process_phase is not None:
+        telemetry += _encode_varint_field(21, process_phase)
+    if machine_type is not None:
+        telemetry += _encode_varint_field(22, machine_type)
+    if seconds_until_next_action is not None:
+        telemetry += _encode_varint_field(26, seconds_until_next_action)
+
+    return (
+        _encode_varint_field(1, sequence_number)
+        + _encode_bytes_field(3, telemetry)
+        + _encode_varint_field(4, session_id)
+        + _encode_varint_field(5, timestamp_ms)
+    )
@@ -0,0 +1,140 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Reconnect delay strategies for :class:`~pymbrewclient.mqtt.client.MqttClient`.
+
+paho-mqtt reconnects automatically from its network thread.  Before each wait
+the client asks its strategy for the next delay and hands it to paho, so the
+strategy fully controls the schedule.
+
+Strategies are stateless: the client passes in the attempt number and the
+previous delay.  One strategy instance can therefore be shared by many
+clients, e.g. every connection in a pool.
+
+When a broker restarts, every client disconnects at the same moment.  A fixed
+delay makes them all reconnect in lockstep; :class:`ExponentialBackoff` with
+jitter spreads the reconnects out.
+"""
+
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+
+class ReconnectStrategy(ABC):
+    """Base class for reconnect delay strategies."""
+
+    @abstractmethod
+    def next_delay(self, attempt: int, previous_delay: float | None) -> float:
+        """Return the number of seconds to wait before the next attempt.
+
+        :param attempt: Number of consecutive failed attempts since the last
+            successful connection (``0`` right after a connection drops).
+        :param previous_delay: The delay returned by the previous call for
+            this client, or ``None`` after a successful connection.
+        """
+
+
+class FixedDelay(ReconnectStrategy):
+    """Always wait the same number of seconds."""
+
+    def __init__(self, delay: float) -> None:
+        if delay < 0:
+            raise ValueError("delay must not be negative")
+        self.delay = delay
+
+    def next_delay(self, attempt: int, previous_delay: float | None) -> float:
+        return self.delay
+
+    def __repr__(self) -> str:
+        return f"FixedDelay(delay={self.delay!r})"
+
+
+class ExponentialBackoff(ReconnectStrategy):
+    """Exponential backoff capped at *cap* seconds, with optional jitter.
+
+    With ``jitter=True`` (the default) delays use "decorrelated jitter": each
+    delay is drawn uniformly from ``[base, previous * 3]`` and then capped.
+    Without jitter the delay doubles from *base* on every failed attempt.
+
+    :param base: Smallest delay, in seconds.
+    :param cap: Largest delay, in seconds.
+    :param jitter: Randomise delays so that many clients spread out.
+    :param rng: Random source, for reproducible schedules in tests.
+    """
+
+    def __init__(
+        self,
+        base: float = 1.0,
+        cap: float = 120.0,
+        jitter: bool = True,
+        rng: random.Random | None = None,
+    ) -> None:
+        if base <= 0:
+            raise ValueError("base must be positive")
+        if cap < base:
+            raise ValueError("cap must be at least base")
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+
+    def next_delay(self, attempt: int, previous_delay: float | None) -> float:
+        if self.jitter:
+            upper = (previous_delay or self.base) * 3
+            return min(self.cap, self._rng.uniform(self.base, upper))
+        return min(self.cap, self.base * 2 ** min(attempt, 32))
+
+    def __repr__(self) -> str:
+        return f"ExponentialBackoff(base={self.base!r}, cap={self.cap!r}, jitter={self.jitter!r})"
+
+
+@dataclass(frozen=True)
+class ConnectAttempt:
+    """Outcome of one connection attempt, passed to ``on_connect_attempt`` callbacks."""
+
+    attempt: int
+    """1-based attempt number since the last successful connection."""
+
+    succeeded: bool
+    """Whether the broker accepted the connection."""
+
+    latency: float | None
+    """Seconds from the start of the attempt until the broker answered or the attempt failed."""
+
+    reason: str | None = None
+    """Failure reason, if any.  Never contains credentials."""
@@ -0,0 +1,221 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Record raw MQTT traffic to disk and replay it without a broker.
+
+:class:`MqttRecorder` appends every :class:`~pymbrewclient.mqtt.models.MqttMessage`
+seen by an :class:`~pymbrewclient.mqtt.client.MqttClient` to a compact
+append-only file.  :class:`MqttReplay` reads such a file back and feeds it
+through the client's normal sequence-tracking, decode, and dispatch path,
+at the original pace, a multiple of it, or as fast as possible.
+
+File layout: the 5-byte magic ``PMBR\\x01`` followed by one record per message::
+
+    <int64 received_at (µs since epoch)> <uint16 topic length> <uint32 payload length>
+    <topic (UTF-8)> <payload>
+
+All integers are little-endian.  A truncated final record (e.g. after a crash)
+is ignored on replay.
+"""
+
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from os import PathLike
+from types import TracebackType
+
+from .client import MqttClient, _extract_device_uuid
+from .models import MqttMessage
+
+MAGIC: bytes = b"PMBR\x01"
+_RECORD_HEADER = struct.Struct("<qHI")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_micros(value: datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: int) -> datetime:
+    return datetime.fromtimestamp(value // 1_000_000, tz=timezone.utc).replace(microsecond=value % 1_000_000)
+
+
+class MqttRecorder:
+    """Append raw MQTT messages to a recording file.
+
+    Opening an existing recording appends to it.  Writes are buffered; call
+    :meth:`flush` or :meth:`close` (or use the recorder as a context manager)
+    to make sure everything reaches disk.
+
+    Messages are recorded as the client dispatches them, so duplicate
+    redeliveries dropped by sequence tracking are not recorded.
+
+    :param path: Path of the recording file.
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, "rb") as existing:
+                if existing.read(len(MAGIC)) != MAGIC:
+                    self._file.close()
+                    raise ValueError(f"{path!s} is not an MQTT recording")
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        """Number of messages written by this recorder."""
+        return self._count
+
+    @property
+    def closed(self) -> bool:
+        """``True`` once :meth:`close` has been called."""
+        return self._file.closed
+
+    def attach(self, client: MqttClient) -> None:
+        """Record every raw message *client* dispatches from now on.
+
+        Messages arriving after :meth:`close` are silently dropped.
+        """
+        client.on_message(self.write)
+
+    def write(self, msg: MqttMessage) -> None:
+        """Append one message to the recording."""
+        topic = msg.topic.encode("utf-8")
+        record = _RECORD_HEADER.pack(_to_micros(msg.received_at), len(topic), len(msg.payload))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(record)
+            self._file.write(topic)
+            self._file.write(msg.payload)
+            self._count += 1
+
+    def flush(self) -> None:
+        """Flush buffered records to disk."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the recording file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "MqttRecorder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class MqttReplay:
+    """Read back a recording made by :class:`MqttRecorder`.
+
+    Iterating yields the recorded :class:`~pymbrewclient.mqtt.models.MqttMessage`
+    objects in order; :meth:`replay` pushes them through a client.
+
+    :param path: Path of the recording file.
+    :raises ValueError: If the file is not an MQTT recording.
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        self._path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path!s} is not an MQTT recording")
+
+    def __iter__(self) -> Iterator[MqttMessage]:
+        header_size = _RECORD_HEADER.size
+        with open(self._path, "rb") as f:
+            f.seek(len(MAGIC))
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    return
+                micros, topic_len, payload_len = _RECORD_HEADER.unpack(header)
+                body = f.read(topic_len + payload_len)
+                if len(body) < topic_len + payload_len:
+                    return
+                topic = body[:topic_len].decode("utf-8")
+                yield MqttMessage(
+                    topic=topic,
+                    payload=body[topic_len:],
+                    received_at=_from_micros(micros),
+                    device_uuid=_extract_device_uuid(topic),
+                )
+
+    def replay(self, client: MqttClient, speed: float | None = None) -> int:
+        """Feed every recorded message through *client*'s dispatch path.
+
+        Registered callbacks, the device shadow, and sequence tracking see the
+        messages exactly as they would live, with the recorded ``received_at``.
+        The client does not need to be connected.
+
+        :param client: The client to dispatch through.
+        :param speed: ``None`` to replay as fast as possible, ``1.0`` for the
+            original pace, or any other positive multiple of it.
+        :returns: The number of messages replayed.
+        :raises ValueError: If *speed* is not positive.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        count = 0
+        first: datetime | None = None
+        started = time.monotonic()
+        for msg in self:
+            if speed is not None:
+                if first is None:
+                    first = msg.received_at
+                due = (msg.received_at - first).total_seconds() / speed
+                wait = due - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            client._handle_message(msg.topic, msg.payload, msg.received_at)
+            count += 1
+        return count
@@ -0,0 +1,252 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Incremental min/max/mean/last rollups of device-log telemetry.
+
+:class:`RollupEngine` folds every decoded message into fixed-size bucket rings
+per device, channel, and resolution (1 s, 1 min, and 1 h by default).  Each
+update is O(1) per channel and resolution; when a ring is full its oldest
+bucket is evicted, so memory stays bounded however long a fermentation runs.
+Rings grow as buckets fill rather than being allocated at full size, so a
+channel costs at most twice the memory of the buckets it holds (48 bytes per
+bucket) and never more than its configured capacity.
+Charts then read a few hundred pre-aggregated buckets instead of rescanning
+raw messages.
+
+Channels are the same as for :class:`~pymbrewclient.mqtt.timeseries.TimeSeriesStore`.
+Buckets are aligned to multiples of the resolution in epoch seconds, using
+``device_timestamp`` (falling back to ``received_at``).
+"""
+
+import math
+import threading
+from array import array
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+
+from .client import MqttClient
+from .models import DeviceLogMessage
+from .timeseries import Channel, _ArrayRing, channel_points, message_timestamp
+
+SECOND: int = 1
+MINUTE: int = 60
+HOUR: int = 3600
+
+DEFAULT_RESOLUTIONS: dict[int, int] = {SECOND: 3600, MINUTE: 1440, HOUR: 24 * 60}
+"""Buckets kept per resolution: one hour of seconds, one day of minutes, sixty days of hours."""
+
+_START, _MIN, _MAX, _SUM, _COUNT, _LAST = range(6)
+
+
+@dataclass(frozen=True)
+class RollupWindow:
+    """Aggregated buckets for one device channel at one resolution, oldest first.
+
+    All fields are parallel ``array('d')`` copies; ``start`` is the bucket's
+    start in epoch seconds.
+    """
+
+    resolution: int
+    start: array
+    min: array
+    max: array
+    mean: array
+    last: array
+    count: array
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+
+class _Rollup:
+    __slots__ = ("resolution", "ring")
+
+    def __init__(self, resolution: int, capacity: int) -> None:
+        self.resolution = resolution
+        self.ring = _ArrayRing(capacity, 6)
+
+    def add(self, timestamp: float, value: float) -> None:
+        ring = self.ring
+        start = math.floor(timestamp / self.resolution) * self.resolution
+        if len(ring):
+            newest = ring.key_at(-1)
+            if start < newest:
+                index = ring.lower_bound(start)
+                if index == len(ring) or ring.key_at(index) != start:
+                    return  # late point for an evicted or empty bucket
+                self._fold(ring.slot(index), value, is_latest=False)
+                return
+            if start == newest:
+                self._fold(ring.slot(-1), value, is_latest=True)
+                return
+        slot = ring.push()
+        columns = ring.columns  # push() may have grown the ring
+        columns[_START][slot] = start
+        columns[_MIN][slot] = value
+        columns[_MAX][slot] = value
+        columns[_SUM][slot] = value
+        columns[_COUNT][slot] = 1
+        columns[_LAST][slot] = value
+
+    def _fold(self, slot: int, value: float, is_latest: bool) -> None:
+        columns = self.ring.columns
+        if value < columns[_MIN][slot]:
+            columns[_MIN][slot] = value
+        if value > columns[_MAX][slot]:
+            columns[_MAX][slot] = value
+        columns[_SUM][slot] += value
+        columns[_COUNT][slot] += 1
+        if is_latest:
+            columns[_LAST][slot] = value
+
+    def window(self, since: float | None) -> RollupWindow:
+        ring = self.ring
+        first = 0 if since is None else ring.lower_bound(math.floor(since / self.resolution) * self.resolution)
+        out = [array("d") for _ in range(6)]
+        for begin, end in ring.segments(first):
+            for column, target in zip(ring.columns, out):
+                target.extend(column[begin:end])
+        starts, mins, maxs, sums, counts, lasts = out
+        means = array("d", (total / count for total, count in zip(sums, counts)))
+        return RollupWindow(self.resolution, starts, mins, maxs, means, lasts, counts)
+
+
+class RollupEngine:
+    """Per-device, per-channel rollups at several resolutions.
+
+    Example::
+
+        rollups = RollupEngine(phases=[ProcessPhase.FERM_PRIMARY, ProcessPhase.FERM_SECONDARY])
+        rollups.attach(mqtt)
+        ...
+        hourly = rollups.window(uuid, SensorType.TEMP_LIQUID, HOUR)
+        chart(hourly.start, hourly.mean)
+
+    :param resolutions: ``{bucket seconds: buckets kept}``; defaults to
+        :data:`DEFAULT_RESOLUTIONS`.
+    :param channels: Restrict to these channels; ``None`` rolls up every
+        measurement and temperature field.
+    :param phases: Only aggregate messages while the device is in one of these
+        :class:`~pymbrewclient.mqtt.enums.ProcessPhase` values.  The last
+        reported phase is remembered per device, since not every message
+        carries one.
+    """
+
+    def __init__(
+        self,
+        resolutions: Mapping[int, int] | None = None,
+        channels: Iterable[Channel] | None = None,
+        phases: Iterable[int] | None = None,
+    ) -> None:
+        resolutions = dict(resolutions if resolutions is not None else DEFAULT_RESOLUTIONS)
+        if not resolutions or any(r <= 0 or n < 1 for r, n in resolutions.items()):
+            raise ValueError("resolutions must map positive bucket sizes to positive capacities")
+        self.resolutions = dict(sorted(resolutions.items()))
+        self._channels = frozenset(channels) if channels is not None else None
+        self._phases = frozenset(phases) if phases is not None else None
+        self._lock = threading.Lock()
+        self._rollups: dict[str, dict[Channel, tuple[_Rollup, ...]]] = {}
+        self._phase: dict[str, int] = {}
+
+    def attach(self, client: MqttClient) -> None:
+        """Feed this engine from *client*'s decoded device logs."""
+        client.on_device_log(self.update)
+
+    def update(self, msg: DeviceLogMessage) -> None:
+        """Fold *msg* into every resolution of every channel it carries."""
+        device_uuid = msg.device_uuid
+        if device_uuid is None or msg.decode_error:
+            return
+        with self._lock:
+            if msg.process_phase is not None:
+                self._phase[device_uuid] = msg.process_phase
+            if self._phases is not None and self._phase.get(device_uuid) not in self._phases:
+                return
+            points = channel_points(msg, self._channels)
+            if not points:
+                return
+            timestamp = message_timestamp(msg)
+            channels = self._rollups.get(device_uuid)
+            if channels is None:
+                channels = self._rollups[device_uuid] = {}
+            for channel, value in points:
+                rollups = channels.get(channel)
+                if rollups is None:
+                    rollups = channels[channel] = tuple(_Rollup(r, n) for r, n in self.resolutions.items())
+                for rollup in rollups:
+                    rollup.add(timestamp, value)
+
+    def window(
+        self,
+        device_uuid: str,
+        channel: Channel,
+        resolution: int,
+        since: float | None = None,
+    ) -> RollupWindow | None:
+        """Copy the buckets of one device channel at *resolution*.
+
+        :param since: Epoch seconds; only buckets containing or after it are returned.
+        :returns: ``None`` if nothing was recorded for the channel.
+        :raises ValueError: If *resolution* is not configured.
+        """
+        if resolution not in self.resolutions:
+            raise ValueError(f"Resolution {resolution} s is not configured")
+        index = list(self.resolutions).index(resolution)
+        with self._lock:
+            rollups = self._rollups.get(device_uuid, {}).get(channel)
+            if rollups is None:
+                return None
+            return rollups[index].window(since)
+
+    def devices(self) -> list[str]:
+        with self._lock:
+            return list(self._rollups)
+
+    def channels(self, device_uuid: str) -> list[Channel]:
+        with self._lock:
+            return list(self._rollups.get(device_uuid, ()))
+
+    def discard(self, device_uuid: str) -> None:
+        """Drop every rollup for *device_uuid*."""
+        with self._lock:
+            self._rollups.pop(device_uuid, None)
+            self._phase.pop(device_uuid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rollups.clear()
+            self._phase.clear()
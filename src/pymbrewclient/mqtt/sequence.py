@@ -0,0 +1,248 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Per-device sequence-number tracking for live device-log envelopes.
+
+Live ``devices/logs/`` envelopes carry a per-device sequence number (envelope
+field 1).  :class:`SequenceTracker` uses it to:
+
+* drop duplicate redeliveries before they are decoded or dispatched,
+* detect gaps (lost telemetry) and out-of-order arrivals, and
+* recover from counter resets when a device reboots or starts a new session.
+
+Unwrapped telemetry payloads have no sequence number and are never tracked.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+
+DEFAULT_WINDOW: int = 256
+RESTART_FLOOR: int = 1
+"""A backward jump to a sequence number at or below this value is a counter restart, not a redelivery."""
+
+
+class SequenceEventKind(Enum):
+    """What a :class:`SequenceEvent` reports."""
+
+    DUPLICATE = "duplicate"
+    """The sequence number was already seen recently; the message was dropped."""
+
+    GAP = "gap"
+    """One or more sequence numbers were skipped."""
+
+    REORDERED = "reordered"
+    """An older, previously unseen sequence number arrived late."""
+
+    RESET = "reset"
+    """The counter restarted, after a reboot or a session change."""
+
+
+@dataclass(frozen=True)
+class SequenceEvent:
+    """An anomaly detected in a device's sequence numbers."""
+
+    kind: SequenceEventKind
+    device_uuid: str
+    sequence_number: int
+    expected: int | None = None
+    """The next sequence number the tracker expected, if it had one."""
+
+    missing: int = 0
+    """Number of sequence numbers skipped (``GAP`` events only)."""
+
+    session_id: int | None = None
+
+
+@dataclass(frozen=True)
+class SequenceStats:
+    """Sequence counters for one device or for all devices combined."""
+
+    received: int = 0
+    """Tracked messages seen, including duplicates."""
+
+    duplicates: int = 0
+    gaps: int = 0
+    missing: int = 0
+    """Sequence numbers currently believed lost (late arrivals are subtracted)."""
+
+    reordered: int = 0
+    resets: int = 0
+
+
+_COUNTERS = ("received", "duplicates", "gaps", "missing", "reordered", "resets")
+
+
+class _DeviceSequence:
+    __slots__ = ("session_id", "highest", "recent", "recent_order", *_COUNTERS)
+
+    def __init__(self, session_id: int | None, sequence_number: int, window: int) -> None:
+        self.session_id = session_id
+        self.highest = sequence_number
+        self.recent = {sequence_number}
+        self.recent_order: deque[int] = deque([sequence_number], maxlen=window)
+        self.received = 1
+        self.duplicates = 0
+        self.gaps = 0
+        self.missing = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def remember(self, sequence_number: int) -> None:
+        if len(self.recent_order) == self.recent_order.maxlen:
+            self.recent.discard(self.recent_order[0])
+        self.recent_order.append(sequence_number)
+        self.recent.add(sequence_number)
+
+    def restart(self, session_id: int | None, sequence_number: int) -> None:
+        if session_id is not None:
+            self.session_id = session_id
+        self.highest = sequence_number
+        self.recent = {sequence_number}
+        self.recent_order.clear()
+        self.recent_order.append(sequence_number)
+        self.resets += 1
+
+    def stats(self) -> SequenceStats:
+        return SequenceStats(**{name: getattr(self, name) for name in _COUNTERS})
+
+
+class SequenceTracker:
+    """Classify incoming sequence numbers per device.
+
+    A device that reboots may restart its counter without changing session.
+    Such a restart is recognised before duplicate detection, so the restarted
+    numbers are never mistaken for redeliveries: a backward jump of at least
+    *reset_threshold*, or to :data:`RESTART_FLOOR` or below, is a reset.
+
+    :param window: How many recent sequence numbers to remember per device for
+        duplicate detection.
+    :param reset_threshold: A sequence number this far *below* the highest
+        one seen is treated as a counter reset rather than a late arrival.
+        Defaults to, and is capped at, *window*: older numbers cannot be
+        recognised as duplicates anyway.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, reset_threshold: int | None = None) -> None:
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._window = window
+        self._reset_threshold = window if reset_threshold is None else min(reset_threshold, window)
+        self._devices: dict[str, _DeviceSequence] = {}
+        self._lock = threading.Lock()
+
+    def check(self, device_uuid: str, sequence_number: int, session_id: int | None = None) -> SequenceEvent | None:
+        """Record *sequence_number* for *device_uuid* and classify it.
+
+        :returns: A :class:`SequenceEvent` describing a duplicate, gap,
+                  reordering, or reset; ``None`` for an in-order message.
+        """
+        with self._lock:
+            state = self._devices.get(device_uuid)
+            if state is None:
+                self._devices[device_uuid] = _DeviceSequence(session_id, sequence_number, self._window)
+                return None
+
+            state.received += 1
+            expected = state.highest + 1
+
+            if session_id is not None and state.session_id is not None and session_id != state.session_id:
+                state.restart(session_id, sequence_number)
+                return SequenceEvent(
+                    SequenceEventKind.RESET, device_uuid, sequence_number, expected, session_id=session_id
+                )
+
+            behind = state.highest - sequence_number
+            if behind >= self._reset_threshold or sequence_number <= RESTART_FLOOR < behind:
+                state.restart(session_id, sequence_number)
+                return SequenceEvent(
+                    SequenceEventKind.RESET, device_uuid, sequence_number, expected, session_id=session_id
+                )
+
+            if sequence_number in state.recent:
+                state.duplicates += 1
+                return SequenceEvent(
+                    SequenceEventKind.DUPLICATE, device_uuid, sequence_number, expected, session_id=session_id
+                )
+
+            if sequence_number >= expected:
+                missing = sequence_number - expected
+                state.highest = sequence_number
+                state.remember(sequence_number)
+                if session_id is not None:
+                    state.session_id = session_id
+                if not missing:
+                    return None
+                state.gaps += 1
+                state.missing += missing
+                return SequenceEvent(
+                    SequenceEventKind.GAP, device_uuid, sequence_number, expected, missing, session_id=session_id
+                )
+
+            # A late arrival fills a gap reported earlier.
+            state.remember(sequence_number)
+            state.reordered += 1
+            state.missing = max(0, state.missing - 1)
+            return SequenceEvent(
+                SequenceEventKind.REORDERED, device_uuid, sequence_number, expected, session_id=session_id
+            )
+
+    def device_stats(self, device_uuid: str) -> SequenceStats:
+        """Return the counters for one device (all zero if never seen)."""
+        with self._lock:
+            state = self._devices.get(device_uuid)
+            return state.stats() if state is not None else SequenceStats()
+
+    def stats(self) -> SequenceStats:
+        """Return the counters summed over all devices."""
+        with self._lock:
+            states = list(self._devices.values())
+            return SequenceStats(**{name: sum(getattr(state, name) for state in states) for name in _COUNTERS})
+
+    def transfer(self, device_uuid: str, target: "SequenceTracker") -> None:
+        """Move *device_uuid*'s tracking state to *target*, e.g. when the device moves to another connection."""
+        with self._lock:
+            state = self._devices.pop(device_uuid, None)
+        if state is not None:
+            with target._lock:
+                target._devices[device_uuid] = state
+
+    def forget(self, device_uuid: str) -> None:
+        """Drop all tracking state for *device_uuid*."""
+        with self._lock:
+            self._devices.pop(device_uuid, None)
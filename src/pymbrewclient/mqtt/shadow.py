@@ -0,0 +1,241 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Latest-known device state ("device shadow") maintained from MQTT telemetry.
+
+:class:`~pymbrewclient.mqtt.client.MqttClient` feeds every decoded
+``devices/logs/`` message into a :class:`DeviceShadowStore`, so dashboards can
+read the most recent temperature, state, and measurements for a device without
+keeping their own copy or falling back to REST polling.
+
+Each :class:`DeviceShadow` is an immutable snapshot.  Updates replace the
+snapshot for a device rather than mutating it, so readers never take a lock
+and never observe a half-applied message.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .enums import SensorType
+from .models import DeviceLogMessage
+
+_MERGED_FIELDS = (
+    "device_timestamp",
+    "sequence_number",
+    "session_id",
+    "current_state",
+    "process_type",
+    "process_state",
+    "user_action",
+    "process_phase",
+    "machine_type",
+    "current_temperature",
+    "target_temperature",
+    "temp_control_power",
+    "seconds_until_next_action",
+    "next_action_at",
+)
+
+
+@dataclass(frozen=True)
+class DeviceShadow:
+    """Latest decoded state for one device, merged across device-log messages.
+
+    Fields absent from the most recent message keep their previous value, so a
+    shadow always reflects the last *reported* value of each field.  Treat
+    :attr:`measurements` as read-only; a new dict is built on every update.
+    """
+
+    device_uuid: str
+    """Device serial / UUID the shadow belongs to."""
+
+    updated_at: datetime
+    """Timezone-aware UTC datetime when the last merged message was received."""
+
+    message_count: int = 0
+    """Number of device-log messages merged into this shadow."""
+
+    device_timestamp: datetime | None = None
+    sequence_number: int | None = None
+    session_id: int | None = None
+    current_state: int | None = None
+    process_type: int | None = None
+    process_state: int | None = None
+    user_action: int | None = None
+    process_phase: int | None = None
+    machine_type: int | None = None
+    current_temperature: float | None = None
+    target_temperature: float | None = None
+    temp_control_power: float | None = None
+    seconds_until_next_action: int | None = None
+    next_action_at: datetime | None = None
+
+    measurements: dict[int, float] = field(default_factory=dict)
+    """Latest value for each measurement ID, keyed like :attr:`DeviceLogMessage.measurements`."""
+
+    def sensor(self, sensor_type: SensorType) -> float | None:
+        """Return the latest measurement for *sensor_type*, or ``None`` if never reported."""
+        return self.measurements.get(int(sensor_type))
+
+
+def _is_older(shadow: DeviceShadow, other: DeviceShadow) -> bool:
+    """Whether *shadow* reflects an earlier report than *other*, judged like :meth:`DeviceShadowStore.update`."""
+    if shadow.device_timestamp is not None and other.device_timestamp is not None:
+        return shadow.device_timestamp < other.device_timestamp
+    return shadow.updated_at < other.updated_at
+
+
+def _merge(older: DeviceShadow, newer: DeviceShadow) -> DeviceShadow:
+    """Combine two shadows of one device, preferring *newer*'s reported values."""
+    values = {}
+    for name in _MERGED_FIELDS:
+        value = getattr(newer, name)
+        values[name] = getattr(older, name) if value is None else value
+    return DeviceShadow(
+        device_uuid=newer.device_uuid,
+        updated_at=newer.updated_at,
+        message_count=older.message_count + newer.message_count,
+        measurements={**older.measurements, **newer.measurements},
+        **values,
+    )
+
+
+class DeviceShadowStore:
+    """Thread-safe map of device UUID to its latest :class:`DeviceShadow`.
+
+    Writers serialise on an internal lock; readers do not lock at all.  Reads
+    return immutable snapshots, so they are safe to hand to other threads.
+    """
+
+    def __init__(self) -> None:
+        self._shadows: dict[str, DeviceShadow] = {}
+        self._lock = threading.Lock()
+
+    def update(self, msg: DeviceLogMessage) -> DeviceShadow | None:
+        """Merge a decoded device-log message into the shadow for its device.
+
+        Messages without a device UUID or without any decoded telemetry are
+        ignored.  A message whose :attr:`~DeviceLogMessage.device_timestamp`
+        is older than the shadow's is also ignored, so late redeliveries never
+        roll the shadow back.
+
+        :param msg: A decoded :class:`~pymbrewclient.mqtt.models.DeviceLogMessage`.
+        :returns: The shadow after the update, or ``None`` when the message
+                  was ignored.
+        """
+        device_uuid = msg.device_uuid
+        if device_uuid is None or not msg.telemetry_fields:
+            return None
+
+        with self._lock:
+            previous = self._shadows.get(device_uuid)
+            if previous is None:
+                values = {name: getattr(msg, name) for name in _MERGED_FIELDS}
+                shadow = DeviceShadow(
+                    device_uuid=device_uuid,
+                    updated_at=msg.received_at,
+                    message_count=1,
+                    measurements=dict(msg.measurements),
+                    **values,
+                )
+            else:
+                if (
+                    previous.device_timestamp is not None
+                    and msg.device_timestamp is not None
+                    and msg.device_timestamp < previous.device_timestamp
+                ):
+                    return None
+                values = {}
+                for name in _MERGED_FIELDS:
+                    value = getattr(msg, name)
+                    values[name] = getattr(previous, name) if value is None else value
+                shadow = DeviceShadow(
+                    device_uuid=device_uuid,
+                    updated_at=msg.received_at,
+                    message_count=previous.message_count + 1,
+                    measurements={**previous.measurements, **msg.measurements},
+                    **values,
+                )
+            # A single key assignment is atomic, so lock-free readers see
+            # either the previous snapshot or this one.
+            self._shadows[device_uuid] = shadow
+        return shadow
+
+    def get(self, device_uuid: str) -> DeviceShadow | None:
+        """Return the latest shadow for *device_uuid*, or ``None`` if unseen."""
+        return self._shadows.get(device_uuid)
+
+    def snapshot(self) -> dict[str, DeviceShadow]:
+        """Return a point-in-time copy of all shadows keyed by device UUID."""
+        return dict(self._shadows)
+
+    def discard(self, device_uuid: str) -> None:
+        """Forget the shadow for *device_uuid*, if any."""
+        with self._lock:
+            self._shadows.pop(device_uuid, None)
+
+    def transfer(self, device_uuid: str, target: "DeviceShadowStore") -> None:
+        """Move the shadow for *device_uuid* to *target*, if there is one.
+
+        If *target* already has a shadow for the device, built from messages
+        that arrived there first, the two are merged and the newer one's
+        values win, so a move never rolls the shadow back.
+        """
+        with self._lock:
+            shadow = self._shadows.pop(device_uuid, None)
+        if shadow is None:
+            return
+        with target._lock:
+            current = target._shadows.get(device_uuid)
+            if current is not None:
+                if _is_older(shadow, current):
+                    shadow = _merge(shadow, current)
+                else:
+                    shadow = _merge(current, shadow)
+            target._shadows[device_uuid] = shadow
+
+    def clear(self) -> None:
+        """Forget all shadows."""
+        with self._lock:
+            self._shadows = {}
+
+    def __len__(self) -> int:
+        return len(self._shadows)
+
+    def __contains__(self, device_uuid: object) -> bool:
+        return device_uuid in self._shadows
@@ -0,0 +1,355 @@
+# "Commons Clause" License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, "Sell" means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Compact per-device time series fed by decoded device-log messages.
+
+:class:`TimeSeriesStore` keeps one fixed-capacity :class:`RingBuffer` per
+device and channel.  A ring stores timestamps and values in two
+``array('d')`` buffers (16 bytes per point), appends in amortised O(1),
+overwrites the oldest point when full, and answers window queries with
+zero-copy ``memoryview`` segments.  Buffers start small and double as points
+arrive, so a mostly idle channel costs a few hundred bytes rather than its
+full capacity.
+
+Channels are :class:`~pymbrewclient.mqtt.enums.SensorType` measurement IDs
+plus the ``current_temperature``, ``target_temperature``, and
+``temp_control_power`` message fields.  Points are timestamped with
+``device_timestamp`` (falling back to ``received_at``) in seconds since the
+epoch.
+
+The views returned by queries alias the live buffers: they stay valid, but
+their contents change as new points overwrite old ones, and a view taken
+before the ring grows no longer tracks it.  Copy them (for example with
+``.tolist()`` or :meth:`RingBuffer.to_numpy`) if ingestion continues while
+you read.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from .client import MqttClient
+from .models import DeviceLogMessage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_CAPACITY: int = 4096
+"""Points kept per device and channel (about 68 minutes at one point per second)."""
+
+INITIAL_ALLOCATION: int = 16
+"""Points allocated when a ring is created; it doubles up to its capacity as it fills."""
+
+FIELD_CHANNELS: tuple[str, ...] = ("current_temperature", "target_temperature", "temp_control_power")
+"""Message attributes recorded as channels alongside the measurement IDs."""
+
+Channel = str | int
+Segment = tuple[memoryview, memoryview]
+"""A contiguous ``(timestamps, values)`` slice of a ring buffer."""
+
+
+def message_timestamp(msg: DeviceLogMessage) -> float:
+    """Epoch seconds of *msg*: its ``device_timestamp``, else ``received_at``."""
+    return (msg.device_timestamp or msg.received_at).timestamp()
+
+
+def channel_points(msg: DeviceLogMessage, wanted: frozenset[Channel] | None = None) -> list[tuple[Channel, float]]:
+    """Return ``(channel, value)`` for every channel present in *msg* (and in *wanted*, if given)."""
+    points: list[tuple[Channel, float]] = [
+        (channel, value) for channel, value in msg.measurements.items() if wanted is None or channel in wanted
+    ]
+    for name in FIELD_CHANNELS:
+        value = getattr(msg, name)
+        if value is not None and (wanted is None or name in wanted):
+            points.append((name, value))
+    return points
+
+
+class _ArrayRing:
+    """Bounded ring over parallel ``array('d')`` columns.
+
+    Column 0 holds the sort key (timestamps or bucket starts), which callers
+    append in non-decreasing order; that makes it binary-searchable.
+
+    The columns start at :data:`INITIAL_ALLOCATION` entries and double until
+    they reach *capacity*.  The ring only wraps once it is full, so while it
+    grows the entries are always ``0..size`` and growing is a plain copy.
+    """
+
+    __slots__ = ("capacity", "columns", "_start", "_size")
+
+    def __init__(self, capacity: int, column_count: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        allocated = min(capacity, INITIAL_ALLOCATION)
+        self.columns = tuple(array("d", bytes(8 * allocated)) for _ in range(column_count))
+        self._start = 0
+        self._size = 0
+
+    @property
+    def allocated(self) -> int:
+        """Entries currently allocated per column."""
+        return len(self.columns[0])
+
+    def _grow(self) -> None:
+        # Replace rather than extend the columns: arrays cannot be resized while
+        # a memoryview from an earlier query is still alive.
+        extra = bytes(8 * (min(self.capacity, 2 * self.allocated) - self.allocated))
+        self.columns = tuple(column + array("d", extra) for column in self.columns)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def slot(self, index: int) -> int:
+        """Physical slot of logical *index* (0 = oldest); negative indexes count from the newest."""
+        if index < 0:
+            index += self._size
+        return (self._start + index) % self.capacity
+
+    def push(self) -> int:
+        """Claim the next slot, evicting the oldest entry when full, and return it."""
+        if self._size < self.capacity:
+            slot = self._size
+            if slot == self.allocated:
+                self._grow()
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        return slot
+
+    def key_at(self, index: int) -> float:
+        return self.columns[0][self.slot(index)]
+
+    def lower_bound(self, key: float) -> int:
+        """Logical index of the first entry whose key is ``>= key``."""
+        keys = self.columns[0]
+        start, size, capacity = self._start, self._size, self.capacity
+        wrapped = start + size - capacity
+        if wrapped <= 0:
+            return bisect_left(keys, key, start, start + size) - start
+        # The oldest part runs from start to the end of the buffer, the rest wraps to slot 0.
+        if key <= keys[capacity - 1]:
+            return bisect_left(keys, key, start, capacity) - start
+        return capacity - start + bisect_left(keys, key, 0, wrapped)
+
+    def segments(self, first: int = 0) -> list[tuple[int, int]]:
+        """Physical ``(begin, end)`` slot ranges covering logical indexes ``first..len``."""
+        if first >= self._size:
+            return []
+        begin = (self._start + first) % self.capacity
+        end = begin + self._size - first
+        if end <= self.capacity:
+            return [(begin, end)]
+        return [(begin, self.capacity), (0, end - self.capacity)]
+
+
+class RingBuffer:
+    """Timestamped values for one device channel.
+
+    :param capacity: Maximum number of points kept.
+    """
+
+    __slots__ = ("_ring",)
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self._ring = _ArrayRing(capacity, 2)
+
+    @property
+    def capacity(self) -> int:
+        return self._ring.capacity
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """Add a point in O(1).
+
+        :returns: ``False`` (and stores nothing) if *timestamp* is older than
+            the newest point, so the buffer stays sorted.
+        """
+        ring = self._ring
+        if len(ring) and timestamp < ring.key_at(-1):
+            return False
+        slot = ring.push()
+        timestamps, values = ring.columns
+        timestamps[slot] = timestamp
+        values[slot] = value
+        return True
+
+    def latest(self) -> tuple[float, float] | None:
+        """The newest ``(timestamp, value)``, or ``None`` when empty."""
+        if not len(self._ring):
+            return None
+        slot = self._ring.slot(-1)
+        timestamps, values = self._ring.columns
+        return timestamps[slot], values[slot]
+
+    def window(self, since: float | None = None, last: int | None = None) -> list[Segment]:
+        """Return the selected points as one or two zero-copy segments, oldest first.
+
+        :param since: Keep points with ``timestamp >= since``.
+        :param last: Keep at most the newest *last* points.
+        """
+        ring = self._ring
+        first = 0 if since is None else ring.lower_bound(since)
+        if last is not None:
+            first = max(first, len(ring) - last)
+        timestamps, values = (memoryview(column) for column in ring.columns)
+        return [(timestamps[begin:end], values[begin:end]) for begin, end in ring.segments(first)]
+
+    def to_lists(self, since: float | None = None, last: int | None = None) -> tuple[list[float], list[float]]:
+        """Copy the selected points into ``(timestamps, values)`` lists."""
+        timestamps: list[float] = []
+        values: list[float] = []
+        for ts, vs in self.window(since, last):
+            timestamps.extend(ts.tolist())
+            values.extend(vs.tolist())
+        return timestamps, values
+
+    def to_numpy(self, since: float | None = None, last: int | None = None) -> tuple["np.ndarray", "np.ndarray"]:
+        """Copy the selected points into two NumPy ``float64`` arrays.
+
+        :raises ImportError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("RingBuffer.to_numpy() requires numpy (pip install pymbrewclient[numpy])")
+        segments = self.window(since, last)
+        if not segments:
+            return np.empty(0), np.empty(0)
+        return (
+            np.concatenate([np.frombuffer(ts, dtype=np.float64) for ts, _ in segments]),
+            np.concatenate([np.frombuffer(vs, dtype=np.float64) for _, vs in segments]),
+        )
+
+
+class TimeSeriesStore:
+    """Per-device, per-channel ring buffers fed by :meth:`update`.
+
+    Register it as a device-log callback (or use :meth:`attach`)::
+
+        series = TimeSeriesStore(capacity=7200)
+        series.attach(mqtt)
+        ...
+        for timestamps, values in series.window(uuid, SensorType.TEMP_LIQUID, seconds=600):
+            chart.extend(timestamps, values)
+
+    :param capacity: Points kept per device and channel.
+    :param channels: Restrict recording to these channels; ``None`` records
+        every measurement and :data:`FIELD_CHANNELS`.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, channels: Iterable[Channel] | None = None) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._channels = frozenset(channels) if channels is not None else None
+        self._lock = threading.Lock()
+        self._devices: dict[str, dict[Channel, RingBuffer]] = {}
+
+    def attach(self, client: MqttClient) -> None:
+        """Feed this store from *client*'s decoded device logs."""
+        client.on_device_log(self.update)
+
+    def update(self, msg: DeviceLogMessage) -> None:
+        """Record every channel present in *msg*."""
+        if msg.device_uuid is None or msg.decode_error:
+            return
+        points = channel_points(msg, self._channels)
+        if not points:
+            return
+        timestamp = message_timestamp(msg)
+        with self._lock:
+            channels = self._devices.get(msg.device_uuid)
+            if channels is None:
+                channels = self._devices[msg.device_uuid] = {}
+            for channel, value in points:
+                ring = channels.get(channel)
+                if ring is None:
+                    ring = channels[channel] = RingBuffer(self.capacity)
+                ring.append(timestamp, value)
+
+    def devices(self) -> list[str]:
+        """Devices with at least one recorded point."""
+        with self._lock:
+            return list(self._devices)
+
+    def channels(self, device_uuid: str) -> list[Channel]:
+        """Channels recorded for *device_uuid*."""
+        with self._lock:
+            return list(self._devices.get(device_uuid, ()))
+
+    def series(self, device_uuid: str, channel: Channel) -> RingBuffer | None:
+        """The ring buffer for one device channel, or ``None`` if nothing was recorded."""
+        with self._lock:
+            return self._devices.get(device_uuid, {}).get(channel)
+
+    def window(
+        self,
+        device_uuid: str,
+        channel: Channel,
+        seconds: float | None = None,
+        last: int | None = None,
+    ) -> list[Segment]:
+        """Zero-copy segments for the newest *seconds* of data and/or *last* points.
+
+        *seconds* is measured back from the channel's newest timestamp, so
+        replayed or delayed data works the same as live data.
+        """
+        ring = self.series(device_uuid, channel)
+        if ring is None:
+            return []
+        since = None
+        if seconds is not None:
+            newest = ring.latest()
+            if newest is None:
+                return []
+            since = newest[0] - seconds
+        return ring.window(since=since, last=last)
+
+    def discard(self, device_uuid: str) -> None:
+        """Drop all series for *device_uuid*."""
+        with self._lock:
+            self._devices.pop(device_uuid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._devices.clear()
@@ -35,24 +35,38 @@
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
 import logging
+import threading
 import time
 from typing import Any
 
 import requests
 
-from .models import BreweryOverview, Device, Session, TokenResponse, UserProfile, coerce_device_payload
+from .models import BreweryOverview, Device, Session, TokenResponse, UserProfile, coerce_device_payloads
 
 logger = logging.getLogger(__name__)
 
+TOKEN_REFRESH_MARGIN: int = 60
+"""Seconds before expiry at which :meth:`RestApiClient.get_valid_token` renews the token."""
+
 
 class RestApiClient:
-    def __init__(self, username: str, password: str, base_url: str, headers: dict[str, str] | None = None) -> None:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        session: requests.Session | None = None,
+    ) -> None:
         """
         Initialize the REST API client for mbrewclient.
 
         :param base_url: The base URL for the API.
         :param username: The username for the Minibrew Pro Portal.
         :param password: The password for the Minibrew Pro Portal.
+        :param session: Optional :class:`requests.Session` to reuse pooled
+            connections across requests.  Without one, each request opens a
+            new connection.
         """
         self.base_url = base_url.rstrip("/")
         self.username = username
@@ -62,6 +76,9 @@ class RestApiClient:
             self.headers.update(headers)
         self.token = None
         self.token_expiry = 0
+        # Serialises token refreshes between the MQTT credential provider, pool shards, and fleet workers.
+        self._token_lock = threading.Lock()
+        self._http = session if session is not None else requests
 
     def _get_token(self) -> TokenResponse:
         """
@@ -128,7 +145,34 @@ class RestApiClient:
         """
         logger.debug("Ensuring token is valid...")
         if not self._is_token_valid():
-            self._get_token()
+            with self._token_lock:
+                if not self._is_token_valid():
+                    self._get_token()
+
+    def get_valid_token(self) -> str:
+        """
+        Return a token that stays valid for at least :data:`TOKEN_REFRESH_MARGIN` seconds.
+
+        A new token is fetched when the current one is missing or about to
+        expire; concurrent callers share a single refresh.  Suitable as a credential provider for
+        :class:`~pymbrewclient.mqtt.client.MqttClient`.
+
+        :return: The current API token.  **Never log this value.**
+        """
+        if self._token_expiring():
+            with self._token_lock:
+                if self._token_expiring():
+                    logger.debug("Token missing or close to expiry, renewing...")
+                    self._get_token()
+        return self.token
+
+    def _token_expiring(self) -> bool:
+        return self.token is None or time.time() + TOKEN_REFRESH_MARGIN >= self.token_expiry
+
+    def close(self) -> None:
+        """Close the pooled HTTP session, if the client was given one."""
+        if isinstance(self._http, requests.Session):
+            self._http.close()
 
     def get(self, endpoint: str, params: dict[str, Any] | None = None, ensure_token: bool = True) -> requests.Response:
         """
@@ -143,7 +187,7 @@ class RestApiClient:
             self._ensure_token()
 
         url = f"{self.base_url}/{endpoint}/"
-        response = requests.get(url, params=params, headers=self.headers)
+        response = self._http.get(url, params=params, headers=self.headers)
         response.raise_for_status()
         return response
 
@@ -166,7 +210,7 @@ class RestApiClient:
         safe_json = self._mask_sensitive_payload(json)
         logger.debug(f"POST request to {endpoint} with data: {safe_data}, json: {safe_json}")
         url = f"{self.base_url}/{endpoint}/"
-        response = requests.post(url, headers=headers, data=data, json=json)
+        response = self._http.post(url, headers=headers, data=data, json=json)
         response.raise_for_status()
         return response
 
@@ -184,7 +228,7 @@ class RestApiClient:
         """Fetch devices from the API."""
         logger.debug("Fetching devices...")
         response = self.get("v1/devices")
-        return [coerce_device_payload(device) for device in response.json()]
+        return coerce_device_payloads(response.json())
 
     def get_session_info(self, sessionid: int) -> Session:
         """
@@ -34,15 +34,16 @@
 # SOFTWARE.
 #
 # Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
-from dataclasses import asdict, dataclass, fields
-from datetime import datetime, timedelta, timezone
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import MISSING, dataclass, fields
+from datetime import datetime, timezone
+from sys import intern
 
 
 def parse_api_datetime(value: str | None) -> datetime | None:
     """Parse an API timestamp into a timezone-aware datetime."""
     if value in (None, ""):
         return None
-
     normalized_value = value.replace("Z", "+00:00")
     parsed_value = datetime.fromisoformat(normalized_value)
     if parsed_value.tzinfo is None:
@@ -50,10 +51,13 @@ def parse_api_datetime(value: str | None) -> datetime | None:
     return parsed_value
 
 
+class _SerializedCache:
+    __slots__ = ("_serialized",)
+
+
 def format_duration(total_seconds: int) -> str:
     """Format seconds as H:MM:SS."""
-    duration = timedelta(seconds=total_seconds)
-    hours, remainder = divmod(int(duration.total_seconds()), 3600)
+    hours, remainder = divmod(int(total_seconds), 3600)
     minutes, seconds = divmod(remainder, 60)
     return f"{hours}:{minutes:02d}:{seconds:02d}"
 
@@ -67,8 +71,15 @@ def datetime_to_api_string(value: datetime | None) -> str | None:
     return utc_value.isoformat().replace("+00:00", "Z")
 
 
-@dataclass
-class Device:
+@dataclass(slots=True)
+class Device(_SerializedCache):
+    """A MiniBrew device as returned by the REST API.
+
+    Instances are slotted to keep large fleets compact, and repeated strings
+    such as ``software_version`` and ``stage`` are interned.  Timestamp fields
+    accept API strings, which are parsed when assigned.
+    """
+
     uuid: str
     serial_number: str | None = None
     current_state: int | None = None
@@ -103,18 +114,16 @@ class Device:
     is_starting: bool | None = None
 
     def __post_init__(self) -> None:
-        if isinstance(self.last_time_online, str):
-            self.last_time_online = parse_api_datetime(self.last_time_online)
-        if isinstance(self.last_process_state_change, str):
-            self.last_process_state_change = parse_api_datetime(self.last_process_state_change)
-        if isinstance(self.process_estimate_remaining, str):
-            self.process_estimate_remaining = parse_api_datetime(self.process_estimate_remaining)
-
         if self.active_session is None and self.session_id is not None:
             self.active_session = self.session_id
         if self.session_id is None and self.active_session is not None:
             self.session_id = self.active_session
 
+        for name in _DEVICE_INTERNED_FIELDS:
+            value = getattr(self, name)
+            if type(value) is str:
+                object.__setattr__(self, name, intern(value))
+
     def get_process_estimate_remaining_seconds(self, current_time: datetime | None = None) -> int | None:
         """Return a local snapshot of the estimated remaining time in seconds."""
         if self.process_estimate_remaining is None:
@@ -143,41 +152,102 @@ class Device:
         """Format the locally calculated remaining time as H:MM:SS."""
         return self.get_process_estimate_remaining_formatted()
 
-    def to_dict(self) -> dict[str, object]:
-        """Return a JSON-serializable dictionary representation."""
-        data = asdict(self)
-        data["last_time_online"] = datetime_to_api_string(self.last_time_online)
-        data["last_process_state_change"] = datetime_to_api_string(self.last_process_state_change)
-        data["process_estimate_remaining"] = datetime_to_api_string(self.process_estimate_remaining)
-        data["process_estimate_remaining_seconds"] = self.process_estimate_remaining_seconds
-        data["process_estimate_remaining_formatted"] = self.process_estimate_remaining_formatted
+    def __setattr__(self, name: str, value: object) -> None:
+        if name in _DEVICE_DATETIME_FIELDS and type(value) is str:
+            value = parse_api_datetime(value)
+        object.__setattr__(self, name, value)
+        if name in _DEVICE_FIELD_SET:
+            object.__setattr__(self, "_serialized", None)
+
+    def _serialized_fields(self) -> dict[str, object]:
+        """Return the cached time-independent part of :meth:`to_dict`; treat it as read-only."""
+        serialized = self._serialized
+        if serialized is None:
+            serialized = {name: getattr(self, name) for name in DEVICE_FIELDS}
+            for name in _DEVICE_DATETIME_FIELDS:
+                serialized[name] = datetime_to_api_string(serialized[name])
+            object.__setattr__(self, "_serialized", serialized)
+        return serialized
+
+    def to_dict(self, current_time: datetime | None = None) -> dict[str, object]:
+        """Return a JSON-serializable dictionary representation.
+
+        The field values are serialized once and cached until a field is
+        assigned; the remaining-time estimates are recomputed on every call.
+
+        :param current_time: Instant the remaining time is measured from;
+            defaults to now.
+        """
+        data = dict(self._serialized_fields())
+        remaining_seconds = self.get_process_estimate_remaining_seconds(current_time)
+        data["process_estimate_remaining_seconds"] = remaining_seconds
+        data["process_estimate_remaining_formatted"] = (
+            None if remaining_seconds is None else format_duration(remaining_seconds)
+        )
         return data
 
     def __getitem__(self, key: str) -> object:
-        """Provide dict-like field access for backward compatibility."""
-        return self.to_dict()[key]
+        """Provide dict-like field access for backward compatibility.
+
+        Reads the one requested value, as it would appear in :meth:`to_dict`.
+        """
+        if key in _DEVICE_DATETIME_FIELDS:
+            return datetime_to_api_string(getattr(self, key))
+        if key in _DEVICE_FIELD_SET or key in _DEVICE_DERIVED_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
 
     def __contains__(self, key: object) -> bool:
         """Provide dict-like membership checks for backward compatibility."""
-        return isinstance(key, str) and key in self.to_dict()
+        return isinstance(key, str) and (key in _DEVICE_FIELD_SET or key in _DEVICE_DERIVED_FIELDS)
 
     def get(self, key: str, default: object = None) -> object:
         """Provide dict-like get access for backward compatibility."""
-        return self.to_dict().get(key, default)
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+DEVICE_FIELDS: tuple[str, ...] = tuple(field.name for field in fields(Device))
+"""Names of the :class:`Device` fields, in declaration order."""
+
+_DEVICE_FIELD_SET: frozenset[str] = frozenset(DEVICE_FIELDS)
+_DEVICE_DATETIME_FIELDS: frozenset[str] = frozenset(
+    {"last_time_online", "last_process_state_change", "process_estimate_remaining"}
+)
+_DEVICE_DERIVED_FIELDS: frozenset[str] = frozenset(
+    {"process_estimate_remaining_seconds", "process_estimate_remaining_formatted"}
+)
+_DEVICE_INTERNED_FIELDS: tuple[str, ...] = ("software_version", "stage", "image", "beer_style")
+
+# Raw slot setters, bypassing __setattr__ for payload construction.
+_DEVICE_SLOT_SETTERS: tuple[tuple[str, Callable[[Device, object], None]], ...] = tuple(
+    (name, Device.__dict__[name].__set__) for name in DEVICE_FIELDS
+)
+_set_serialized_slot = _SerializedCache.__dict__["_serialized"].__set__
 
 
 @dataclass
 class BreweryOverview:
+    """Devices grouped the way the brewery overview endpoint groups them.
+
+    A device that appears with identical data in several groups is the same
+    :class:`Device` instance in each, so copy it before mutating.
+    """
+
     brew_clean_idle: list[Device]
     fermenting: list[Device]
     serving: list[Device]
     brew_acid_clean_idle: list[Device]
 
     def __post_init__(self) -> None:
-        self.brew_clean_idle = _coerce_device_list(self.brew_clean_idle)
-        self.fermenting = _coerce_device_list(self.fermenting)
-        self.serving = _coerce_device_list(self.serving)
-        self.brew_acid_clean_idle = _coerce_device_list(self.brew_acid_clean_idle)
+        # A device listed identically in several buckets becomes one shared instance.
+        seen: dict[str, tuple[Device | dict[str, object], Device]] = {}
+        self.brew_clean_idle = _coerce_device_list(self.brew_clean_idle, seen)
+        self.fermenting = _coerce_device_list(self.fermenting, seen)
+        self.serving = _coerce_device_list(self.serving, seen)
+        self.brew_acid_clean_idle = _coerce_device_list(self.brew_acid_clean_idle, seen)
 
 
 @dataclass
@@ -287,15 +357,71 @@ class ApiResponse:
     message: str | None
 
 
-def coerce_device_payload(device: Device | dict[str, object]) -> Device:
-    """Convert device dictionaries into Device objects while filtering unknown fields."""
-    if isinstance(device, Device):
-        return device
+_DEVICE_DEFAULTS: dict[str, object] = {
+    field.name: field.default for field in fields(Device) if field.default is not MISSING
+}
+
+
+def _device_from_payload(payload: Mapping[str, object]) -> Device:
+    """Build a Device from an API dict without going through ``__init__``.
+
+    Equivalent to ``Device(**known_fields)``: defaults are filled in, unknown
+    keys dropped, session IDs mirrored, strings interned, and timestamps parsed.
+    """
+    values = dict(_DEVICE_DEFAULTS)
+    for key, value in payload.items():
+        if key in _DEVICE_FIELD_SET:
+            values[key] = value
+    if "uuid" not in values:
+        raise TypeError("Device payload is missing required field 'uuid'")
+    if values["active_session"] is None:
+        values["active_session"] = values["session_id"]
+    elif values["session_id"] is None:
+        values["session_id"] = values["active_session"]
+    for name in _DEVICE_INTERNED_FIELDS:
+        value = values[name]
+        if type(value) is str:
+            values[name] = intern(value)
+    for name in _DEVICE_DATETIME_FIELDS:
+        value = values[name]
+        if type(value) is str:
+            values[name] = parse_api_datetime(value)
+
+    device = object.__new__(Device)
+    for name, set_slot in _DEVICE_SLOT_SETTERS:
+        set_slot(device, values[name])
+    _set_serialized_slot(device, None)
+    return device
 
-    device_field_names = {field.name for field in fields(Device)}
-    filtered_device = {key: value for key, value in device.items() if key in device_field_names}
-    return Device(**filtered_device)
 
+def coerce_device_payload(device: Device | dict[str, object]) -> Device:
+    """Convert device dictionaries into Device objects while filtering unknown fields.
 
-def _coerce_device_list(devices: list[Device] | list[dict[str, object]]) -> list[Device]:
-    return [coerce_device_payload(device) for device in devices]
+    :param device: A Device (returned unchanged) or an API device dict.
+    """
+    if isinstance(device, Device):
+        return device
+    return _device_from_payload(device)
+
+
+def coerce_device_payloads(devices: Iterable[Device | dict[str, object]]) -> list[Device]:
+    """Convert a list of API device dicts (or Devices) in one pass; see :func:`coerce_device_payload`."""
+    return [device if isinstance(device, Device) else _device_from_payload(device) for device in devices]
+
+
+def _coerce_device_list(
+    devices: list[Device] | list[dict[str, object]], seen: dict[str, tuple[Device | dict[str, object], Device]]
+) -> list[Device]:
+    """Coerce *devices*, reusing the Device in *seen* for entries equal to one already coerced."""
+    result = []
+    for device in devices:
+        uuid = device.uuid if isinstance(device, Device) else device.get("uuid")
+        previous = seen.get(uuid) if isinstance(uuid, str) else None
+        if previous is not None and previous[0] == device:
+            result.append(previous[1])
+            continue
+        coerced = coerce_device_payload(device)
+        if isinstance(uuid, str):
+            seen[uuid] = (device, coerced)
+        result.append(coerced)
+    return result
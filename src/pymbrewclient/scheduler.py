@@ -0,0 +1,422 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Adaptive REST polling for ``/v1/devices``, ``/v1/breweryoverview``, and active sessions.
+
+:class:`PollScheduler` keeps one job per endpoint (and one per active session)
+in a priority queue ordered by next-due time, and runs them on a single
+thread.  Each job's interval follows the devices it concerns: a device that is
+mashing or boiling is polled often, an idle or serving device rarely, and an
+offline device's session polls back off exponentially.  A shared
+:class:`RequestBudget` caps the overall request rate, so a large fleet cannot
+exceed the account's API quota however many jobs fall due at once.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from enum import Enum
+from types import TracebackType
+from typing import Any
+
+from pymbrewclient.client import BreweryClient
+from pymbrewclient.mqtt.enums import MachineConnectionStatus, ProcessState, ProcessType
+from pymbrewclient.mqtt.hooks import callback_name
+from pymbrewclient.rest.models import BreweryOverview, Device, Session
+from pymbrewclient.watch import DeviceWatcher
+
+logger = logging.getLogger(__name__)
+
+DEVICES_JOB = "devices"
+OVERVIEW_JOB = "overview"
+_SESSION_JOB_PREFIX = "session:"
+
+BREW_MASHING_STATES: frozenset[int] = frozenset(
+    {
+        ProcessState.MASHBED_HYDRATE_HEATING_STATE,
+        ProcessState.MASHBED_HYDRATE_FLOW_STATE,
+        ProcessState.MASHBED_HYDRATE_STATE,
+        ProcessState.MASHBED_HYDRATE_SETTLE_STATE,
+        ProcessState.MASH_IN_STATE,
+        ProcessState.MASHING_HEATUP_STATE,
+        ProcessState.MASHING_MAINTAIN_STATE,
+        ProcessState.MASHING_REST_STATE,
+        ProcessState.MASH_LINE_FLOW_RECOVERY_STATE,
+        ProcessState.SPARGING_STATE,
+        ProcessState.LAUTERING_STATE,
+        ProcessState.REPLACE_MASH_STATE,
+    }
+)
+"""Process states of the ``BREW_MASHING`` phase."""
+
+BREW_BOILING_STATES: frozenset[int] = frozenset(
+    {
+        ProcessState.BOILING_HEATUP_STATE,
+        ProcessState.BOILING_MAINTAIN_STATE,
+        ProcessState.SECONDARY_LAUTERING_STATE,
+        ProcessState.BOIL_LINE_FLOW_RECOVERY_STATE,
+    }
+)
+"""Process states of the ``BREW_BOILING`` phase."""
+
+_ACTIVE_BREW_STATES = BREW_MASHING_STATES | BREW_BOILING_STATES
+_QUIET_PROCESS_TYPES = frozenset({ProcessType.PROC_IDLE, ProcessType.PROC_SERVING})
+
+
+class PollTier(Enum):
+    """How often a device needs polling; see :func:`poll_tier`."""
+
+    ACTIVE = "active"
+    """Mashing or boiling: state changes within minutes."""
+
+    BUSY = "busy"
+    """Any other running process, such as chilling, fermenting, or cleaning."""
+
+    IDLE = "idle"
+    """Idle, or serving from a keg."""
+
+    OFFLINE = "offline"
+    """Offline or not responding."""
+
+
+def poll_tier(device: Device) -> PollTier:
+    """Classify *device* by how quickly its REST state is expected to change.
+
+    The REST API reports ``process_state`` but not the process phase, so the
+    ``BREW_MASHING`` and ``BREW_BOILING`` phases are recognised by their states.
+    """
+    if device.connection_status != MachineConnectionStatus.ONLINE:
+        return PollTier.OFFLINE
+    if device.process_state in _ACTIVE_BREW_STATES:
+        return PollTier.ACTIVE
+    if device.process_type is None or device.process_type in _QUIET_PROCESS_TYPES:
+        return PollTier.IDLE
+    return PollTier.BUSY
+
+
+@dataclass(frozen=True)
+class PollIntervals:
+    """Polling intervals in seconds."""
+
+    active: float = 15.0
+    busy: float = 60.0
+    idle: float = 600.0
+    offline: float = 300.0
+    """First interval for an offline device's session; doubled on each poll while it stays offline."""
+
+    max_backoff: float = 3600.0
+    """Upper bound for offline and error backoff."""
+
+    overview: float | None = 600.0
+    """Interval for the brewery overview, or ``None`` not to poll it."""
+
+    def for_tier(self, tier: PollTier) -> float:
+        """Return the base interval for *tier*."""
+        return getattr(self, tier.value)
+
+
+class RequestBudget:
+    """Token bucket shared by all jobs of a :class:`PollScheduler`.
+
+    :param rate: Sustained requests per second, e.g. ``1000 / 3600`` for 1000 an hour.
+    :param burst: Requests that may be made back to back after a quiet period.
+    :param clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Return the seconds until a request may be made; ``0`` if one may be made now."""
+        self._refill()
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        """Spend one request if the budget allows it."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+@dataclass
+class _Job:
+    interval: float
+    due: float
+    last_run: float | None = None
+    failures: int = 0
+    offline_polls: int = 0
+
+
+class PollScheduler:
+    """Poll a :class:`~pymbrewclient.client.BreweryClient` at adaptive intervals.
+
+    Example::
+
+        scheduler = client.create_poll_scheduler(budget=RequestBudget(rate=1000 / 3600, burst=5))
+        scheduler.on_session(store_session)
+        scheduler.watcher.on_change(on_device_change)
+        with scheduler:
+            ...
+
+    The device list is polled at the interval of its most demanding device.
+    Every active session gets its own job, polled at its device's interval;
+    sessions appear and disappear with the device list.  A job that raises is
+    retried with exponential backoff.  When jobs are due faster than the
+    budget allows, the longest-overdue one runs first.
+
+    Jobs run on one thread; do not call :meth:`run_pending` while the
+    scheduler is started.
+
+    :param client: The client to poll.
+    :param intervals: Polling intervals; see :class:`PollIntervals`.
+    :param budget: Optional global request budget; unlimited if omitted.
+    :param watcher: :class:`~pymbrewclient.watch.DeviceWatcher` fed with every
+        device list; one is created if omitted.
+    :param clock: Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(
+        self,
+        client: BreweryClient,
+        intervals: PollIntervals | None = None,
+        budget: RequestBudget | None = None,
+        watcher: DeviceWatcher | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.client = client
+        self.intervals = intervals if intervals is not None else PollIntervals()
+        self.budget = budget
+        self.watcher = watcher if watcher is not None else DeviceWatcher(client)
+        self._clock = clock
+        self._jobs: dict[str, _Job] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._tiers: dict[int, PollTier] = {}
+        self._callbacks: dict[str, list[Callable[[Any], None]]] = {"devices": [], "overview": [], "session": []}
+        self._requests = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        now = clock()
+        self._schedule(DEVICES_JOB, _Job(interval=self.intervals.idle, due=now))
+        if self.intervals.overview is not None:
+            self._schedule(OVERVIEW_JOB, _Job(interval=self.intervals.overview, due=now))
+
+    # ------------------------------------------------------------------
+    # Callbacks
+    # ------------------------------------------------------------------
+
+    def on_devices(self, callback: Callable[[list[Device]], None]) -> None:
+        """Register *callback* for every fetched device list."""
+        self._callbacks["devices"].append(callback)
+
+    def on_overview(self, callback: Callable[[BreweryOverview], None]) -> None:
+        """Register *callback* for every fetched brewery overview."""
+        self._callbacks["overview"].append(callback)
+
+    def on_session(self, callback: Callable[[Session], None]) -> None:
+        """Register *callback* for every fetched active session."""
+        self._callbacks["session"].append(callback)
+
+    def _emit(self, kind: str, value: object) -> None:
+        for cb in self._callbacks[kind]:
+            try:
+                cb(value)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Exception in %s poll callback %s: %r", kind, callback_name(cb), exc)
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    @property
+    def jobs(self) -> dict[str, float]:
+        """Current interval of every job, keyed by job name (``devices``, ``overview``, ``session:<id>``)."""
+        return {key: job.interval for key, job in self._jobs.items()}
+
+    @property
+    def requests(self) -> int:
+        """Requests made so far, including failed ones."""
+        return self._requests
+
+    def _schedule(self, key: str, job: _Job) -> None:
+        self._jobs[key] = job
+        heapq.heappush(self._heap, (job.due, key))
+
+    def run_pending(self) -> float:
+        """Run every job that is due and allowed by the budget.
+
+        :return: Seconds until the next job is due or the budget allows the
+            next request.
+        """
+        while self._heap:
+            due, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is None or job.due != due:
+                heapq.heappop(self._heap)  # cancelled or rescheduled
+                continue
+            now = self._clock()
+            if due > now:
+                return due - now
+            if self.budget is not None and not self.budget.try_acquire():
+                return self.budget.delay()
+            heapq.heappop(self._heap)
+            self._run_job(key, job, now)
+        return self.intervals.idle
+
+    def _run_job(self, key: str, job: _Job, now: float) -> None:
+        self._requests += 1
+        job.last_run = now
+        try:
+            if key == DEVICES_JOB:
+                self._poll_devices(job)
+            elif key == OVERVIEW_JOB:
+                self._emit("overview", self.client.get_brewery_overview())
+            else:
+                self._poll_session(key, job)
+        except Exception as exc:  # noqa: BLE001
+            # The exception text is not logged: it may echo request details.
+            job.failures += 1
+            delay = min(job.interval * 2**job.failures, self.intervals.max_backoff)
+            logger.warning("Polling %s failed (%s); retrying in %ss", key, type(exc).__name__, delay)
+        else:
+            job.failures = 0
+            delay = job.interval
+        if self._jobs.get(key) is job:
+            job.due = now + delay
+            heapq.heappush(self._heap, (job.due, key))
+
+    def _poll_devices(self, job: _Job) -> None:
+        devices = self.client.get_devices()
+        self.watcher.apply(devices)
+        self._emit("devices", devices)
+        self._update_sessions(devices)
+        job.interval = min(
+            (self.intervals.for_tier(poll_tier(device)) for device in devices), default=self.intervals.idle
+        )
+
+    def _poll_session(self, key: str, job: _Job) -> None:
+        session_id = int(key[len(_SESSION_JOB_PREFIX) :])
+        self._emit("session", self.client.get_session_info(session_id))
+        if self._tiers.get(session_id) is PollTier.OFFLINE:
+            job.offline_polls += 1
+            job.interval = min(self.intervals.offline * 2**job.offline_polls, self.intervals.max_backoff)
+
+    def _update_sessions(self, devices: Iterable[Device]) -> None:
+        """Add, drop, and re-pace session jobs to match the active sessions in *devices*."""
+        tiers: dict[int, PollTier] = {}
+        for device in devices:
+            if device.active_session is not None:
+                tier = poll_tier(device)
+                previous = tiers.get(device.active_session)
+                # A session shared by several devices follows the busiest one.
+                if previous is None or self.intervals.for_tier(tier) < self.intervals.for_tier(previous):
+                    tiers[device.active_session] = tier
+        for session_id in self._tiers.keys() - tiers.keys():
+            del self._jobs[f"{_SESSION_JOB_PREFIX}{session_id}"]
+        now = self._clock()
+        for session_id, tier in tiers.items():
+            key = f"{_SESSION_JOB_PREFIX}{session_id}"
+            interval = self.intervals.for_tier(tier)
+            job = self._jobs.get(key)
+            if job is None:
+                self._schedule(key, _Job(interval=interval, due=now))
+                continue
+            if tier is PollTier.OFFLINE:
+                if self._tiers.get(session_id) is PollTier.OFFLINE:
+                    continue  # keep backing off
+                job.offline_polls = 0
+            job.interval = interval
+            if job.failures == 0 and job.last_run is not None and job.last_run + interval < job.due:
+                # The device became busier: bring the next poll forward.
+                job.due = max(now, job.last_run + interval)
+                heapq.heappush(self._heap, (job.due, key))
+        self._tiers = tiers
+
+    # ------------------------------------------------------------------
+    # Thread
+    # ------------------------------------------------------------------
+
+    def start(self) -> "PollScheduler":
+        """Run the scheduler on a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="poll-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread, waiting for a request in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.run_pending())
+
+    def __enter__(self) -> "PollScheduler":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f"PollScheduler(jobs={len(self._jobs)}, requests={self._requests})"
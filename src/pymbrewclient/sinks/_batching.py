@@ -0,0 +1,224 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Shared queue-and-writer-thread machinery for the batching sinks.
+"""
+
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import TracebackType
+from typing import Generic, TypeVar
+
+from pymbrewclient.mqtt.client import MqttClient
+from pymbrewclient.mqtt.models import DeviceLogMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL: float = 1.0
+DEFAULT_MAX_QUEUE: int = 50_000
+
+Row = TypeVar("Row")
+
+
+class _BatchingSink(ABC, Generic[Row]):
+    """Base class for sinks that batch rows on a single background thread.
+
+    Subclasses turn a message into a row with :meth:`_row` and write a batch
+    with :meth:`_commit`, then call :meth:`_start` at the end of ``__init__``.
+    A batch is committed when ``batch_size`` rows are queued or
+    ``flush_interval`` seconds after its first row, whichever comes first.
+    An unexpected exception from :meth:`_commit` is logged and the rows still
+    in its list counted as dropped, so the writer thread keeps running.
+    """
+
+    _thread_name = "sink"
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[Row | threading.Event | None] = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        # Guards dropped and _closing; close() sets _closing before queueing
+        # the stop sentinel, so no row can be queued after it.
+        self._lock = threading.Lock()
+        self._closing = False
+        self._resources_closed = False
+        self._thread = threading.Thread(target=self._run, name=self._thread_name, daemon=True)
+
+    def _start(self) -> None:
+        self._thread.start()
+
+    @abstractmethod
+    def _row(self, msg: DeviceLogMessage) -> Row | None:
+        """Convert *msg* to a queued row, or ``None`` to skip it; runs on the caller's thread."""
+
+    @abstractmethod
+    def _commit(self, rows: list[Row]) -> None:
+        """Write *rows*, update :attr:`written` or :attr:`dropped`, and clear the list.
+
+        If it raises, rows left in the list are counted as dropped, so remove
+        any it has already written or accounted for.
+        """
+
+    def _drain(self) -> None:
+        """Write anything :meth:`_commit` held back; called on the writer thread by flush and close."""
+
+    def _close_resources(self) -> None:
+        """Release resources once the writer thread has exited."""
+
+    def _count_dropped(self, count: int) -> None:
+        """Add *count* to :attr:`dropped`; safe from any thread."""
+        with self._lock:
+            self.dropped += count
+
+    def attach(self, client: MqttClient) -> None:
+        """Forward every decoded device log from *client*."""
+        client.on_device_log(self.write)
+
+    def write(self, msg: DeviceLogMessage) -> None:
+        """Queue *msg* for writing; never blocks.
+
+        Messages written after :meth:`close` are counted in :attr:`dropped`.
+        """
+        if msg.device_uuid is None or msg.decode_error:
+            return
+        row = self._row(msg)
+        if row is None:
+            return
+        with self._lock:
+            if self._closing or not self._thread.is_alive():
+                self.dropped += 1
+                return
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything queued so far is written.
+
+        :returns: ``False`` if *timeout* expired first or the sink is closed.
+        """
+        if self._closing or not self._thread.is_alive():
+            return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        if not self._thread.is_alive():
+            # Closed meanwhile; close() releases anything queued after its sentinel.
+            return done.is_set()
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        """Write pending rows, stop the writer thread, and release resources."""
+        with self._lock:
+            stop, self._closing = not self._closing, True
+        if stop and self._thread.is_alive():
+            self._queue.put(None)
+        self._thread.join()
+        self._discard_queued()
+        if not self._resources_closed:
+            self._resources_closed = True
+            self._close_resources()
+
+    def _run(self) -> None:
+        rows: list[Row] = []
+        deadline: float | None = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._safe_commit(rows)
+                deadline = None
+                continue
+            if item is not None and not isinstance(item, threading.Event):
+                rows.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(rows) >= self.batch_size:
+                    self._safe_commit(rows)
+                    deadline = None
+                continue
+            self._safe_commit(rows, drain=True)
+            deadline = None
+            if item is None:
+                return
+            item.set()
+
+    def _discard_queued(self) -> None:
+        # Only a flush() racing close() can queue behind the sentinel; wake it.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not None:
+                self._count_dropped(1)
+
+    def _safe_commit(self, rows: list[Row], drain: bool = False) -> None:
+        try:
+            if rows:
+                self._commit(rows)
+            if drain:
+                self._drain()
+        except Exception:  # noqa: BLE001
+            logger.exception("%s failed to write; %d queued rows dropped", type(self).__name__, len(rows))
+            self._count_dropped(len(rows))
+            rows.clear()
+
+    def __enter__(self) -> "_BatchingSink[Row]":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
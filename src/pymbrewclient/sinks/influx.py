@@ -0,0 +1,215 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+InfluxDB line-protocol writer for decoded device-log messages.
+
+:class:`InfluxSink` formats each message as one line-protocol point, batches
+points on a background thread, and posts each batch gzip-compressed through a
+pooled :class:`requests.Session` that retries connection errors and
+``429``/``5xx`` responses with exponential backoff.  Any server that accepts
+line protocol over HTTP works (InfluxDB 1.x ``/write``, 2.x ``/api/v2/write``,
+3.x, VictoriaMetrics, Telegraf's HTTP listener); pass the full write URL.
+
+Point layout::
+
+    minibrew,device_uuid=<uuid>,machine_type=<int>,process_phase=<int> \\
+        current_temperature=<float>,target_temperature=<float>,<sensor>=<float>,... <ns>
+
+Sensor field keys are lower-case :class:`~pymbrewclient.mqtt.enums.SensorType`
+names (``temp_liquid``); measurement IDs without a name use ``m<id>``.
+Tags whose value is unknown are omitted, as are NaN and infinite readings.
+The timestamp is the device clock when reported, otherwise ``received_at``.
+"""
+
+import gzip
+import logging
+import math
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.models import DeviceLogMessage
+
+from ._batching import DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_QUEUE, _BatchingSink
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE: int = 5000
+DEFAULT_MEASUREMENT: str = "minibrew"
+DEFAULT_TIMEOUT: float = 10.0
+RETRY_STATUSES: tuple[int, ...] = (429, 500, 502, 503, 504)
+
+_GZIP_LEVEL = 6
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SENSOR_FIELDS: dict[int, str] = {int(sensor): sensor.name.lower() for sensor in SensorType}
+_KEY_ESCAPES = str.maketrans({",": r"\,", "=": r"\=", " ": r"\ "})
+_MEASUREMENT_ESCAPES = str.maketrans({",": r"\,", " ": r"\ "})
+
+
+def _nanoseconds(value: datetime) -> int:
+    delta = value - _EPOCH
+    return ((delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds) * 1000
+
+
+def format_line(msg: DeviceLogMessage, measurement: str = DEFAULT_MEASUREMENT) -> str | None:
+    """Return *msg* as one line-protocol point, or ``None`` if it has no fields.
+
+    :param msg: A decoded device-log message with a device UUID.
+    :param measurement: Measurement (table) name.
+    """
+    fields = []
+    for name, value in (
+        ("current_temperature", msg.current_temperature),
+        ("target_temperature", msg.target_temperature),
+    ):
+        if value is not None and math.isfinite(value):
+            fields.append(f"{name}={value!r}")
+    for sensor_id, value in msg.measurements.items():
+        if math.isfinite(value):
+            fields.append(f"{_SENSOR_FIELDS.get(sensor_id) or f'm{sensor_id}'}={float(value)!r}")
+    if not fields:
+        return None
+
+    tags = f"{measurement.translate(_MEASUREMENT_ESCAPES)},device_uuid={str(msg.device_uuid).translate(_KEY_ESCAPES)}"
+    if msg.machine_type is not None:
+        tags += f",machine_type={msg.machine_type}"
+    if msg.process_phase is not None:
+        tags += f",process_phase={msg.process_phase}"
+    timestamp = msg.device_timestamp if msg.device_timestamp is not None else msg.received_at
+    return f"{tags} {','.join(fields)} {_nanoseconds(timestamp)}"
+
+
+def _retrying_session(retries: int, backoff_factor: float) -> requests.Session:
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class InfluxSink(_BatchingSink[str]):
+    """Post decoded device logs as line protocol from a background thread.
+
+    Example::
+
+        url = "http://localhost:8086/api/v2/write?org=brewery&bucket=telemetry&precision=ns"
+        with InfluxSink(url, token=influx_token) as sink:
+            sink.attach(mqtt)
+            ...
+
+    Messages without a device UUID, with a ``decode_error``, or without any
+    field values are skipped.  A batch that still fails after the retries is
+    logged and counted in :attr:`dropped`.
+
+    :param url: Full write URL, including database/bucket and ``precision=ns``.
+    :param token: Sent as ``Authorization: Token <token>`` when given.
+    :param measurement: Measurement (table) name.
+    :param batch_size: Points per request.
+    :param flush_interval: Maximum seconds a point waits before being sent.
+    :param max_queue: Capacity of the hand-off queue.
+    :param compress: Gzip request bodies.
+    :param retries: Retries per batch for connection errors and retryable statuses.
+    :param backoff_factor: urllib3 exponential backoff factor between retries.
+    :param timeout: Per-request timeout in seconds.
+    :param session: Session to post through instead of the built-in retrying one.
+    """
+
+    _thread_name = "influx-sink"
+
+    def __init__(
+        self,
+        url: str,
+        token: str | None = None,
+        measurement: str = DEFAULT_MEASUREMENT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        compress: bool = True,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = DEFAULT_TIMEOUT,
+        session: requests.Session | None = None,
+    ) -> None:
+        super().__init__(batch_size, flush_interval, max_queue)
+        self.url = url
+        self.measurement = measurement
+        self.compress = compress
+        self.timeout = timeout
+        self._owns_session = session is None
+        self._session = session if session is not None else _retrying_session(retries, backoff_factor)
+        self._headers = {"Content-Type": "text/plain; charset=utf-8"}
+        if compress:
+            self._headers["Content-Encoding"] = "gzip"
+        if token:
+            self._headers["Authorization"] = f"Token {token}"
+        self._start()
+
+    def _row(self, msg: DeviceLogMessage) -> str | None:
+        return format_line(msg, self.measurement)
+
+    def _close_resources(self) -> None:
+        if self._owns_session:
+            self._session.close()
+
+    def _commit(self, rows: list[str]) -> None:
+        body = "\n".join(rows).encode("utf-8")
+        if self.compress:
+            body = gzip.compress(body, compresslevel=_GZIP_LEVEL)
+        try:
+            response = self._session.post(self.url, data=body, headers=self._headers, timeout=self.timeout)
+        except requests.RequestException as exc:
+            logger.warning("Influx sink dropped %d points: %s", len(rows), exc)
+            self._count_dropped(len(rows))
+        else:
+            if response.ok:
+                self.written += len(rows)
+            else:
+                logger.warning(
+                    "Influx sink dropped %d points: HTTP %d %s", len(rows), response.status_code, response.text[:200]
+                )
+                self._count_dropped(len(rows))
+        rows.clear()
@@ -0,0 +1,312 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Columnar Parquet export of decoded device-log messages.
+
+:class:`ParquetSink` hands messages to a background thread, which buffers them
+column by column and writes a Parquet row group each time ``row_group_size``
+rows have accumulated, so memory stays bounded by one row group (plus the
+hand-off queue) however long the stream runs.  Feed it live from an
+:class:`~pymbrewclient.mqtt.client.MqttClient` with :meth:`ParquetSink.attach`,
+or convert an archive made by :class:`~pymbrewclient.mqtt.recording.MqttRecorder`
+with :func:`export_recording`.
+
+Columns::
+
+    device_uuid string, device_timestamp timestamp[us, UTC], received_at timestamp[us, UTC],
+    sequence_number int64, session_id int64,
+    current_state, process_type, process_state, user_action, process_phase,
+    machine_type int32,
+    current_temperature, target_temperature, temp_control_power double,
+    seconds_until_next_action int64,
+    sensor_* double, one per SensorType (``sensor_temp_liquid``, ``sensor_pump_current``, ...)
+
+Sensor columns are null when the message did not report that channel;
+measurement IDs outside :class:`~pymbrewclient.mqtt.enums.SensorType` are not
+exported.
+
+Requires ``pyarrow`` (``pip install pymbrewclient[parquet]``).
+"""
+
+from datetime import datetime, timezone
+from os import PathLike
+
+from pymbrewclient.mqtt.client import DEVICE_LOG_TOPIC_PREFIX
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.models import DeviceLogMessage
+from pymbrewclient.mqtt.proto import decode_device_log
+from pymbrewclient.mqtt.recording import MqttReplay
+
+from ._batching import DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_QUEUE, _BatchingSink
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+DEFAULT_ROW_GROUP_SIZE: int = 65_536
+DEFAULT_COMPRESSION: str = "zstd"
+DEFAULT_BATCH_SIZE: int = 1000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_INT32_FIELDS = ("current_state", "process_type", "process_state", "user_action", "process_phase", "machine_type")
+_FLOAT_FIELDS = ("current_temperature", "target_temperature", "temp_control_power")
+SENSOR_COLUMNS: dict[SensorType, str] = {sensor: f"sensor_{sensor.name.lower()}" for sensor in SensorType}
+
+ParquetRow = tuple[object, ...]
+
+
+def _micros(value: datetime | None) -> int | None:
+    if value is None:
+        return None
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def parquet_schema() -> "pa.Schema":
+    """Return the Arrow schema written by :class:`ParquetSink`."""
+    _require_pyarrow()
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema(
+        [
+            pa.field("device_uuid", pa.string(), nullable=False),
+            pa.field("device_timestamp", timestamp),
+            pa.field("received_at", timestamp, nullable=False),
+            pa.field("sequence_number", pa.int64()),
+            pa.field("session_id", pa.int64()),
+            *(pa.field(name, pa.int32()) for name in _INT32_FIELDS),
+            *(pa.field(name, pa.float64()) for name in _FLOAT_FIELDS),
+            pa.field("seconds_until_next_action", pa.int64()),
+            *(pa.field(name, pa.float64()) for name in SENSOR_COLUMNS.values()),
+        ]
+    )
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Parquet export requires pyarrow (pip install pymbrewclient[parquet])")
+
+
+def _row(msg: DeviceLogMessage) -> ParquetRow:
+    """Values of *msg* in :func:`parquet_schema` column order."""
+    measurements = msg.measurements
+    return (
+        msg.device_uuid,
+        _micros(msg.device_timestamp),
+        _micros(msg.received_at),
+        msg.sequence_number,
+        msg.session_id,
+        *(getattr(msg, name) for name in _INT32_FIELDS),
+        *(getattr(msg, name) for name in _FLOAT_FIELDS),
+        msg.seconds_until_next_action,
+        *(measurements.get(sensor) for sensor in SENSOR_COLUMNS),
+    )
+
+
+class _RowGroupWriter:
+    """Column buffers plus a ``ParquetWriter``; writes a row group every *row_group_size* rows."""
+
+    def __init__(self, path: str | PathLike[str], row_group_size: int, compression: str) -> None:
+        if row_group_size < 1:
+            raise ValueError("row_group_size must be at least 1")
+        self.row_group_size = row_group_size
+        self.written = 0
+        self.row_groups = 0
+        self.pending = 0
+        self.discarded = 0
+        self._schema = parquet_schema()
+        self._columns: list[list[object]] = [[] for _ in self._schema.names]
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+
+    def append(self, row: ParquetRow) -> None:
+        for column, value in zip(self._columns, row):
+            column.append(value)
+        self.pending += 1
+        if self.pending >= self.row_group_size:
+            self.write_row_group()
+
+    def write_row_group(self) -> None:
+        """Write the buffered rows; if that fails they are discarded and counted in :attr:`discarded`."""
+        pending, self.pending = self.pending, 0
+        if not pending:
+            return
+        try:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(self._columns, self._schema)]
+            self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema), row_group_size=pending)
+        except Exception:
+            self.discarded += pending
+            raise
+        finally:
+            for column in self._columns:
+                column.clear()
+        self.written += pending
+        self.row_groups += 1
+
+    def close(self) -> None:
+        try:
+            self.write_row_group()
+        finally:
+            self._writer.close()
+
+
+class ParquetSink(_BatchingSink[ParquetRow]):
+    """Write decoded device logs to a Parquet file in fixed-size row groups.
+
+    Example::
+
+        with ParquetSink("telemetry.parquet") as sink:
+            sink.attach(mqtt)
+            ...
+
+    Messages without a device UUID or with a ``decode_error`` are skipped.
+    The caller's thread only copies a message's fields into a tuple; Arrow
+    encoding, compression, and file I/O happen on the writer thread.  When
+    the hand-off queue is full the newest message is dropped and counted in
+    :attr:`dropped`; so are the rows of a row group pyarrow fails to write.
+
+    :param path: Output file; overwritten if it exists.
+    :param row_group_size: Rows buffered before a row group is written.
+    :param compression: Parquet codec name passed to pyarrow.
+    :param batch_size: Rows handed to the writer thread at a time.
+    :param flush_interval: Maximum seconds a row waits before the writer
+        thread picks it up (it is written with the next row group).
+    :param max_queue: Capacity of the hand-off queue.
+    :raises ImportError: If pyarrow is not installed.
+    """
+
+    _thread_name = "parquet-sink"
+
+    def __init__(
+        self,
+        path: str | PathLike[str],
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = DEFAULT_COMPRESSION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ) -> None:
+        _require_pyarrow()
+        super().__init__(batch_size, flush_interval, max_queue)
+        # Only the writer thread touches the file after setup.
+        self._file = _RowGroupWriter(path, row_group_size, compression)
+        self._discarded = 0
+        self.row_group_size = row_group_size
+        self._start()
+
+    @property
+    def pending(self) -> int:
+        """Rows buffered on the writer thread for the next row group."""
+        return self._file.pending
+
+    @property
+    def row_groups(self) -> int:
+        """Row groups written so far."""
+        return self._file.row_groups
+
+    @property
+    def closed(self) -> bool:
+        """Whether :meth:`close` has been called."""
+        return self._resources_closed
+
+    def _row(self, msg: DeviceLogMessage) -> ParquetRow:
+        return _row(msg)
+
+    def _commit(self, rows: list[ParquetRow]) -> None:
+        # Rows handed to the writer leave *rows* even if a row group write
+        # fails, so the base class only counts the rows never attempted.
+        appended = 0
+        try:
+            for row in rows:
+                appended += 1
+                self._file.append(row)
+        finally:
+            del rows[:appended]
+            self._sync_counts()
+
+    def _drain(self) -> None:
+        # flush() and close() also write the short row group still buffered.
+        try:
+            self._file.write_row_group()
+        finally:
+            self._sync_counts()
+
+    def _close_resources(self) -> None:
+        try:
+            self._file.close()
+        finally:
+            self._sync_counts()
+
+    def _sync_counts(self) -> None:
+        self.written = self._file.written
+        discarded, self._discarded = self._file.discarded - self._discarded, self._file.discarded
+        if discarded:
+            self._count_dropped(discarded)
+
+
+def export_recording(
+    recording: str | PathLike[str],
+    path: str | PathLike[str],
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+) -> int:
+    """Convert the device logs in an :class:`~pymbrewclient.mqtt.recording.MqttRecorder` archive to Parquet.
+
+    The archive is streamed on the calling thread, so only one row group is
+    held in memory at a time.  Non-device-log topics and undecodable payloads
+    are skipped.
+
+    :param recording: Path of the recording file.
+    :param path: Output Parquet file.
+    :param row_group_size: Rows per row group.
+    :param compression: Parquet codec name passed to pyarrow.
+    :returns: The number of rows written.
+    """
+    _require_pyarrow()
+    out = _RowGroupWriter(path, row_group_size, compression)
+    try:
+        for msg in MqttReplay(recording):
+            if not msg.topic.startswith(DEVICE_LOG_TOPIC_PREFIX):
+                continue
+            decoded = decode_device_log(msg)
+            if decoded.device_uuid is not None and not decoded.decode_error:
+                out.append(_row(decoded))
+    finally:
+        out.close()
+    return out.written
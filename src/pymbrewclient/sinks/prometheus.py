@@ -0,0 +1,257 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Prometheus exporter for the latest per-device telemetry values.
+
+:class:`PrometheusExporter` renders device shadows as gauges labelled by
+``device_uuid``::
+
+    minibrew_device_current_temperature_celsius
+    minibrew_device_target_temperature_celsius
+    minibrew_device_temp_control_power          signed Peltier power, negative = cooling
+    minibrew_device_sensor_value{sensor="..."}  every measurement, by lower-case SensorType name
+    minibrew_device_process_state               ProcessState value
+    minibrew_device_seconds_until_next_action
+
+:meth:`PrometheusExporter.attach` reads the client's own
+:attr:`~pymbrewclient.mqtt.client.MqttClient.shadow` rather than keeping a
+second copy of every device.  Shadows are immutable snapshots, so a scrape
+re-formats only the devices whose snapshot was replaced since the previous
+scrape and otherwise reuses the cached text.  The seconds until the next
+action are counted down from ``next_action_at`` at scrape time, to the
+second, so they do not freeze between messages.
+"""
+
+import math
+import threading
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from pymbrewclient.mqtt.client import MqttClient
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.metrics import MetricsServer, escape_label_value
+from pymbrewclient.mqtt.models import DeviceLogMessage
+from pymbrewclient.mqtt.shadow import DeviceShadow, DeviceShadowStore
+
+_PREFIX = "minibrew_device"
+
+_GAUGES: tuple[tuple[str, str, str | None], ...] = (
+    ("current_temperature_celsius", "Current temperature reported by the device.", "current_temperature"),
+    ("target_temperature_celsius", "Target temperature reported by the device.", "target_temperature"),
+    ("temp_control_power", "Signed temperature-control (Peltier) power; negative is cooling.", "temp_control_power"),
+    ("sensor_value", "Latest reading of each device sensor.", None),
+    ("process_state", "Current process state (ProcessState value).", "process_state"),
+)
+_HEADERS: tuple[str, ...] = tuple(
+    f"# HELP {_PREFIX}_{name} {help_text}\n# TYPE {_PREFIX}_{name} gauge\n" for name, help_text, _ in _GAUGES
+)
+_NEXT_ACTION = f"{_PREFIX}_seconds_until_next_action"
+_NEXT_ACTION_HEADER = f"# HELP {_NEXT_ACTION} Seconds until the next user action is due.\n# TYPE {_NEXT_ACTION} gauge\n"
+_SENSOR_LABELS: dict[int, str] = {int(sensor): sensor.name.lower() for sensor in SensorType}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _device_fragments(shadow: DeviceShadow, labels: str) -> tuple[str, ...]:
+    """Return the sample lines of *shadow* for each gauge, in :data:`_GAUGES` order."""
+    fragments = []
+    for name, _, attribute in _GAUGES:
+        if attribute is None:
+            fragments.append(
+                "".join(
+                    f'{_PREFIX}_{name}{{{labels},sensor="{_SENSOR_LABELS.get(sensor_id) or sensor_id}"}} '
+                    f"{_format_value(value)}\n"
+                    for sensor_id, value in sorted(shadow.measurements.items())
+                )
+            )
+            continue
+        value = getattr(shadow, attribute)
+        fragments.append("" if value is None else f"{_PREFIX}_{name}{{{labels}}} {_format_value(value)}\n")
+    return tuple(fragments)
+
+
+def _next_action_due(shadow: DeviceShadow) -> float | None:
+    """Epoch seconds at which the next user action is due."""
+    if shadow.next_action_at is not None:
+        return shadow.next_action_at.timestamp()
+    if shadow.seconds_until_next_action is not None:
+        return (shadow.updated_at + timedelta(seconds=shadow.seconds_until_next_action)).timestamp()
+    return None
+
+
+class _CachedDevice:
+    __slots__ = ("shadow", "labels", "fragments", "next_action_due")
+
+    def __init__(self, shadow: DeviceShadow) -> None:
+        self.shadow = shadow
+        self.labels = f'device_uuid="{escape_label_value(shadow.device_uuid)}"'
+        self.fragments = _device_fragments(shadow, self.labels)
+        self.next_action_due = _next_action_due(shadow)
+
+
+class PrometheusExporter:
+    """Serve the latest telemetry of every device as Prometheus gauges.
+
+    Example::
+
+        exporter = PrometheusExporter()
+        exporter.attach(mqtt)
+        with exporter.serve(host="0.0.0.0", port=9108):
+            ...
+
+    Values merge across messages the way the device shadow does: a field that
+    a message does not report keeps its previous value.
+
+    :param clock: Current UTC time source for the next-action countdown,
+        replaceable in tests.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = _utcnow) -> None:
+        self._own = DeviceShadowStore()
+        self._stores: list[DeviceShadowStore] = [self._own]
+        self._devices: dict[str, _CachedDevice] = {}
+        self._discarded: dict[str, DeviceShadow] = {}
+        self._text = ""
+        self._rendered = ""
+        self._rendered_second: int | None = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def attach(self, client: MqttClient) -> None:
+        """Export the devices in *client*'s shadow.
+
+        A client created with ``track_shadow=False`` keeps no shadow; the
+        exporter then subscribes to its device logs and keeps its own.
+        """
+        if not client.track_shadow:
+            client.on_device_log(self.update)
+            return
+        with self._lock:
+            if all(store is not client.shadow for store in self._stores):
+                self._stores.append(client.shadow)
+
+    def update(self, msg: DeviceLogMessage) -> None:
+        """Merge *msg* into the exporter's own shadow store."""
+        if msg.device_uuid is None or msg.decode_error:
+            return
+        self._own.update(msg)
+
+    def discard(self, device_uuid: str) -> None:
+        """Stop exporting *device_uuid* until it reports again."""
+        with self._lock:
+            cached = self._devices.get(device_uuid)
+            shadow = cached.shadow if cached is not None else self._latest().get(device_uuid)
+            if shadow is not None:
+                self._discarded[device_uuid] = shadow
+
+    def render(self) -> str:
+        """Return the exposition text, re-formatting only devices changed since the last call."""
+        now = self._clock()
+        with self._lock:
+            shadows = self._latest()
+            for device_uuid, shadow in list(self._discarded.items()):
+                if shadows.get(device_uuid) is shadow:
+                    del shadows[device_uuid]
+                else:
+                    del self._discarded[device_uuid]
+
+            changed = replaced = False
+            for device_uuid in [d for d in self._devices if d not in shadows]:
+                del self._devices[device_uuid]
+                changed = replaced = True
+            for device_uuid, shadow in shadows.items():
+                cached = self._devices.get(device_uuid)
+                if cached is not None and cached.shadow is shadow:
+                    continue
+                fresh = _CachedDevice(shadow)
+                if cached is None or cached.fragments != fresh.fragments:
+                    changed = True
+                self._devices[device_uuid] = fresh
+                replaced = True
+            if changed:
+                self._text = self._join()
+            second = math.floor(now.timestamp())
+            if replaced or second != self._rendered_second:
+                self._rendered = self._text + self._next_actions(second)
+                self._rendered_second = second
+            return self._rendered
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> MetricsServer:
+        """Start serving :meth:`render` on ``/metrics`` and return the running server."""
+        return MetricsServer(self.render, host=host, port=port).start()
+
+    def _latest(self) -> dict[str, DeviceShadow]:
+        if len(self._stores) == 1:
+            return self._stores[0].snapshot()
+        shadows: dict[str, DeviceShadow] = {}
+        for store in self._stores:
+            for device_uuid, shadow in store.snapshot().items():
+                current = shadows.get(device_uuid)
+                if current is None or shadow.updated_at > current.updated_at:
+                    shadows[device_uuid] = shadow
+        return shadows
+
+    def _next_actions(self, now: int) -> str:
+        samples = "".join(
+            f"{_NEXT_ACTION}{{{device.labels}}} {max(0, round(device.next_action_due - now))}\n"
+            for device in self._devices.values()
+            if device.next_action_due is not None
+        )
+        return _NEXT_ACTION_HEADER + samples if samples else ""
+
+    def _join(self) -> str:
+        if not self._devices:
+            return ""
+        parts = []
+        for index, header in enumerate(_HEADERS):
+            samples = "".join(device.fragments[index] for device in self._devices.values())
+            if samples:
+                parts.append(header)
+                parts.append(samples)
+        return "".join(parts)
@@ -0,0 +1,178 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Batched SQLite persistence for decoded device-log messages.
+
+:class:`SqliteSink` accepts messages on any thread (typically the MQTT
+network thread) into a bounded queue and writes them from a single background
+thread with ``executemany`` in WAL mode, committing whenever a batch fills up
+or the flush interval passes.  Ingestion never waits on disk I/O: when the
+queue is full, the newest message is dropped and counted in :attr:`SqliteSink.dropped`.
+
+Table layout (``device_logs`` by default)::
+
+    device_uuid TEXT, device_timestamp REAL, received_at REAL,
+    sequence_number INTEGER, session_id INTEGER,
+    current_state INTEGER, process_type INTEGER, process_state INTEGER,
+    user_action INTEGER, process_phase INTEGER, machine_type INTEGER,
+    current_temperature REAL, target_temperature REAL, temp_control_power REAL,
+    seconds_until_next_action INTEGER, measurements TEXT
+
+Timestamps are epoch seconds; ``measurements`` is a JSON object keyed by
+measurement ID.  An index covers ``(device_uuid, device_timestamp)``.
+"""
+
+import json
+import logging
+import sqlite3
+from os import PathLike
+
+from pymbrewclient.mqtt.models import DeviceLogMessage
+
+from ._batching import DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_QUEUE, _BatchingSink
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE: int = 500
+
+COLUMNS: tuple[tuple[str, str], ...] = (
+    ("device_uuid", "TEXT NOT NULL"),
+    ("device_timestamp", "REAL"),
+    ("received_at", "REAL NOT NULL"),
+    ("sequence_number", "INTEGER"),
+    ("session_id", "INTEGER"),
+    ("current_state", "INTEGER"),
+    ("process_type", "INTEGER"),
+    ("process_state", "INTEGER"),
+    ("user_action", "INTEGER"),
+    ("process_phase", "INTEGER"),
+    ("machine_type", "INTEGER"),
+    ("current_temperature", "REAL"),
+    ("target_temperature", "REAL"),
+    ("temp_control_power", "REAL"),
+    ("seconds_until_next_action", "INTEGER"),
+    ("measurements", "TEXT"),
+)
+
+
+def _row(msg: DeviceLogMessage) -> tuple[object, ...]:
+    return (
+        msg.device_uuid,
+        msg.device_timestamp.timestamp() if msg.device_timestamp is not None else None,
+        msg.received_at.timestamp(),
+        msg.sequence_number,
+        msg.session_id,
+        msg.current_state,
+        msg.process_type,
+        msg.process_state,
+        msg.user_action,
+        msg.process_phase,
+        msg.machine_type,
+        msg.current_temperature,
+        msg.target_temperature,
+        msg.temp_control_power,
+        msg.seconds_until_next_action,
+        json.dumps({str(int(k)): v for k, v in msg.measurements.items()}, separators=(",", ":")),
+    )
+
+
+class SqliteSink(_BatchingSink[tuple[object, ...]]):
+    """Write decoded device logs to SQLite from a background thread.
+
+    Example::
+
+        with SqliteSink("telemetry.db") as sink:
+            sink.attach(mqtt)
+            ...
+
+    Messages without a device UUID or with a ``decode_error`` are skipped.
+
+    :param path: Database file (created if missing).
+    :param table: Table name; created with an index if missing.
+    :param batch_size: Rows per ``executemany``/commit.
+    :param flush_interval: Maximum seconds a row waits before being committed.
+    :param max_queue: Capacity of the hand-off queue.
+    """
+
+    _thread_name = "sqlite-sink"
+
+    def __init__(
+        self,
+        path: str | PathLike[str],
+        table: str = "device_logs",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        super().__init__(batch_size, flush_interval, max_queue)
+        self.table = table
+        self._insert = (
+            f"INSERT INTO {table} ({', '.join(name for name, _ in COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        )
+
+        # Only the writer thread touches the connection after setup.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_device_time ON {table} (device_uuid, device_timestamp)"
+        )
+        self._conn.commit()
+
+        self._start()
+
+    def _row(self, msg: DeviceLogMessage) -> tuple[object, ...]:
+        return _row(msg)
+
+    def _close_resources(self) -> None:
+        self._conn.close()
+
+    def _commit(self, rows: list[tuple[object, ...]]) -> None:
+        if not rows:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(self._insert, rows)
+        except sqlite3.Error as exc:
+            logger.warning("SQLite sink dropped %d rows: %s", len(rows), exc)
+            self._count_dropped(len(rows))
+        else:
+            self.written += len(rows)
+        rows.clear()
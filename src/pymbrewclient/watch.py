@@ -0,0 +1,262 @@
+# “Commons Clause” License Condition v1.0
+#
+# The Software is provided to you by the Licensor under the License, as defined below, subject to the following condition.
+#
+# Without limiting other conditions in the License, the grant of rights under the License will not include, and the License does not grant to you, the right to Sell the Software.
+#
+# For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or consulting/ support services related to the Software), a product or service whose value derives, entirely or substantially, from the functionality of the Software. Any license notice or attribution required by the License must also include this Commons Clause License Condition notice.
+#
+# Software: pymbrewclient
+# License: MIT License
+# Licensor: Stuart Pearson
+#
+#
+# MIT License
+#
+# Copyright (c) 2024 Stuart Pearson
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Disclaimer: This software is an independent project and is not affiliated with, endorsed by, or associated with MiniBrew. MiniBrew's trademarks, logos, API, and other intellectual property are owned by MiniBrew and are not included in this software. Users are responsible for complying with MiniBrew's terms of service when using this software.
+"""
+Change events from polling the REST device list.
+
+:class:`DeviceWatcher` keeps the last device list it saw indexed by UUID and
+compares each refresh against it, so consumers receive one
+:class:`DeviceChange` per added, removed, or changed device instead of
+re-comparing the whole fleet themselves.  Unchanged devices produce no events
+and no work beyond the comparison.
+"""
+
+import logging
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from enum import Enum
+from types import TracebackType
+
+from pymbrewclient.client import BreweryClient
+from pymbrewclient.mqtt.hooks import callback_name
+from pymbrewclient.rest.models import DEVICE_FIELDS, Device
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL: float = 30.0
+"""Seconds between refreshes of a started :class:`DeviceWatcher`."""
+
+HEARTBEAT_FIELDS: frozenset[str] = frozenset({"last_time_online"})
+"""Fields an online device updates on every poll; not compared by default."""
+
+WATCHED_FIELDS: tuple[str, ...] = tuple(name for name in DEVICE_FIELDS if name not in HEARTBEAT_FIELDS)
+"""Fields compared when no ``fields`` are given: every device field except :data:`HEARTBEAT_FIELDS`."""
+
+_DEVICE_FIELD_SET = frozenset(DEVICE_FIELDS)
+
+
+class DeviceChangeKind(Enum):
+    """What a :class:`DeviceChange` reports."""
+
+    ADDED = "added"
+    """The device was not in the previous snapshot."""
+
+    REMOVED = "removed"
+    """The device is no longer returned by the API."""
+
+    CHANGED = "changed"
+    """One or more watched fields differ from the previous snapshot."""
+
+
+@dataclass(frozen=True)
+class DeviceChange:
+    """One device's difference between two consecutive device lists."""
+
+    kind: DeviceChangeKind
+    device_uuid: str
+    device: Device
+    """The current device, or the last known one for ``REMOVED`` events."""
+
+    previous: Device | None = None
+    """The device from the previous snapshot (``CHANGED`` and ``REMOVED`` events)."""
+
+    changes: dict[str, tuple[object, object]] = field(default_factory=dict)
+    """Map of field name to ``(old, new)`` for ``CHANGED`` events; empty otherwise."""
+
+    def changed(self, *names: str) -> bool:
+        """Return ``True`` if any of *names* is among the changed fields."""
+        return any(name in self.changes for name in names)
+
+
+def diff_device(
+    previous: Device, current: Device, fields: Iterable[str] = WATCHED_FIELDS
+) -> dict[str, tuple[object, object]]:
+    """Return ``{field: (old, new)}`` for every field in *fields* that differs."""
+    if previous is current:
+        return {}
+    changes = {}
+    for name in fields:
+        old = getattr(previous, name)
+        new = getattr(current, name)
+        if old != new:
+            changes[name] = (old, new)
+    return changes
+
+
+def diff_devices(
+    previous: Mapping[str, Device],
+    current: Mapping[str, Device],
+    fields: Iterable[str] = WATCHED_FIELDS,
+) -> list[DeviceChange]:
+    """Compare two device snapshots keyed by UUID.
+
+    Events are ordered as the devices appear in *current*, followed by the
+    removed devices in *previous* order.
+
+    :param previous: The earlier snapshot.
+    :param current: The later snapshot.
+    :param fields: Device fields to compare; changes to other fields are ignored.
+    :return: One :class:`DeviceChange` per added, removed, or changed device.
+    """
+    fields = tuple(fields)
+    events = []
+    for uuid, device in current.items():
+        old = previous.get(uuid)
+        if old is None:
+            events.append(DeviceChange(DeviceChangeKind.ADDED, uuid, device))
+            continue
+        changes = diff_device(old, device, fields)
+        if changes:
+            events.append(DeviceChange(DeviceChangeKind.CHANGED, uuid, device, old, changes))
+    for uuid, device in previous.items():
+        if uuid not in current:
+            events.append(DeviceChange(DeviceChangeKind.REMOVED, uuid, device, device))
+    return events
+
+
+class DeviceWatcher:
+    """Poll a :class:`~pymbrewclient.client.BreweryClient` and emit device changes.
+
+    Example::
+
+        def on_change(change):
+            if change.changed("connection_status", "process_state", "active_session"):
+                print(change.device_uuid, change.changes)
+
+        with client.watch_devices(on_change, interval=60) as watcher:
+            ...
+
+    The first refresh reports every device as ``ADDED``.  Refreshes run on a
+    background thread after :meth:`start`, or on demand with :meth:`refresh`;
+    device lists fetched elsewhere can be fed in with :meth:`apply`.
+
+    :param client: The client whose devices are watched.
+    :param interval: Seconds between refreshes once started.
+    :param fields: Device fields to compare; defaults to :data:`WATCHED_FIELDS`,
+        which leaves out the ``last_time_online`` heartbeat.  Pass
+        :data:`~pymbrewclient.rest.models.DEVICE_FIELDS` to compare everything.
+    :raises ValueError: If *fields* names an unknown device field.
+    """
+
+    def __init__(
+        self,
+        client: BreweryClient,
+        interval: float = DEFAULT_WATCH_INTERVAL,
+        fields: Iterable[str] | None = None,
+    ) -> None:
+        self.client = client
+        self.interval = interval
+        self.fields: tuple[str, ...] = WATCHED_FIELDS if fields is None else tuple(fields)
+        unknown = [name for name in self.fields if name not in _DEVICE_FIELD_SET]
+        if unknown:
+            raise ValueError(f"Unknown device field(s): {', '.join(unknown)}")
+        self._snapshot: dict[str, Device] = {}
+        self._callbacks: list[Callable[[DeviceChange], None]] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def on_change(self, callback: Callable[[DeviceChange], None]) -> None:
+        """Register *callback* to receive every :class:`DeviceChange`."""
+        self._callbacks.append(callback)
+
+    @property
+    def snapshot(self) -> dict[str, Device]:
+        """The devices seen by the last refresh, keyed by UUID."""
+        return dict(self._snapshot)
+
+    def apply(self, devices: Iterable[Device]) -> list[DeviceChange]:
+        """Diff *devices* against the snapshot, replace it, and emit the changes.
+
+        :return: The emitted changes.
+        """
+        current = {device.uuid: device for device in devices}
+        with self._lock:
+            changes = diff_devices(self._snapshot, current, self.fields)
+            self._snapshot = current
+            for change in changes:
+                self._emit(change)
+        return changes
+
+    def refresh(self) -> list[DeviceChange]:
+        """Fetch the device list once and apply it; see :meth:`apply`."""
+        return self.apply(self.client.get_devices())
+
+    def _emit(self, change: DeviceChange) -> None:
+        for cb in self._callbacks:
+            try:
+                cb(change)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Exception in device change callback %s: %r", callback_name(cb), exc)
+
+    def start(self) -> "DeviceWatcher":
+        """Refresh every :attr:`interval` seconds on a background thread, starting now."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="device-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread, waiting for a refresh in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as exc:  # noqa: BLE001
+                # The exception text is not logged: it may echo request details.
+                logger.warning("Device refresh failed (%s); retrying in %ss", type(exc).__name__, self.interval)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "DeviceWatcher":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f"DeviceWatcher(devices={len(self._snapshot)}, interval={self.interval})"
@@ -1,17 +1,24 @@
+import heapq
 import io
 import json
 import logging
+import threading
+import time
 import unittest
 from datetime import datetime, timezone
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+from click.testing import Result
 from typer.testing import CliRunner
 
 from pymbrewclient.cli import app, curate_device_log_output
 from pymbrewclient.client import BreweryClient, BreweryClientError, DeviceLookupError
+from pymbrewclient.fleet import FleetClient, FleetClientError
 from pymbrewclient.rest.client import RestApiClient
 from pymbrewclient.rest.models import Beer, BreweryOverview, Device, TokenResponse, UserProfile, format_duration
+from pymbrewclient.scheduler import PollIntervals, PollScheduler, PollTier, RequestBudget, poll_tier
+from pymbrewclient.watch import DeviceChange, DeviceChangeKind
 
 DEVICE_PAYLOAD = {
     "uuid": "device-uuid-1",
@@ -163,6 +170,47 @@ class TestRestApiClient(unittest.TestCase):
         self.client._ensure_token()
         self.assertEqual(mock_get_token.call_count, 2)
 
+    @patch("pymbrewclient.rest.client.RestApiClient._get_token")
+    @patch("time.time")
+    def test_get_valid_token_renews_close_to_expiry(self, mock_time: MagicMock, mock_get_token: MagicMock) -> None:
+        self.client.token = "mock_token"
+        self.client.token_expiry = 2000
+        mock_time.return_value = 1000
+        self.assertEqual(self.client.get_valid_token(), "mock_token")
+        mock_get_token.assert_not_called()
+
+        mock_time.return_value = 1990
+        self.client.get_valid_token()
+        mock_get_token.assert_called_once()
+
+    def test_concurrent_callers_share_one_token_refresh(self) -> None:
+        started = threading.Barrier(8)
+
+        def post(*args: object, **kwargs: object) -> MagicMock:
+            time.sleep(0.05)
+            response = MagicMock()
+            response.json.return_value = {"token": "fresh_token", "exp": 3600}
+            return response
+
+        self.client._http = MagicMock()
+        self.client._http.post.side_effect = post
+        tokens: list[str] = []
+
+        def worker() -> None:
+            started.wait()
+            tokens.append(self.client.get_valid_token())
+            self.client._ensure_token()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.client._http.post.assert_called_once()
+        self.assertEqual(tokens, ["fresh_token"] * 8)
+        self.assertEqual(self.client.headers["Authorization"], "Bearer fresh_token")
+
     @patch("pymbrewclient.rest.client.requests.get")
     @patch("pymbrewclient.rest.client.RestApiClient._ensure_token")
     def test_get(self, mock_ensure_token: MagicMock, mock_get: MagicMock) -> None:
@@ -378,6 +426,104 @@ class TestDeviceModel(unittest.TestCase):
         self.assertEqual(device["uuid"], "device-uuid-1")
         self.assertEqual(device.get("custom_name"), "Fermenter 1")
 
+    def test_dict_style_access_reads_fields_without_to_dict(self) -> None:
+        device = Device(**DEVICE_PAYLOAD)
+        expected = device.to_dict()
+
+        with patch.object(Device, "to_dict", side_effect=AssertionError("to_dict called")):
+            for key in ("uuid", "last_time_online", "process_estimate_remaining"):
+                self.assertEqual(device[key], expected[key], key)
+                self.assertIn(key, device)
+            self.assertIn("process_estimate_remaining_seconds", device)
+            self.assertIsInstance(device["process_estimate_remaining_seconds"], int)
+            self.assertNotIn("nope", device)
+            self.assertNotIn(1, device)
+            self.assertIsNone(device.get("nope"))
+            self.assertEqual(device.get("nope", 5), 5)
+            with self.assertRaises(KeyError):
+                device["nope"]
+
+    def test_to_dict_caches_fields_until_assignment(self) -> None:
+        device = Device(**DEVICE_PAYLOAD)
+        first = device.to_dict()
+        first["custom_name"] = "changed by caller"
+
+        with patch("pymbrewclient.rest.models.datetime_to_api_string") as to_string:
+            self.assertEqual(device.to_dict()["custom_name"], "Fermenter 1")
+            to_string.assert_not_called()
+
+        device.custom_name = "Fermenter 2"
+        device.last_time_online = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        refreshed = device.to_dict()
+        self.assertEqual(refreshed["custom_name"], "Fermenter 2")
+        self.assertEqual(refreshed["last_time_online"], "2026-01-01T00:00:00Z")
+        self.assertEqual(device["last_time_online"], "2026-01-01T00:00:00Z")
+
+    def test_coerce_device_payload_matches_constructor(self) -> None:
+        from pymbrewclient.rest.models import coerce_device_payload
+
+        payload = {**DEVICE_PAYLOAD, "unknown_field": 1, "active_session": None, "session_id": 42}
+        device = coerce_device_payload(payload)
+        expected = Device(**{key: value for key, value in payload.items() if key != "unknown_field"})
+        self.assertEqual(device, expected)
+        self.assertEqual(device.active_session, 42)
+        self.assertEqual(device.last_time_online.tzinfo, timezone.utc)
+        self.assertEqual(device.to_dict()["last_time_online"], expected.to_dict()["last_time_online"])
+        with self.assertRaises(TypeError):
+            coerce_device_payload({"serial_number": "no-uuid"})
+
+    def test_coerce_device_payloads(self) -> None:
+        from pymbrewclient.rest.models import coerce_device_payloads
+
+        existing = Device(uuid="existing")
+        devices = coerce_device_payloads([DEVICE_PAYLOAD, existing])
+        self.assertIs(devices[1], existing)
+        self.assertEqual(devices[0].process_estimate_remaining.microsecond, 542739)
+        with self.assertRaises(ValueError):
+            coerce_device_payloads([{"uuid": "bad", "last_time_online": "yesterday"}])
+
+    def test_timestamp_strings_are_parsed_on_assignment(self) -> None:
+        from pymbrewclient.rest.models import parse_api_datetime
+
+        device = Device(uuid="a", last_time_online="2024-07-26T12:00:00.5Z")
+        self.assertEqual(device.last_time_online, datetime(2024, 7, 26, 12, 0, 0, 500000, tzinfo=timezone.utc))
+        device.process_estimate_remaining = "2024-07-26T13:00:00Z"
+        self.assertEqual(device.process_estimate_remaining, datetime(2024, 7, 26, 13, tzinfo=timezone.utc))
+        self.assertIsNone(parse_api_datetime(""))
+
+    def test_device_is_slotted_and_interns_repeated_strings(self) -> None:
+        import copy
+        import dataclasses
+        import pickle
+
+        from pymbrewclient.rest.models import coerce_device_payload
+
+        stage = "".join(["ferment", "ing"])
+        first = Device(uuid="a", stage=stage, software_version="".join(["2.1", ".0"]))
+        second = coerce_device_payload({"uuid": "b", "stage": "".join(["fer", "menting"]), "software_version": "2.1.0"})
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertIs(first.stage, second.stage)
+        self.assertIs(first.software_version, second.software_version)
+
+        device = Device(**DEVICE_PAYLOAD)
+        self.assertEqual(copy.copy(device), device)
+        self.assertEqual(pickle.loads(pickle.dumps(device)), device)
+        renamed = dataclasses.replace(device, custom_name="Fermenter 9")
+        self.assertEqual(renamed["custom_name"], "Fermenter 9")
+        self.assertEqual(renamed.last_time_online, device.last_time_online)
+
+    def test_overview_shares_identical_devices_across_buckets(self) -> None:
+        changed = {**DEVICE_PAYLOAD, "uuid": "device-uuid-2"}
+        overview = BreweryOverview(
+            brew_clean_idle=[dict(DEVICE_PAYLOAD), changed],
+            fermenting=[dict(DEVICE_PAYLOAD)],
+            serving=[{**changed, "stage": "serving"}],
+            brew_acid_clean_idle=[],
+        )
+        self.assertIs(overview.fermenting[0], overview.brew_clean_idle[0])
+        self.assertIsNot(overview.serving[0], overview.brew_clean_idle[1])
+        self.assertEqual(overview.serving[0].stage, "serving")
+
     def test_future_estimates_calculate_expected_seconds(self) -> None:
         device = Device(**DEVICE_PAYLOAD)
         current_time = datetime(2026, 7, 18, 8, 40, 44, 542739, tzinfo=timezone.utc)
@@ -456,6 +602,384 @@ class TestBreweryClient(unittest.TestCase):
         self.assertIsInstance(remaining_seconds, int)
 
 
+class TestDeviceWatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = BreweryClient(username="test_user", password="test_password", base_url="https://api.example.com")
+        self.events: list[DeviceChange] = []
+        self.watcher = self.client.watch_devices(self.events.append, interval=0.01)
+
+    def test_first_refresh_reports_every_device_as_added(self) -> None:
+        devices = [Device(**DEVICE_PAYLOAD), Device(**{**DEVICE_PAYLOAD, "uuid": "device-uuid-2"})]
+        self.client.client.get_devices = MagicMock(return_value=devices)
+
+        changes = self.watcher.refresh()
+
+        self.assertEqual(changes, self.events)
+        self.assertEqual([c.kind for c in changes], [DeviceChangeKind.ADDED] * 2)
+        self.assertEqual(set(self.watcher.snapshot), {"device-uuid-1", "device-uuid-2"})
+
+    def test_only_changed_fields_are_reported(self) -> None:
+        self.watcher.apply([Device(**DEVICE_PAYLOAD), Device(**{**DEVICE_PAYLOAD, "uuid": "device-uuid-2"})])
+        self.events.clear()
+
+        changes = self.watcher.apply(
+            [
+                Device(**{**DEVICE_PAYLOAD, "connection_status": 2, "process_state": 102}),
+                Device(**{**DEVICE_PAYLOAD, "uuid": "device-uuid-2"}),
+            ]
+        )
+
+        self.assertEqual(len(changes), 1)
+        change = changes[0]
+        self.assertEqual(change.kind, DeviceChangeKind.CHANGED)
+        self.assertEqual(change.device_uuid, "device-uuid-1")
+        self.assertEqual(change.changes, {"connection_status": (1, 2), "process_state": (101, 102)})
+        self.assertTrue(change.changed("process_state", "active_session"))
+        self.assertFalse(change.changed("active_session"))
+        self.assertEqual(change.previous.process_state, 101)
+
+    def test_heartbeat_is_ignored_by_default(self) -> None:
+        from pymbrewclient.rest.models import DEVICE_FIELDS
+
+        self.watcher.apply([Device(**DEVICE_PAYLOAD)])
+        heartbeat = Device(**{**DEVICE_PAYLOAD, "last_time_online": "2030-01-01T00:00:00Z"})
+        self.assertEqual(self.watcher.apply([heartbeat]), [])
+
+        watcher = self.client.watch_devices(fields=DEVICE_FIELDS)
+        watcher.apply([Device(**DEVICE_PAYLOAD)])
+        self.assertEqual(list(watcher.apply([heartbeat])[0].changes), ["last_time_online"])
+
+    def test_removed_devices_are_reported(self) -> None:
+        self.watcher.apply([Device(**DEVICE_PAYLOAD)])
+
+        changes = self.watcher.apply([])
+
+        self.assertEqual(changes[0].kind, DeviceChangeKind.REMOVED)
+        self.assertEqual(changes[0].device.uuid, "device-uuid-1")
+        self.assertEqual(self.watcher.snapshot, {})
+
+    def test_fields_limit_the_comparison(self) -> None:
+        watcher = self.client.watch_devices(fields=["active_session"])
+        watcher.apply([Device(**DEVICE_PAYLOAD)])
+
+        self.assertEqual(watcher.apply([Device(**{**DEVICE_PAYLOAD, "last_time_online": "2026-07-18T10:00:00Z"})]), [])
+        changes = watcher.apply([Device(**{**DEVICE_PAYLOAD, "active_session": None, "session_id": None})])
+        self.assertEqual(changes[0].changes, {"active_session": (80675, None)})
+
+    def test_unknown_field_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.client.watch_devices(fields=["no_such_field"])
+
+    def test_failing_callback_does_not_stop_others(self) -> None:
+        self.watcher._callbacks.insert(0, MagicMock(side_effect=RuntimeError("boom")))
+
+        with self.assertLogs("pymbrewclient.watch", level="WARNING"):
+            self.watcher.apply([Device(**DEVICE_PAYLOAD)])
+
+        self.assertEqual(len(self.events), 1)
+
+    def test_background_thread_survives_fetch_errors(self) -> None:
+        refreshed = threading.Event()
+        responses = iter([RuntimeError("offline"), [Device(**DEVICE_PAYLOAD)]])
+
+        def get_devices() -> list[Device]:
+            response = next(responses, [Device(**DEVICE_PAYLOAD)])
+            if isinstance(response, Exception):
+                raise response
+            refreshed.set()
+            return response
+
+        self.client.client.get_devices = get_devices
+        with self.assertLogs("pymbrewclient.watch", level="WARNING") as logs, self.watcher:
+            self.assertTrue(refreshed.wait(2))
+        self.assertIn("RuntimeError", logs.output[0])
+        self.assertNotIn("offline", logs.output[0])
+        self.assertEqual([c.kind for c in self.events], [DeviceChangeKind.ADDED])
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+MASHING = {"process_type": 1, "process_state": 31, "connection_status": 1}
+SERVING = {"process_type": 5, "process_state": 92, "connection_status": 1}
+OFFLINE = {"process_type": 5, "process_state": 92, "connection_status": 0}
+
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = _FakeClock()
+        self.client = BreweryClient(username="test_user", password="test_password", base_url="https://api.example.com")
+        self.devices = [Device(**DEVICE_PAYLOAD)]
+        self.client.client.get_devices = MagicMock(side_effect=lambda: self.devices)
+        self.client.client.get_brewery_overview = MagicMock(return_value="overview")
+        self.client.client.get_session_info = MagicMock(side_effect=lambda sid: f"session-{sid}")
+        self.intervals = PollIntervals(active=10, busy=60, idle=600, offline=100, max_backoff=1000, overview=300)
+
+    def _scheduler(self, budget: RequestBudget | None = None) -> PollScheduler:
+        return PollScheduler(self.client, intervals=self.intervals, budget=budget, clock=self.clock)
+
+    def test_poll_tier_classifies_devices(self) -> None:
+        self.assertEqual(poll_tier(Device(**{**DEVICE_PAYLOAD, **MASHING})), PollTier.ACTIVE)
+        self.assertEqual(
+            poll_tier(Device(**{**DEVICE_PAYLOAD, "process_state": 51, "process_type": 1})), PollTier.ACTIVE
+        )
+        self.assertEqual(poll_tier(Device(**{**DEVICE_PAYLOAD, "process_type": 4, "process_state": 80})), PollTier.BUSY)
+        self.assertEqual(poll_tier(Device(**{**DEVICE_PAYLOAD, **SERVING})), PollTier.IDLE)
+        self.assertEqual(poll_tier(Device(**{**DEVICE_PAYLOAD, **OFFLINE})), PollTier.OFFLINE)
+
+    def test_first_run_polls_every_endpoint_and_sessions(self) -> None:
+        scheduler = self._scheduler()
+        sessions: list[object] = []
+        scheduler.on_session(sessions.append)
+
+        delay = scheduler.run_pending()
+
+        self.assertEqual(scheduler.requests, 3)
+        self.assertEqual(sessions, ["session-80675"])
+        self.assertEqual(set(scheduler.jobs), {"devices", "overview", "session:80675"})
+        self.assertEqual(scheduler.watcher.snapshot, {"device-uuid-1": self.devices[0]})
+        self.assertEqual(delay, 60)
+
+    def test_intervals_follow_the_device_phase(self) -> None:
+        self.devices = [Device(**{**DEVICE_PAYLOAD, **SERVING})]
+        scheduler = self._scheduler()
+        scheduler.run_pending()
+        self.assertEqual(scheduler.jobs["devices"], 600)
+        self.assertEqual(scheduler.jobs["session:80675"], 600)
+
+        self.devices = [Device(**{**DEVICE_PAYLOAD, **MASHING})]
+        self.clock.now += 300
+        scheduler.run_pending()  # overview only
+        self.clock.now += 300
+        scheduler.run_pending()
+
+        self.assertEqual(scheduler.jobs["devices"], 10)
+        self.assertEqual(scheduler.jobs["session:80675"], 10)
+        self.assertEqual(scheduler.run_pending(), 10)
+
+    def test_busier_device_brings_session_poll_forward(self) -> None:
+        self.devices = [Device(**{**DEVICE_PAYLOAD, **SERVING})]
+        scheduler = self._scheduler()
+        scheduler.run_pending()
+        scheduler._jobs["devices"].due = self.clock.now + 30
+        heapq.heappush(scheduler._heap, (self.clock.now + 30, "devices"))
+
+        self.devices = [Device(**{**DEVICE_PAYLOAD, **MASHING})]
+        self.clock.now += 30
+        scheduler.run_pending()
+
+        self.assertEqual(self.client.client.get_session_info.call_count, 2)
+
+    def test_offline_sessions_back_off(self) -> None:
+        self.devices = [Device(**{**DEVICE_PAYLOAD, **OFFLINE})]
+        scheduler = self._scheduler()
+        intervals = []
+        for _ in range(5):
+            scheduler.run_pending()
+            intervals.append(scheduler.jobs["session:80675"])
+            self.clock.now = scheduler._jobs["session:80675"].due
+
+        self.assertEqual(intervals, [200, 400, 800, 1000, 1000])
+
+    def test_ended_sessions_are_dropped(self) -> None:
+        scheduler = self._scheduler()
+        scheduler.run_pending()
+
+        self.devices = [Device(**{**DEVICE_PAYLOAD, "active_session": None, "session_id": None})]
+        self.clock.now += 60
+        scheduler.run_pending()
+        self.clock.now += 60
+        scheduler.run_pending()
+
+        self.assertNotIn("session:80675", scheduler.jobs)
+        self.assertEqual(self.client.client.get_session_info.call_count, 1)
+
+    def test_failed_job_backs_off_and_recovers(self) -> None:
+        self.intervals = PollIntervals(busy=60, overview=None)
+        scheduler = self._scheduler()
+        self.client.client.get_devices = MagicMock(side_effect=RuntimeError("secret detail"))
+
+        with self.assertLogs("pymbrewclient.scheduler", level="WARNING") as logs:
+            self.assertEqual(scheduler.run_pending(), 1200)
+        self.assertNotIn("secret detail", logs.output[0])
+
+        self.client.client.get_devices = MagicMock(return_value=self.devices)
+        self.clock.now += 1200
+        scheduler.run_pending()
+        self.assertEqual(scheduler._jobs["devices"].failures, 0)
+
+    def test_budget_limits_requests(self) -> None:
+        budget = RequestBudget(rate=0.5, burst=1, clock=self.clock)
+        scheduler = self._scheduler(budget)
+
+        self.assertEqual(scheduler.run_pending(), 2)
+        self.assertEqual(scheduler.requests, 1)
+
+        self.clock.now += 2
+        scheduler.run_pending()
+        self.clock.now += 2
+        scheduler.run_pending()
+        self.assertEqual(scheduler.requests, 3)
+
+    def test_budget_rejects_invalid_settings(self) -> None:
+        with self.assertRaises(ValueError):
+            RequestBudget(rate=0)
+        with self.assertRaises(ValueError):
+            RequestBudget(rate=1, burst=0)
+
+    def test_background_thread_polls(self) -> None:
+        polled = threading.Event()
+        scheduler = self.client.create_poll_scheduler(intervals=PollIntervals(overview=None))
+        scheduler.on_devices(lambda devices: polled.set())
+
+        with scheduler:
+            self.assertTrue(polled.wait(2))
+
+
+class TestFleetClient(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fleet = FleetClient(
+            {"pub": ("pub@example.com", "p1"), "tap": ("tap@example.com", "p2")},
+            base_url="https://api.example.com",
+        )
+        self.addCleanup(self.fleet.close)
+
+    def test_each_account_has_own_client_and_session(self) -> None:
+        pub, tap = self.fleet.accounts["pub"], self.fleet.accounts["tap"]
+        self.assertEqual(pub.client.username, "pub@example.com")
+        self.assertEqual(tap.client.username, "tap@example.com")
+        self.assertIsNot(pub.client._http, tap.client._http)
+
+    def test_get_devices_merges_index(self) -> None:
+        self.fleet.accounts["pub"].client.get_devices = MagicMock(return_value=[Device(**DEVICE_PAYLOAD)])
+        self.fleet.accounts["tap"].client.get_devices = MagicMock(
+            return_value=[Device(**{**DEVICE_PAYLOAD, "uuid": "device-uuid-2"})]
+        )
+
+        devices = self.fleet.get_devices()
+
+        self.assertEqual(set(devices), {"pub", "tap"})
+        self.assertEqual(self.fleet.find_device("device-uuid-2").account, "tap")
+        self.assertEqual(set(self.fleet.device_index), {"device-uuid-1", "device-uuid-2"})
+
+    def test_accounts_are_fetched_concurrently(self) -> None:
+        barrier = threading.Barrier(2, timeout=2)
+
+        def slow_overview() -> BreweryOverview:
+            barrier.wait()  # only passes when both accounts are in flight at once
+            return BreweryOverview(brew_clean_idle=[], fermenting=[], serving=[], brew_acid_clean_idle=[])
+
+        for client in self.fleet.accounts.values():
+            client.client.get_brewery_overview = MagicMock(side_effect=slow_overview)
+
+        overviews = self.fleet.get_brewery_overviews()
+
+        self.assertEqual(set(overviews), {"pub", "tap"})
+
+    def test_failed_account_reports_partial_results(self) -> None:
+        self.fleet.accounts["pub"].client.get_devices = MagicMock(return_value=[Device(**DEVICE_PAYLOAD)])
+        self.fleet.accounts["tap"].client.get_devices = MagicMock(side_effect=RuntimeError("boom"))
+
+        with self.assertRaises(FleetClientError) as context:
+            self.fleet.get_devices()
+
+        self.assertEqual(set(context.exception.errors), {"tap"})
+        self.assertIn("pub", context.exception.results)
+        self.assertEqual(self.fleet.find_device("device-uuid-1").account, "pub")
+
+    def test_unknown_device_raises_lookup_error(self) -> None:
+        for client in self.fleet.accounts.values():
+            client.client.get_devices = MagicMock(return_value=[])
+
+        with self.assertRaises(DeviceLookupError):
+            self.fleet.find_device("missing")
+
+    def test_miss_fetches_only_unindexed_accounts(self) -> None:
+        pub, tap = self.fleet.accounts["pub"].client, self.fleet.accounts["tap"].client
+        pub.get_devices = MagicMock(return_value=[Device(**DEVICE_PAYLOAD)])
+        tap.get_devices = MagicMock(side_effect=RuntimeError("boom"))
+        with self.assertRaises(FleetClientError):
+            self.fleet.get_devices()
+        tap.get_devices = MagicMock(return_value=[Device(**{**DEVICE_PAYLOAD, "uuid": "device-uuid-2"})])
+
+        self.assertEqual(self.fleet.find_device("device-uuid-2").account, "tap")
+        pub.get_devices.assert_called_once()
+
+        with self.assertRaises(DeviceLookupError):
+            self.fleet.find_device("missing")
+        pub.get_devices.assert_called_once()
+        tap.get_devices.assert_called_once()
+
+    def test_worker_threads_are_reused(self) -> None:
+        for client in self.fleet.accounts.values():
+            client.client.get_devices = MagicMock(return_value=[])
+
+        self.fleet.get_devices()
+        executor = self.fleet._executor
+        self.fleet.get_devices()
+
+        self.assertIs(self.fleet._executor, executor)
+        self.fleet.add_account("cellar", "cellar@example.com", "p3")
+        self.assertIsNone(self.fleet._executor)
+
+    def test_remove_account_closes_its_session(self) -> None:
+        http = self.fleet.accounts["pub"].client._http
+        with patch.object(http, "close") as close:
+            self.fleet.remove_account("pub")
+        close.assert_called_once()
+
+    def test_duplicate_account_name_rejected(self) -> None:
+        with self.assertRaises(BreweryClientError):
+            self.fleet.add_account("pub", "x", "y")
+
+    def test_mqtt_subscriptions_follow_owning_account(self) -> None:
+        self.fleet.accounts["pub"].client.get_devices = MagicMock(return_value=[Device(**DEVICE_PAYLOAD)])
+        self.fleet.accounts["tap"].client.get_devices = MagicMock(return_value=[])
+        self.fleet.get_devices()
+
+        with (
+            patch("pymbrewclient.rest.client.RestApiClient._ensure_token"),
+            patch("pymbrewclient.rest.client.RestApiClient.get_user_profile") as mock_profile,
+            patch("pymbrewclient.mqtt.client._paho.Client", side_effect=lambda **kwargs: MagicMock()),
+        ):
+            mock_profile.return_value = UserProfile(uuid="uid")
+            mqtt = self.fleet.create_mqtt_client()
+
+        received: list[object] = []
+        mqtt.on_message(received.append)
+        mqtt.subscribe_device_logs("device-uuid-1")
+
+        self.assertTrue(mqtt.clients["pub"].is_subscribed("devices/logs/device-uuid-1"))
+        self.assertFalse(mqtt.clients["tap"].is_subscribed("devices/logs/device-uuid-1"))
+
+        message = MagicMock(topic="devices/events/device-uuid-1", payload=b"\x01")
+        mqtt.clients["tap"]._on_paho_message(None, None, message)
+        self.assertEqual(len(received), 1)
+
+
+    def test_failed_mqtt_setup_disconnects_the_other_accounts(self) -> None:
+        created: list[MagicMock] = []
+
+        def create(client: BreweryClient, track_shadow: bool = True) -> MagicMock:
+            if client is self.fleet.accounts["tap"]:
+                raise BreweryClientError("auth failed")
+            mqtt = MagicMock()
+            created.append(mqtt)
+            return mqtt
+
+        with patch.object(BreweryClient, "create_mqtt_client", autospec=True, side_effect=create):
+            with self.assertRaises(FleetClientError) as context:
+                self.fleet.create_mqtt_client()
+
+        self.assertEqual(set(context.exception.errors), {"tap"})
+        self.assertEqual(len(created), 1)
+        created[0].disconnect.assert_called_once()
+
 class TestCli(unittest.TestCase):
     def test_process_estimate_cli_outputs_json(self) -> None:
         runner = CliRunner()
@@ -707,6 +1231,224 @@ class TestCli(unittest.TestCase):
         result = serialize_output({"payload": b"\x01\x02"})
         self.assertEqual(result, {"payload": "0102"})
 
+    def test_serialize_output_nested_models(self) -> None:
+        from pymbrewclient.cli import serialize_output
+        from pymbrewclient.mqtt.enums import ProcessType
+        from pymbrewclient.rest.models import Session
+
+        device = Device(uuid="dev-1", last_time_online="2024-07-26T12:00:00Z", current_temp=18.5)
+        overview = BreweryOverview(brew_clean_idle=[device], fermenting=[], serving=[], brew_acid_clean_idle=[])
+        self.assertEqual(serialize_output(device), device.to_dict())
+        self.assertEqual(
+            serialize_output(overview),
+            {"brew_clean_idle": [device.to_dict()], "fermenting": [], "serving": [], "brew_acid_clean_idle": []},
+        )
+        self.assertEqual(
+            serialize_output({"type": ProcessType.PROC_BREWING, "at": (device,)}),
+            {
+                "type": 1,
+                "at": [device.to_dict()],
+            },
+        )
+
+        session = Session(
+            id=1,
+            profile=2,
+            beer={"id": 3, "name": "Pils", "image": None, "style_name": "Lager"},
+            device={
+                "uuid": "dev-1",
+                "serial_number": "SER",
+                "current_state": 1,
+                "process_type": 4,
+                "process_state": 80,
+                "user_action": 0,
+                "device_type": 1,
+                "connection_status": 1,
+                "last_time_online": "2024-07-26T12:00:00Z",
+                "software_version": "1.0",
+                "custom_name": "Craft",
+            },
+            status=1,
+            session_type=0,
+            pending_command_seq=0,
+            pending_command_type=0,
+            pending_command_error=0,
+            beer_recipe_id=5,
+            beer_recipe_version="1",
+            brew_timestamp=0.0,
+            original_gravity=1.05,
+            timestamp_original_gravity=0.0,
+            is_brewpack=False,
+        )
+        serialized = serialize_output(session)
+        self.assertEqual(serialized["beer"], {"id": 3, "name": "Pils", "image": None, "style_name": "Lager"})
+        self.assertEqual(serialized["device"]["custom_name"], "Craft")
+        json.dumps(serialized)
+
+    def test_serialize_output_caches_one_serializer_per_class(self) -> None:
+        from pymbrewclient import cli
+
+        class Reading:
+            def __init__(self, value: float) -> None:
+                self.value = value
+                self.at = datetime(2024, 7, 26, 12, 0, 0, tzinfo=timezone.utc)
+
+        with patch.object(cli, "_build_serializer", wraps=cli._build_serializer) as build:
+            self.assertEqual(
+                cli.serialize_output([Reading(1.0), Reading(2.0)]),
+                [{"value": 1.0, "at": "2024-07-26T12:00:00Z"}, {"value": 2.0, "at": "2024-07-26T12:00:00Z"}],
+            )
+        self.assertEqual([call.args[0] for call in build.call_args_list], [Reading])
+
+        cli.register_serializer(Reading, lambda reading: reading.value)
+        self.assertEqual(cli.serialize_output({"r": Reading(3.0)}), {"r": 3.0})
+
+    def test_serialize_output_pydantic_models_read_fields_directly(self) -> None:
+        import warnings
+
+        from pydantic import BaseModel
+
+        from pymbrewclient.cli import serialize_output
+
+        class Hop(BaseModel):
+            name: str
+            added: datetime
+
+        class Recipe(BaseModel):
+            title: str
+            hops: list[Hop]
+            payload: bytes = b"\x01"
+
+        recipe = Recipe(title="Pils", hops=[Hop(name="Saaz", added=datetime(2024, 7, 26, 12, tzinfo=timezone.utc))])
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            serialized = serialize_output(recipe)
+        self.assertEqual(
+            serialized,
+            {"title": "Pils", "hops": [{"name": "Saaz", "added": "2024-07-26T12:00:00Z"}], "payload": "01"},
+        )
+
+    def test_serialize_output_device_lists_share_one_clock_reading(self) -> None:
+        from pymbrewclient import cli
+
+        devices = [
+            Device(uuid=f"dev-{i}", process_estimate_remaining=datetime(2099, 1, 1, tzinfo=timezone.utc))
+            for i in range(3)
+        ]
+        with patch.object(
+            Device, "get_process_estimate_remaining_seconds", autospec=True, return_value=60
+        ) as remaining:
+            serialized = cli.serialize_output([*devices, {"other": 1}])
+        self.assertEqual([d["process_estimate_remaining_formatted"] for d in serialized[:3]], ["0:01:00"] * 3)
+        self.assertEqual(serialized[3], {"other": 1})
+        instants = {call.args[1] for call in remaining.call_args_list}
+        self.assertEqual(len(instants), 1)
+        self.assertIsNotNone(instants.pop())
+
+        original = cli._serializers.pop(Device, None)
+        try:
+            cli.register_serializer(Device, lambda device: device.uuid)
+            self.assertEqual(cli.serialize_output(devices), ["dev-0", "dev-1", "dev-2"])
+        finally:
+            del cli._serializers[Device]
+            if original is not None:
+                cli.register_serializer(Device, original)
+
+    def _invoke_watch_jsonl(self, messages: list, *extra: str) -> Result:
+        mock_mqtt = MagicMock()
+        mock_mqtt.__enter__ = MagicMock(return_value=mock_mqtt)
+        mock_mqtt.__exit__ = MagicMock(return_value=False)
+        callbacks: list = []
+        mock_mqtt.on_device_log.side_effect = callbacks.append
+        mock_mqtt.on_connected.side_effect = lambda cb: cb()
+        mock_client = MagicMock()
+        mock_client.create_mqtt_client.return_value = mock_mqtt
+
+        def fake_wait(event: object, timeout: object = None) -> bool:  # type: ignore[override]
+            for message in messages:
+                callbacks[0](message)
+            return True
+
+        with (
+            patch("pymbrewclient.cli.initialize_brewery_client", return_value=mock_client),
+            patch("threading.Event.wait", fake_wait),
+        ):
+            return CliRunner().invoke(
+                app,
+                [
+                    "watch-device-logs",
+                    "--username",
+                    "user",
+                    "--password",
+                    "pass",
+                    "--serial",
+                    "SER-001",
+                    "--format",
+                    "jsonl",
+                    "--duration",
+                    "0",
+                    *extra,
+                ],
+            )
+
+    def test_watch_device_logs_jsonl_writes_one_compact_line_per_message(self) -> None:
+        from pymbrewclient.mqtt.models import DeviceLogMessage
+
+        messages = [
+            DeviceLogMessage(
+                topic="devices/logs/SER-001",
+                payload=b"\x08\x01",
+                received_at=datetime(2024, 7, 26, 12, 0, i, tzinfo=timezone.utc),
+                device_uuid="SER-001",
+                sequence_number=i,
+                current_state=1,
+                current_temperature=19.5,
+            )
+            for i in range(3)
+        ]
+        result = self._invoke_watch_jsonl(messages)
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        lines = result.stdout.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn(" ", lines[0])
+        first = json.loads(lines[0])
+        self.assertEqual(first, curate_device_log_output(messages[0]) | {"received_at": "2024-07-26T12:00:00Z"})
+        self.assertEqual([json.loads(line)["sequence_number"] for line in lines], [0, 1, 2])
+        self.assertIn("Connected. Watching: SER-001", result.stderr)
+
+    def test_watch_device_logs_jsonl_debug_matches_json_output(self) -> None:
+        from pymbrewclient.cli import serialize_output
+        from pymbrewclient.mqtt.models import DeviceLogMessage
+
+        message = DeviceLogMessage(
+            topic="devices/logs/SER-001",
+            payload=b"\x08\x01",
+            received_at=datetime(2024, 7, 26, 12, 0, 0, tzinfo=timezone.utc),
+            device_uuid="SER-001",
+            raw_fields={1: [1, b"\x02"]},
+            measurements={0: 27.3, 24: -45.0},
+        )
+        result = self._invoke_watch_jsonl([message], "--debug")
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(json.loads(result.stdout), json.loads(json.dumps(serialize_output(message))))
+
+    def test_jsonl_writer_flushes_periodically_not_per_line(self) -> None:
+        from pymbrewclient import cli
+
+        stream = MagicMock()
+        writer = cli._JsonLinesWriter(stream)
+        for i in range(100):
+            writer.write({"n": i})
+        self.assertEqual(stream.write.call_count, 100)
+        stream.flush.assert_not_called()
+
+        stop = threading.Event()
+        with patch.object(cli, "JSONL_FLUSH_INTERVAL", 0.01):
+            cli._wait_flushing(stop, 0.05, writer)
+        self.assertGreaterEqual(stream.flush.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,18 +1,27 @@
+import importlib.util
+import queue
+import random
 import struct
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+from pymbrewclient.mqtt.broker import LocalBroker, SyntheticPublisher, topic_matches
 from pymbrewclient.mqtt.client import (
     BROKER_HOST,
     BROKER_PORT,
+    DEVICE_LOG_TOPIC_PREFIX,
     KEEPALIVE,
     RECONNECT_DELAY,
     WS_PATH,
     MqttClient,
     _extract_device_uuid,
 )
+from pymbrewclient.mqtt.delivery import Conflate, RateLimit, Sample
 from pymbrewclient.mqtt.enums import (
     ActuatorType,
     ErrorType,
@@ -23,8 +32,26 @@ from pymbrewclient.mqtt.enums import (
     ProcessType,
     SensorType,
 )
+from pymbrewclient.mqtt.filters import FieldChanged, MessageFilter, Predicate, Threshold
+from pymbrewclient.mqtt.hooks import CallbackTimer, DispatchHook, SlowCallbackLogger
+from pymbrewclient.mqtt.metrics import (
+    DURATION_BUCKETS,
+    MetricsServer,
+    MqttMetrics,
+    escape_label_value,
+    render_prometheus,
+    topic_family,
+)
 from pymbrewclient.mqtt.models import DeviceLogMessage, MqttMessage
-from pymbrewclient.mqtt.proto import decode_device_log, decode_raw_fields
+from pymbrewclient.mqtt.pool import HashRing, MqttClientPool
+from pymbrewclient.mqtt.proto import decode_device_log, decode_raw_fields, encode_device_log, peek_envelope_header
+from pymbrewclient.mqtt.reconnect import ConnectAttempt, ExponentialBackoff, FixedDelay, ReconnectStrategy
+from pymbrewclient.mqtt.recording import MqttRecorder, MqttReplay
+from pymbrewclient.mqtt.rollup import DEFAULT_RESOLUTIONS, RollupEngine
+from pymbrewclient.mqtt.sequence import SequenceEvent, SequenceEventKind, SequenceStats, SequenceTracker
+from pymbrewclient.mqtt.shadow import DeviceShadowStore
+from pymbrewclient.mqtt.timeseries import RingBuffer, TimeSeriesStore
+import requests
 from requests.certs import where as requests_ca_bundle
 
 # ---------------------------------------------------------------------------
@@ -159,6 +186,7 @@ class TestMqttBrokerConfiguration(unittest.TestCase):
         self.assertEqual(BROKER_PORT, 15675)
         self.assertEqual(WS_PATH, "/ws")
         self.assertEqual(KEEPALIVE, 60)
+        self.assertEqual(MqttClient.device_log_topic("dev-1"), f"{DEVICE_LOG_TOPIC_PREFIX}dev-1")
 
     def test_paho_client_uses_websocket_transport(self) -> None:
         with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
@@ -908,6 +936,24 @@ class TestBreweryClientCreateMqttClient(unittest.TestCase):
 
         self.assertIsInstance(mqtt, MqttClient)
 
+    def test_create_mqtt_client_passes_track_shadow(self) -> None:
+        from pymbrewclient.client import BreweryClient
+        from pymbrewclient.rest.models import UserProfile
+
+        with (
+            patch("pymbrewclient.rest.client.RestApiClient._ensure_token"),
+            patch("pymbrewclient.rest.client.RestApiClient.get_user_profile") as mock_profile,
+            patch("pymbrewclient.mqtt.client._paho.Client"),
+        ):
+            mock_profile.return_value = UserProfile(uuid="profile-uuid-xyz")
+            bc = BreweryClient("u", "p", base_url="https://api.example.com")
+            bc.client.token = "rest-token-abc"
+
+            mqtt = bc.create_mqtt_client(track_shadow=False)
+
+        mqtt._handle_message("devices/logs/dev-1", _build_envelope(1), datetime.now(tz=timezone.utc))
+        self.assertEqual(len(mqtt.shadow), 0)
+
     def test_create_mqtt_client_reuses_rest_token(self) -> None:
         from pymbrewclient.client import BreweryClient
         from pymbrewclient.rest.models import UserProfile
@@ -972,5 +1018,1663 @@ class TestBreweryClientCreateMqttClient(unittest.TestCase):
         self.assertNotEqual(m1._client_id, m2._client_id)
 
 
+# ---------------------------------------------------------------------------
+# Device shadow
+# ---------------------------------------------------------------------------
+
+
+class TestDeviceShadow(unittest.TestCase):
+    def _make_client(self) -> tuple[MqttClient, MagicMock]:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            client = MqttClient(api_token="t", user_uuid="u")
+        return client, mock_paho
+
+    def _deliver(self, client: MqttClient, mock_paho: MagicMock, payload: bytes, device: str = "dev-1") -> None:
+        mock_msg = MagicMock()
+        mock_msg.topic = f"devices/logs/{device}"
+        mock_msg.payload = payload
+        client._on_paho_message(mock_paho, None, mock_msg)
+
+    def test_shadow_tracks_latest_decoded_values(self) -> None:
+        client, mock_paho = self._make_client()
+        self._deliver(client, mock_paho, _build_device_log_payload(current_temperature=15.5, process_state=80))
+
+        shadow = client.shadow.get("dev-1")
+        self.assertIsNotNone(shadow)
+        self.assertAlmostEqual(shadow.current_temperature, 15.5, places=2)
+        self.assertEqual(shadow.process_state, 80)
+        self.assertEqual(shadow.session_id, 12345)
+        self.assertEqual(shadow.message_count, 1)
+
+    def test_shadow_is_updated_before_device_log_callbacks(self) -> None:
+        client, mock_paho = self._make_client()
+        seen: list[float | None] = []
+        client.on_device_log(lambda msg: seen.append(client.shadow.get(msg.device_uuid).current_temperature))
+
+        self._deliver(client, mock_paho, _build_device_log_payload(current_temperature=18.0))
+
+        self.assertAlmostEqual(seen[0], 18.0, places=2)
+
+    def test_shadow_keeps_previous_value_for_absent_fields(self) -> None:
+        client, mock_paho = self._make_client()
+        self._deliver(client, mock_paho, _build_device_log_payload(device_timestamp_ms=1721993600000))
+        # A message carrying only a newer timestamp leaves the temperatures untouched.
+        self._deliver(client, mock_paho, _encode_varint((1 << 3) | 0) + _encode_varint(1721993700000))
+
+        shadow = client.shadow.get("dev-1")
+        self.assertAlmostEqual(shadow.current_temperature, 15.1, places=2)
+        self.assertEqual(shadow.device_timestamp, datetime(2024, 7, 26, 11, 35, tzinfo=timezone.utc))
+        self.assertEqual(shadow.message_count, 2)
+
+    def test_shadow_ignores_older_device_timestamps(self) -> None:
+        client, mock_paho = self._make_client()
+        self._deliver(client, mock_paho, _build_device_log_payload(device_timestamp_ms=1721993700000, process_state=81))
+        self._deliver(client, mock_paho, _build_device_log_payload(device_timestamp_ms=1721993600000, process_state=80))
+
+        self.assertEqual(client.shadow.get("dev-1").process_state, 81)
+
+    def test_update_returns_none_for_stale_message(self) -> None:
+        store = DeviceShadowStore()
+        msg = DeviceLogMessage(
+            topic="devices/logs/dev-1",
+            payload=b"",
+            received_at=datetime(2024, 7, 26, 12, 0, tzinfo=timezone.utc),
+            device_uuid="dev-1",
+            telemetry_fields={3: []},
+            device_timestamp=datetime(2024, 7, 26, 11, 35, tzinfo=timezone.utc),
+        )
+        current = store.update(msg)
+        msg.device_timestamp = datetime(2024, 7, 26, 11, 30, tzinfo=timezone.utc)
+
+        self.assertIsNone(store.update(msg))
+        self.assertIs(store.get("dev-1"), current)
+
+    def test_transfer_does_not_overwrite_a_newer_shadow(self) -> None:
+        source, target = DeviceShadowStore(), DeviceShadowStore()
+        msg = DeviceLogMessage(
+            topic="devices/logs/dev-1",
+            payload=b"",
+            received_at=datetime(2024, 7, 26, 12, 0, tzinfo=timezone.utc),
+            device_uuid="dev-1",
+            telemetry_fields={3: []},
+            device_timestamp=datetime(2024, 7, 26, 11, 30, tzinfo=timezone.utc),
+            current_temperature=19.0,
+            target_temperature=20.0,
+        )
+        source.update(msg)
+        # The new shard has already seen a later message before the move lands.
+        msg.device_timestamp = datetime(2024, 7, 26, 11, 35, tzinfo=timezone.utc)
+        msg.current_temperature, msg.target_temperature = 21.5, None
+        target.update(msg)
+
+        source.transfer("dev-1", target)
+
+        shadow = target.get("dev-1")
+        self.assertNotIn("dev-1", source)
+        self.assertEqual(shadow.device_timestamp, datetime(2024, 7, 26, 11, 35, tzinfo=timezone.utc))
+        self.assertEqual((shadow.current_temperature, shadow.target_temperature), (21.5, 20.0))
+        self.assertEqual(shadow.message_count, 2)
+
+        # An older shadow already on the target yields to a newer moved one.
+        msg.device_timestamp = datetime(2024, 7, 26, 11, 40, tzinfo=timezone.utc)
+        msg.current_temperature = 22.0
+        source.update(msg)
+        source.transfer("dev-1", target)
+        self.assertEqual(target.get("dev-1").current_temperature, 22.0)
+        self.assertEqual(target.get("dev-1").message_count, 3)
+
+    def test_shadow_merges_measurements(self) -> None:
+        store = DeviceShadowStore()
+        base = DeviceLogMessage(
+            topic="devices/logs/dev-1",
+            payload=b"",
+            received_at=datetime(2024, 7, 26, 12, 0, tzinfo=timezone.utc),
+            device_uuid="dev-1",
+            telemetry_fields={3: []},
+        )
+        base.measurements = {int(SensorType.TEMP_LIQUID): 19.3}
+        store.update(base)
+        base.measurements = {int(SensorType.TEMP_CONTROL_POWER): -40.0}
+        shadow = store.update(base)
+
+        self.assertEqual(shadow.sensor(SensorType.TEMP_LIQUID), 19.3)
+        self.assertEqual(shadow.sensor(SensorType.TEMP_CONTROL_POWER), -40.0)
+
+    def test_undecodable_payload_does_not_create_shadow(self) -> None:
+        client, mock_paho = self._make_client()
+        self._deliver(client, mock_paho, b"\x08")
+        self.assertNotIn("dev-1", client.shadow)
+
+    def test_snapshot_is_independent_copy(self) -> None:
+        client, mock_paho = self._make_client()
+        self._deliver(client, mock_paho, _build_device_log_payload())
+        snapshot = client.shadow.snapshot()
+        self._deliver(client, mock_paho, _build_device_log_payload(), device="dev-2")
+
+        self.assertEqual(set(snapshot), {"dev-1"})
+        self.assertEqual(len(client.shadow), 2)
+
+
+# ---------------------------------------------------------------------------
+# Sequence tracking and duplicate suppression
+# ---------------------------------------------------------------------------
+
+
+def _build_envelope(sequence_number: int, session_id: int = 80851, timestamp_ms: int = 1721993600000) -> bytes:
+    telemetry = _build_device_log_payload(session_id=session_id, device_timestamp_ms=timestamp_ms)
+    return (
+        _encode_varint((1 << 3) | 0)
+        + _encode_varint(sequence_number)
+        + _encode_varint((3 << 3) | 2)
+        + _encode_varint(len(telemetry))
+        + telemetry
+        + _encode_varint((4 << 3) | 0)
+        + _encode_varint(session_id)
+        + _encode_varint((5 << 3) | 0)
+        + _encode_varint(timestamp_ms)
+    )
+
+
+class TestPeekEnvelopeHeader(unittest.TestCase):
+    def test_reads_sequence_and_session_from_fixture(self) -> None:
+        payload = bytes.fromhex((FIXTURES_DIR / "device_log_envelope.hex").read_text().strip())
+        self.assertEqual(peek_envelope_header(payload), (24098, 80851))
+
+    def test_unwrapped_telemetry_has_no_sequence(self) -> None:
+        self.assertEqual(peek_envelope_header(_build_device_log_payload()), (None, None))
+
+    def test_malformed_payload_has_no_sequence(self) -> None:
+        self.assertEqual(peek_envelope_header(b"\x08"), (None, None))
+        self.assertEqual(peek_envelope_header(b"\x1a\x05ab"), (None, None))
+
+
+class TestSequenceTracker(unittest.TestCase):
+    def test_in_order_messages_produce_no_events(self) -> None:
+        tracker = SequenceTracker()
+        self.assertEqual([tracker.check("d", n, 1) for n in range(5)], [None] * 5)
+        self.assertEqual(tracker.stats(), SequenceStats(received=5))
+
+    def test_duplicate_detected(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("d", 10, 1)
+        event = tracker.check("d", 10, 1)
+        self.assertEqual(event.kind, SequenceEventKind.DUPLICATE)
+        self.assertEqual(tracker.device_stats("d").duplicates, 1)
+
+    def test_gap_reports_missing_count(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("d", 10, 1)
+        event = tracker.check("d", 14, 1)
+        self.assertEqual(event.kind, SequenceEventKind.GAP)
+        self.assertEqual(event.expected, 11)
+        self.assertEqual(event.missing, 3)
+
+    def test_late_arrival_is_reordered_and_reduces_missing(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("d", 10, 1)
+        tracker.check("d", 12, 1)
+        event = tracker.check("d", 11, 1)
+        self.assertEqual(event.kind, SequenceEventKind.REORDERED)
+        stats = tracker.device_stats("d")
+        self.assertEqual((stats.gaps, stats.missing, stats.reordered), (1, 0, 1))
+        self.assertEqual(tracker.check("d", 11, 1).kind, SequenceEventKind.DUPLICATE)
+
+    def test_session_change_resets_tracking(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("d", 500, 1)
+        event = tracker.check("d", 1, 2)
+        self.assertEqual(event.kind, SequenceEventKind.RESET)
+        self.assertIsNone(tracker.check("d", 2, 2))
+
+    def test_large_backwards_jump_is_reset(self) -> None:
+        tracker = SequenceTracker(reset_threshold=100)
+        tracker.check("d", 5000, None)
+        self.assertEqual(tracker.check("d", 3, None).kind, SequenceEventKind.RESET)
+        self.assertEqual(tracker.device_stats("d").resets, 1)
+
+    def test_same_session_reboot_is_reset_not_duplicates(self) -> None:
+        tracker = SequenceTracker()
+        for n in range(101):
+            tracker.check("d", n, 7)
+
+        events = [tracker.check("d", n, 7) for n in range(120)]
+
+        self.assertEqual(events[0].kind, SequenceEventKind.RESET)
+        self.assertEqual(events[1:], [None] * 119)
+        stats = tracker.device_stats("d")
+        self.assertEqual((stats.resets, stats.duplicates, stats.reordered), (1, 0, 0))
+
+    def test_sessionless_reboot_is_reset(self) -> None:
+        tracker = SequenceTracker()
+        for n in range(700, 1400):
+            tracker.check("d", n, None)
+
+        events = [tracker.check("d", n, None) for n in range(100, 700)]
+
+        self.assertEqual(events[0].kind, SequenceEventKind.RESET)
+        self.assertEqual(events[1:], [None] * 599)
+        self.assertEqual(tracker.device_stats("d").resets, 1)
+
+    def test_backwards_jump_beyond_window_is_reset(self) -> None:
+        tracker = SequenceTracker(window=16, reset_threshold=1000)
+        tracker.check("d", 100, None)
+        self.assertEqual(tracker.check("d", 84, None).kind, SequenceEventKind.RESET)
+
+    def test_redelivery_near_start_is_still_duplicate(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("d", 1, None)
+        tracker.check("d", 2, None)
+        self.assertEqual(tracker.check("d", 1, None).kind, SequenceEventKind.DUPLICATE)
+
+    def test_devices_are_tracked_independently(self) -> None:
+        tracker = SequenceTracker()
+        tracker.check("a", 1, 1)
+        self.assertIsNone(tracker.check("b", 1, 1))
+
+
+class TestMqttClientSequenceTracking(unittest.TestCase):
+    def _make_client(self, **kwargs: object) -> tuple[MqttClient, MagicMock]:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            client = MqttClient(api_token="t", user_uuid="u", **kwargs)
+        return client, mock_paho
+
+    def _deliver(self, client: MqttClient, mock_paho: MagicMock, payload: bytes) -> None:
+        mock_msg = MagicMock()
+        mock_msg.topic = "devices/logs/dev-1"
+        mock_msg.payload = payload
+        client._on_paho_message(mock_paho, None, mock_msg)
+
+    def test_duplicate_redelivery_is_dropped_before_dispatch(self) -> None:
+        client, mock_paho = self._make_client()
+        raw: list[MqttMessage] = []
+        logs: list[DeviceLogMessage] = []
+        events: list[SequenceEvent] = []
+        client.on_message(raw.append)
+        client.on_device_log(logs.append)
+        client.on_sequence_event(events.append)
+
+        with patch("pymbrewclient.mqtt.client.decode_device_log", wraps=decode_device_log) as mock_decode:
+            self._deliver(client, mock_paho, _build_envelope(7))
+            self._deliver(client, mock_paho, _build_envelope(7))
+
+        self.assertEqual(len(raw), 1)
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(mock_decode.call_count, 1)
+        self.assertEqual([e.kind for e in events], [SequenceEventKind.DUPLICATE])
+
+    def test_gap_is_reported_and_message_delivered(self) -> None:
+        client, mock_paho = self._make_client()
+        logs: list[DeviceLogMessage] = []
+        events: list[SequenceEvent] = []
+        client.on_device_log(logs.append)
+        client.on_sequence_event(events.append)
+
+        self._deliver(client, mock_paho, _build_envelope(7))
+        self._deliver(client, mock_paho, _build_envelope(10))
+
+        self.assertEqual([msg.sequence_number for msg in logs], [7, 10])
+        self.assertEqual(events[0].kind, SequenceEventKind.GAP)
+        self.assertEqual(client.sequence_tracker.stats().missing, 2)
+
+    def test_tracking_can_be_disabled(self) -> None:
+        client, mock_paho = self._make_client(track_sequence=False)
+        logs: list[DeviceLogMessage] = []
+        client.on_device_log(logs.append)
+
+        self._deliver(client, mock_paho, _build_envelope(7))
+        self._deliver(client, mock_paho, _build_envelope(7))
+
+        self.assertIsNone(client.sequence_tracker)
+        self.assertEqual(len(logs), 2)
+
+
+# ---------------------------------------------------------------------------
+# Reconnect strategies
+# ---------------------------------------------------------------------------
+
+
+class TestReconnectStrategies(unittest.TestCase):
+    def test_base_strategy_is_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            ReconnectStrategy()  # type: ignore[abstract]
+
+    def test_fixed_delay(self) -> None:
+        strategy = FixedDelay(5)
+        self.assertEqual([strategy.next_delay(n, 5) for n in range(3)], [5, 5, 5])
+
+    def test_exponential_backoff_without_jitter_doubles_up_to_cap(self) -> None:
+        strategy = ExponentialBackoff(base=1, cap=10, jitter=False)
+        delays = [strategy.next_delay(n, None) for n in range(6)]
+        self.assertEqual(delays, [1, 2, 4, 8, 10, 10])
+
+    def test_decorrelated_jitter_stays_within_bounds(self) -> None:
+        strategy = ExponentialBackoff(base=1, cap=30, rng=random.Random(42))
+        previous = None
+        for attempt in range(50):
+            delay = strategy.next_delay(attempt, previous)
+            self.assertGreaterEqual(delay, 1)
+            self.assertLessEqual(delay, min(30, (previous or 1) * 3))
+            previous = delay
+
+    def test_jitter_spreads_clients(self) -> None:
+        strategy = ExponentialBackoff(base=1, cap=60, rng=random.Random(7))
+        first_delays = {round(strategy.next_delay(0, None), 3) for _ in range(20)}
+        self.assertGreater(len(first_delays), 10)
+
+    def test_invalid_configuration_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            ExponentialBackoff(base=0)
+        with self.assertRaises(ValueError):
+            ExponentialBackoff(base=10, cap=1)
+        with self.assertRaises(ValueError):
+            FixedDelay(-1)
+
+
+class TestMqttClientReconnect(unittest.TestCase):
+    def _make_client(self, **kwargs: object) -> tuple[MqttClient, MagicMock]:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            client = MqttClient(api_token="t", user_uuid="u", **kwargs)
+        return client, mock_paho
+
+    def _connack(self, accepted: bool) -> MagicMock:
+        reason = MagicMock()
+        reason.is_failure = not accepted
+        reason.__str__ = lambda self: "Success" if accepted else "Not authorized"
+        return reason
+
+    def test_strategy_delay_is_applied_after_each_failure(self) -> None:
+        client, mock_paho = self._make_client(reconnect_strategy=ExponentialBackoff(base=1, cap=8, jitter=False))
+        mock_paho.reconnect_delay_set.reset_mock()
+
+        for _ in range(3):
+            client._on_paho_pre_connect(mock_paho, None)
+            client._on_paho_connect_fail(mock_paho, None)
+
+        delays = [call.kwargs["min_delay"] for call in mock_paho.reconnect_delay_set.call_args_list]
+        self.assertEqual(delays, [2, 4, 8])
+        for call in mock_paho.reconnect_delay_set.call_args_list:
+            self.assertEqual(call.kwargs["min_delay"], call.kwargs["max_delay"])
+
+    def test_successful_connect_resets_backoff(self) -> None:
+        client, mock_paho = self._make_client(reconnect_strategy=ExponentialBackoff(base=1, cap=8, jitter=False))
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect_fail(mock_paho, None)
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect(mock_paho, None, MagicMock(), self._connack(True), None)
+        mock_paho.reconnect_delay_set.reset_mock()
+
+        client._on_paho_disconnect(mock_paho, None, MagicMock(), MagicMock(), None)
+
+        mock_paho.reconnect_delay_set.assert_called_once_with(min_delay=1, max_delay=1)
+
+    def test_connect_attempt_callback_reports_count_and_latency(self) -> None:
+        client, mock_paho = self._make_client()
+        attempts: list[ConnectAttempt] = []
+        client.on_connect_attempt(attempts.append)
+
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect(mock_paho, None, MagicMock(), self._connack(False), None)
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect(mock_paho, None, MagicMock(), self._connack(True), None)
+
+        self.assertEqual([(a.attempt, a.succeeded) for a in attempts], [(1, False), (2, True)])
+        self.assertEqual(attempts[0].reason, "Not authorized")
+        self.assertIsNotNone(attempts[1].latency)
+        self.assertGreaterEqual(attempts[1].latency, 0)
+
+
+# ---------------------------------------------------------------------------
+# Credential refresh on reconnect
+# ---------------------------------------------------------------------------
+
+
+class TestCredentialRefresh(unittest.TestCase):
+    def _make_client(self, provider: MagicMock) -> tuple[MqttClient, MagicMock]:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            client = MqttClient(api_token="old-token", user_uuid="u", credential_provider=provider)
+        return client, mock_paho
+
+    def test_pre_connect_refreshes_password(self) -> None:
+        provider = MagicMock(return_value="new-token")
+        client, mock_paho = self._make_client(provider)
+        mock_paho.username_pw_set.reset_mock()
+
+        client._ever_connected = True
+        client._on_paho_pre_connect(mock_paho, None)
+
+        provider.assert_called_once()
+        mock_paho.username_pw_set.assert_called_once_with("breweryportal-u", "new-token")
+
+    def test_unchanged_token_is_not_reapplied(self) -> None:
+        provider = MagicMock(return_value="old-token")
+        client, mock_paho = self._make_client(provider)
+        mock_paho.username_pw_set.reset_mock()
+
+        client._on_paho_pre_connect(mock_paho, None)
+
+        mock_paho.username_pw_set.assert_not_called()
+
+    def test_provider_failure_keeps_previous_token_and_reports_error(self) -> None:
+        provider = MagicMock(side_effect=RuntimeError("token endpoint said: secret-value"))
+        client, mock_paho = self._make_client(provider)
+        mock_paho.username_pw_set.reset_mock()
+        errors: list[Exception] = []
+        client.on_error(errors.append)
+
+        client._on_paho_pre_connect(mock_paho, None)
+
+        mock_paho.username_pw_set.assert_not_called()
+        self.assertEqual(len(errors), 1)
+        self.assertNotIn("secret-value", str(errors[0]))
+
+    def test_create_mqtt_client_uses_rest_token_provider(self) -> None:
+        from pymbrewclient.client import BreweryClient
+        from pymbrewclient.rest.models import UserProfile
+
+        with (
+            patch("pymbrewclient.rest.client.RestApiClient._ensure_token"),
+            patch("pymbrewclient.rest.client.RestApiClient.get_user_profile") as mock_profile,
+            patch("pymbrewclient.mqtt.client._paho.Client") as mock_paho_cls,
+        ):
+            mock_paho = MagicMock()
+            mock_paho_cls.return_value = mock_paho
+            mock_profile.return_value = UserProfile(uuid="uid")
+
+            bc = BreweryClient("u", "p", base_url="https://api.example.com")
+            bc.client.token = "expired-token"
+            mqtt = bc.create_mqtt_client()
+
+        self.assertEqual(mqtt._credential_provider, bc.client.get_valid_token)
+
+        def renew() -> None:
+            bc.client.token = "renewed-token"
+            bc.client.token_expiry = time.time() + 3600
+
+        with patch.object(bc.client, "_get_token", side_effect=renew):
+            mqtt._on_paho_pre_connect(mock_paho, None)
+
+        args, _ = mock_paho.username_pw_set.call_args
+        self.assertEqual(args[1], "renewed-token")
+
+
+# ---------------------------------------------------------------------------
+# Sharded connection pool
+# ---------------------------------------------------------------------------
+
+
+class TestHashRing(unittest.TestCase):
+    def test_owner_is_stable(self) -> None:
+        ring = HashRing()
+        ring.add("a")
+        ring.add("b")
+        self.assertEqual(ring.owner("device-1"), ring.owner("device-1"))
+
+    def test_adding_node_moves_only_a_fraction_of_keys(self) -> None:
+        ring = HashRing()
+        for node in ("a", "b", "c"):
+            ring.add(node)
+        keys = [f"device-{n}" for n in range(1000)]
+        before = {key: ring.owner(key) for key in keys}
+        ring.add("d")
+        after = {key: ring.owner(key) for key in keys}
+
+        moved = [key for key in keys if before[key] != after[key]]
+        self.assertTrue(all(after[key] == "d" for key in moved))
+        self.assertLess(len(moved), 450)
+        self.assertGreater(len(moved), 100)
+
+    def test_empty_ring_raises(self) -> None:
+        with self.assertRaises(LookupError):
+            HashRing().owner("x")
+
+
+class TestMqttClientPool(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch("pymbrewclient.mqtt.client._paho.Client", side_effect=lambda **kwargs: MagicMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _make_pool(self, shards: int = 3) -> MqttClientPool:
+        return MqttClientPool(lambda: MqttClient(api_token="t", user_uuid="u"), shards=shards)
+
+    def _deliver(self, shard: MqttClient, device: str, payload: bytes) -> None:
+        mock_msg = MagicMock()
+        mock_msg.topic = f"devices/logs/{device}"
+        mock_msg.payload = payload
+        shard._on_paho_message(shard._paho_client, None, mock_msg)
+
+    def test_each_shard_has_its_own_client_id(self) -> None:
+        pool = self._make_pool()
+        self.assertEqual(len({shard._client_id for shard in pool.shards}), 3)
+
+    def test_subscriptions_are_spread_across_shards(self) -> None:
+        pool = self._make_pool()
+        for n in range(60):
+            pool.subscribe_device_logs(f"device-{n}")
+
+        per_shard = [len(shard._subscriptions) for shard in pool.shards]
+        self.assertEqual(sum(per_shard), 60)
+        self.assertTrue(all(count > 0 for count in per_shard))
+        for device_uuid, shard in pool.subscribed_devices.items():
+            self.assertIn(MqttClient.device_log_topic(device_uuid), shard._subscriptions)
+
+    def test_unified_callbacks_and_queue(self) -> None:
+        pool = self._make_pool(shards=2)
+        received: list[DeviceLogMessage] = []
+        pool.on_device_log(received.append)
+        q = pool.device_log_queue()
+
+        for shard in pool.shards:
+            self._deliver(shard, f"dev-{shard._client_id}", _build_device_log_payload())
+
+        self.assertEqual(len(received), 2)
+        self.assertEqual(q.qsize(), 2)
+
+    def test_add_shard_rebalances_minimal_set(self) -> None:
+        pool = self._make_pool(shards=2)
+        devices = [f"device-{n}" for n in range(100)]
+        for device in devices:
+            pool.subscribe_device_logs(device)
+        before = pool.subscribed_devices
+
+        new_shard = pool.add_shard()
+        after = pool.subscribed_devices
+
+        moved = [device for device in devices if before[device] is not after[device]]
+        self.assertTrue(moved)
+        self.assertTrue(all(after[device] is new_shard for device in moved))
+        for device in moved:
+            self.assertNotIn(MqttClient.device_log_topic(device), before[device]._subscriptions)
+        self.assertEqual(sum(len(shard._subscriptions) for shard in pool.shards), 100)
+
+    def test_remove_shard_moves_its_devices(self) -> None:
+        pool = self._make_pool(shards=3)
+        for n in range(50):
+            pool.subscribe_device_logs(f"device-{n}")
+        victim = pool.shards[0]
+
+        pool.remove_shard(victim)
+
+        self.assertNotIn(victim, pool.subscribed_devices.values())
+        self.assertEqual(sum(len(shard._subscriptions) for shard in pool.shards), 50)
+
+    def test_moved_device_keeps_shadow_and_sequence_state(self) -> None:
+        pool = self._make_pool(shards=2)
+        devices = [f"device-{n}" for n in range(40)]
+        for device in devices:
+            pool.subscribe_device_logs(device)
+            self._deliver(pool.shard_for(device), device, _build_envelope(7))
+        before = pool.subscribed_devices
+
+        pool.add_shard()
+        moved = [device for device in devices if pool.subscribed_devices[device] is not before[device]]
+        self.assertTrue(moved)
+
+        device = moved[0]
+        new_shard = pool.shard_for(device)
+        self.assertIsNone(before[device].shadow.get(device))
+        self.assertEqual(pool.shadow(device).message_count, 1)
+        events: list[SequenceEvent] = []
+        new_shard.on_sequence_event(events.append)
+        self._deliver(new_shard, device, _build_envelope(7))
+        self.assertEqual(events[0].kind, SequenceEventKind.DUPLICATE)
+
+    def test_removed_shard_hands_over_state(self) -> None:
+        pool = self._make_pool(shards=2)
+        victim = pool.shards[0]
+        device = next(f"device-{n}" for n in range(100) if pool.shard_for(f"device-{n}") is victim)
+        pool.subscribe_device_logs(device)
+        self._deliver(victim, device, _build_envelope(3))
+
+        pool.remove_shard(victim)
+
+        self.assertEqual(pool.shadow(device).message_count, 1)
+        self.assertEqual(pool.shard_for(device).sequence_tracker.device_stats(device).received, 1)
+
+    def test_device_log_filters_and_policies_apply_across_shards(self) -> None:
+        pool = self._make_pool(shards=2)
+        changed: list[DeviceLogMessage] = []
+        sampled: list[DeviceLogMessage] = []
+        pool.on_device_log(changed.append, where=FieldChanged("process_state"))
+        q = pool.device_log_queue(policy=Sample(2))
+        pool.on_device_log(sampled.append, policy=Sample(2), where=FieldChanged("process_state"))
+
+        for shard in pool.shards:
+            for state in (80, 80, 81, 81):
+                self._deliver(shard, f"dev-{shard._client_id}", _build_device_log_payload(process_state=state))
+
+        self.assertEqual([msg.process_state for msg in changed], [80, 81, 80, 81])
+        self.assertEqual(q.qsize(), 4)
+        self.assertEqual([msg.process_state for msg in sampled], [80, 80])
+
+    def test_fan_in_registers_nothing_without_subscribers(self) -> None:
+        pool = self._make_pool(shards=2)
+        for shard in pool.shards:
+            self.assertEqual(shard._on_device_log_callbacks, [])
+            self.assertEqual(shard._on_raw_message_callbacks, [])
+
+        pool.on_message(lambda msg: None)
+        added = pool.add_shard()
+        self.assertEqual(len(added._on_raw_message_callbacks), 1)
+        self.assertEqual(added._on_device_log_callbacks, [])
+
+    def test_pool_without_shadow_skips_decoding_rejected_messages(self) -> None:
+        pool = MqttClientPool(lambda: MqttClient(api_token="t", user_uuid="u", track_shadow=False), shards=1)
+        sampled: list[DeviceLogMessage] = []
+        pool.on_device_log(sampled.append, policy=Sample(3))
+
+        with patch("pymbrewclient.mqtt.client.decode_device_log", wraps=decode_device_log) as mock_decode:
+            for sequence_number in range(1, 7):
+                self._deliver(pool.shards[0], "dev-1", _build_envelope(sequence_number))
+
+        self.assertEqual(mock_decode.call_count, 2)
+        self.assertEqual(len(sampled), 2)
+
+    def test_disconnect_closes_fan_in_policies(self) -> None:
+        pool = self._make_pool(shards=1)
+        policy = Conflate(window=0.05)
+        pool.device_log_queue(policy=policy)
+        self._deliver(pool.shards[0], "dev-1", _build_envelope(1))
+        self.assertIsNotNone(policy._thread)
+
+        pool.disconnect()
+
+        self.assertIsNone(policy._thread)
+
+    def test_cannot_remove_last_shard(self) -> None:
+        pool = self._make_pool(shards=1)
+        with self.assertRaises(ValueError):
+            pool.remove_shard(pool.shards[0])
+
+    def test_connect_and_disconnect_all_shards(self) -> None:
+        pool = self._make_pool(shards=2)
+        with pool:
+            for shard in pool.shards:
+                shard._paho_client.loop_start.assert_called_once()
+            added = pool.add_shard()
+            added._paho_client.connect.assert_called_once()
+        for shard in pool.shards:
+            shard._paho_client.loop_stop.assert_called_once()
+
+    def test_create_mqtt_pool_fetches_profile_once(self) -> None:
+        from pymbrewclient.client import BreweryClient
+        from pymbrewclient.rest.models import UserProfile
+
+        with (
+            patch("pymbrewclient.rest.client.RestApiClient._ensure_token"),
+            patch("pymbrewclient.rest.client.RestApiClient.get_user_profile") as mock_profile,
+        ):
+            mock_profile.return_value = UserProfile(uuid="uid")
+            bc = BreweryClient("u", "p", base_url="https://api.example.com")
+            bc.client.token = "tok"
+            pool = bc.create_mqtt_pool(shards=3)
+
+        mock_profile.assert_called_once()
+        self.assertEqual(len(pool.shards), 3)
+        self.assertTrue(all(shard._username == "breweryportal-uid" for shard in pool.shards))
+
+
+class TestDeviceLogQueue(unittest.TestCase):
+    def test_full_queue_discards_oldest(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u", track_sequence=False)
+        q = client.device_log_queue(maxsize=2)
+
+        for temperature in (10.0, 11.0, 12.0):
+            mock_msg = MagicMock()
+            mock_msg.topic = "devices/logs/dev-1"
+            mock_msg.payload = _build_device_log_payload(current_temperature=temperature)
+            client._on_paho_message(client._paho_client, None, mock_msg)
+
+        self.assertEqual([q.get_nowait().current_temperature for _ in range(2)], [11.0, 12.0])
+
+
+# ---------------------------------------------------------------------------
+# Recording and replay
+# ---------------------------------------------------------------------------
+
+
+class TestRecordingReplay(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "traffic.pmbr"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _make_client(self) -> MqttClient:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            return MqttClient(api_token="t", user_uuid="u")
+
+    def _record_live(self, payloads: list[bytes]) -> int:
+        client = self._make_client()
+        with MqttRecorder(self.path) as recorder:
+            recorder.attach(client)
+            for payload in payloads:
+                mock_msg = MagicMock()
+                mock_msg.topic = "devices/logs/dev-1"
+                mock_msg.payload = payload
+                client._on_paho_message(client._paho_client, None, mock_msg)
+        return recorder.count
+
+    def test_round_trip_preserves_topic_payload_and_timestamp(self) -> None:
+        received_at = datetime(2026, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        msg = MqttMessage(topic="devices/logs/dev-9", payload=b"\x00\x01\xff", received_at=received_at)
+        with MqttRecorder(self.path) as recorder:
+            recorder.write(msg)
+
+        (replayed,) = list(MqttReplay(self.path))
+        self.assertEqual(replayed.topic, msg.topic)
+        self.assertEqual(replayed.payload, msg.payload)
+        self.assertEqual(replayed.received_at, received_at)
+        self.assertEqual(replayed.device_uuid, "dev-9")
+
+    def test_recorder_appends_to_existing_file(self) -> None:
+        now = datetime.now(tz=timezone.utc)
+        for topic in ("a/1", "a/2"):
+            with MqttRecorder(self.path) as recorder:
+                recorder.write(MqttMessage(topic=topic, payload=b"x", received_at=now))
+
+        self.assertEqual([m.topic for m in MqttReplay(self.path)], ["a/1", "a/2"])
+
+    def test_rejects_foreign_file(self) -> None:
+        self.path.write_bytes(b"not a recording")
+        with self.assertRaises(ValueError):
+            MqttReplay(self.path)
+        with self.assertRaises(ValueError):
+            MqttRecorder(self.path)
+
+    def test_truncated_tail_is_ignored(self) -> None:
+        now = datetime.now(tz=timezone.utc)
+        with MqttRecorder(self.path) as recorder:
+            recorder.write(MqttMessage(topic="a/1", payload=b"first", received_at=now))
+            recorder.write(MqttMessage(topic="a/2", payload=b"second", received_at=now))
+        self.path.write_bytes(self.path.read_bytes()[:-3])
+
+        self.assertEqual([m.topic for m in MqttReplay(self.path)], ["a/1"])
+
+    def test_writes_after_close_are_dropped(self) -> None:
+        recorder = MqttRecorder(self.path)
+        recorder.close()
+        recorder.write(MqttMessage(topic="a/1", payload=b"x", received_at=datetime.now(tz=timezone.utc)))
+        self.assertTrue(recorder.closed)
+        self.assertEqual(recorder.count, 0)
+
+    def test_replay_dispatches_through_decode_path(self) -> None:
+        recorded = self._record_live([_build_envelope(1), _build_envelope(2), _build_envelope(2)])
+        self.assertEqual(recorded, 2)  # the live redelivery was dropped before recording
+
+        client = self._make_client()
+        logs: list[DeviceLogMessage] = []
+        client.on_device_log(logs.append)
+        count = MqttReplay(self.path).replay(client)
+
+        self.assertEqual(count, 2)
+        self.assertEqual([m.sequence_number for m in logs], [1, 2])
+        self.assertIn("dev-1", client.shadow)
+
+    def test_replay_honours_speed(self) -> None:
+        start = datetime(2026, 5, 1, tzinfo=timezone.utc)
+        with MqttRecorder(self.path) as recorder:
+            recorder.write(MqttMessage(topic="a/1", payload=b"", received_at=start))
+            recorder.write(MqttMessage(topic="a/2", payload=b"", received_at=start + timedelta(seconds=10)))
+
+        with patch("pymbrewclient.mqtt.recording.time.sleep") as mock_sleep:
+            MqttReplay(self.path).replay(self._make_client(), speed=100.0)
+        (wait,), _ = mock_sleep.call_args
+        self.assertAlmostEqual(wait, 0.1, delta=0.05)
+
+        with patch("pymbrewclient.mqtt.recording.time.sleep") as mock_sleep:
+            MqttReplay(self.path).replay(self._make_client())
+        mock_sleep.assert_not_called()
+
+    def test_replay_rejects_non_positive_speed(self) -> None:
+        with MqttRecorder(self.path):
+            pass
+        with self.assertRaises(ValueError):
+            MqttReplay(self.path).replay(self._make_client(), speed=0)
+
+
+# ---------------------------------------------------------------------------
+# Local broker stand-in
+# ---------------------------------------------------------------------------
+
+
+class TestEncodeDeviceLog(unittest.TestCase):
+    def test_round_trips_through_decoder(self) -> None:
+        payload = encode_device_log(
+            sequence_number=42,
+            session_id=7,
+            timestamp_ms=1721993600000,
+            current_state=1,
+            process_type=4,
+            process_state=80,
+            current_temperature=18.5,
+            target_temperature=18.0,
+            measurements={SensorType.TEMP_LIQUID: 18.5},
+            seconds_until_next_action=60,
+        )
+        decoded = decode_device_log(_make_mqtt_message("devices/logs/dev-1", payload))
+
+        self.assertIsNone(decoded.decode_error)
+        self.assertEqual(decoded.sequence_number, 42)
+        self.assertEqual(decoded.session_id, 7)
+        self.assertEqual(decoded.process_state, 80)
+        self.assertAlmostEqual(decoded.current_temperature, 18.5, places=4)
+        self.assertAlmostEqual(decoded.sensor(SensorType.TEMP_LIQUID), 18.5, places=4)
+        self.assertEqual(peek_envelope_header(payload), (42, 7))
+
+
+class TestTopicMatches(unittest.TestCase):
+    def test_wildcards(self) -> None:
+        self.assertTrue(topic_matches("devices/logs/dev-1", "devices/logs/dev-1"))
+        self.assertTrue(topic_matches("devices/+/dev-1", "devices/logs/dev-1"))
+        self.assertTrue(topic_matches("devices/#", "devices/logs/dev-1"))
+        self.assertFalse(topic_matches("devices/logs/+", "devices/logs/dev-1/extra"))
+        self.assertFalse(topic_matches("devices/logs/dev-2", "devices/logs/dev-1"))
+
+
+class TestMqttClientEndpoint(unittest.TestCase):
+    def test_custom_endpoint_without_tls(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            client = MqttClient(api_token="t", user_uuid="u", host="127.0.0.1", port=1883, transport="tcp", tls=False)
+            client.connect()
+        _, kwargs = mock_cls.call_args
+        self.assertEqual(kwargs["transport"], "tcp")
+        mock_paho.ws_set_options.assert_not_called()
+        mock_paho.tls_set.assert_not_called()
+        mock_paho.connect.assert_called_once_with(host="127.0.0.1", port=1883, keepalive=KEEPALIVE)
+        self.assertIn("'127.0.0.1':1883", repr(client))
+
+    def test_custom_ws_path(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client") as mock_cls:
+            mock_paho = MagicMock()
+            mock_cls.return_value = mock_paho
+            MqttClient(api_token="t", user_uuid="u", ws_path="/mqtt")
+        mock_paho.ws_set_options.assert_called_once_with(path="/mqtt")
+
+    def test_rejects_unknown_transport(self) -> None:
+        with self.assertRaises(ValueError):
+            MqttClient(api_token="t", user_uuid="u", transport="unix")
+
+
+class TestLocalBrokerIntegration(unittest.TestCase):
+    TOPIC = "devices/logs/dev-1"
+
+    def _run_round_trip(self, websocket: bool) -> None:
+        with LocalBroker(websocket=websocket, password="t") as broker:
+            client = MqttClient(
+                api_token="t",
+                user_uuid="u",
+                host=broker.host,
+                port=broker.port,
+                transport=broker.transport,
+                tls=False,
+                reconnect_strategy=FixedDelay(0.1),
+            )
+            connected = threading.Event()
+            logs: queue.Queue[DeviceLogMessage] = client.device_log_queue()
+            client.on_connected(connected.set)
+            client.subscribe_device_logs("dev-1")
+            client.connect()
+            try:
+                self.assertTrue(connected.wait(5))
+                self.assertTrue(broker.wait_for_subscribers(self.TOPIC))
+
+                SyntheticPublisher(broker, ["dev-1"], seed=1).publish_once()
+                msg = logs.get(timeout=5)
+                self.assertEqual(msg.sequence_number, 1)
+                self.assertIsNone(msg.decode_error)
+
+                # Dropped connections are re-established and resubscribed.
+                connected.clear()
+                broker.drop_clients()
+                self.assertTrue(connected.wait(5))
+                self.assertTrue(broker.wait_for_subscribers(self.TOPIC))
+            finally:
+                client.disconnect()
+
+    def test_tcp_round_trip(self) -> None:
+        self._run_round_trip(websocket=False)
+
+    def test_websocket_round_trip(self) -> None:
+        self._run_round_trip(websocket=True)
+
+    def test_wrong_password_is_rejected(self) -> None:
+        with LocalBroker(password="secret") as broker:
+            client = MqttClient(
+                api_token="wrong", user_uuid="u", host=broker.host, port=broker.port, transport="tcp", tls=False
+            )
+            errors: queue.Queue[Exception] = queue.Queue()
+            client.on_error(errors.put)
+            client.connect()
+            try:
+                self.assertIsInstance(errors.get(timeout=5), ConnectionError)
+                self.assertEqual(broker.client_count, 0)
+            finally:
+                client.disconnect()
+
+    def test_publisher_rate_loop(self) -> None:
+        with LocalBroker() as broker:
+            publisher = SyntheticPublisher(broker, ["dev-1", "dev-2"], rate=None)
+            publisher.start()
+            time.sleep(0.05)
+            publisher.stop()
+        self.assertGreater(publisher.sent, 0)
+        self.assertEqual(broker.published, publisher.sent)
+
+
+# ---------------------------------------------------------------------------
+# Ingestion metrics
+# ---------------------------------------------------------------------------
+
+
+class TestMqttMetrics(unittest.TestCase):
+    def _make_client(self, **kwargs: object) -> MqttClient:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            return MqttClient(api_token="t", user_uuid="u", **kwargs)
+
+    def _deliver(self, client: MqttClient, topic: str, payload: bytes) -> None:
+        client._handle_message(topic, payload, datetime(2024, 7, 26, 11, 33, 22, tzinfo=timezone.utc))
+
+    def test_topic_family(self) -> None:
+        self.assertEqual(topic_family("devices/logs/dev-1"), "logs")
+        self.assertEqual(topic_family("apps/lastwill/x"), "apps")
+
+    def test_counts_messages_bytes_and_errors_per_family(self) -> None:
+        client = self._make_client()
+        client.device_log_queue()
+        good = _build_envelope(1, timestamp_ms=1721993600000)
+        self._deliver(client, "devices/logs/dev-1", good)
+        self._deliver(client, "devices/logs/dev-1", b"\xff")
+        self._deliver(client, "devices/status/dev-1", b"online")
+
+        snapshot = client.metrics.snapshot()
+        self.assertEqual(snapshot.received, {"logs": 2, "status": 1})
+        self.assertEqual(snapshot.decoded, {"logs": 1})
+        self.assertEqual(snapshot.decode_errors, {"logs": 1})
+        self.assertEqual(snapshot.bytes_received, len(good) + 1 + len(b"online"))
+        self.assertEqual(snapshot.decode_time.count, 2)
+        self.assertEqual(snapshot.callback_time.count, 3)
+        self.assertEqual(snapshot.lag.count, 1)
+        self.assertAlmostEqual(snapshot.lag.sum, 2.0)
+        self.assertEqual(snapshot.queue_depths, (2,))  # failed decodes are still delivered
+        self.assertEqual(snapshot.sequence.received, 1)
+
+    def test_duplicates_are_not_counted_as_received(self) -> None:
+        client = self._make_client()
+        self._deliver(client, "devices/logs/dev-1", _build_envelope(1))
+        self._deliver(client, "devices/logs/dev-1", _build_envelope(1))
+
+        snapshot = client.metrics.snapshot()
+        self.assertEqual(snapshot.received, {"logs": 1})
+        self.assertEqual(snapshot.sequence.duplicates, 1)
+
+    def test_reconnects_and_failures_are_counted(self) -> None:
+        client = self._make_client()
+        mock_paho = client._paho_client
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect(mock_paho, None, MagicMock(), MagicMock(is_failure=False), None)
+        client._on_paho_pre_connect(mock_paho, None)
+        client._on_paho_connect_fail(mock_paho, None)
+
+        snapshot = client.metrics.snapshot()
+        self.assertEqual(snapshot.reconnects, 1)
+        self.assertEqual(snapshot.connect_failures, 1)
+
+    def test_disabled(self) -> None:
+        client = self._make_client(collect_metrics=False)
+        self._deliver(client, "devices/logs/dev-1", _build_envelope(1))
+        self.assertIsNone(client.metrics)
+
+    def test_histogram_buckets(self) -> None:
+        metrics = MqttMetrics()
+        metrics.record_message("logs", 10, callback_seconds=0.002)
+        metrics.record_message("logs", 10, callback_seconds=5.0)
+
+        hist = metrics.snapshot().callback_time
+        self.assertEqual(hist.counts[DURATION_BUCKETS.index(0.0025)], 1)
+        self.assertEqual(hist.counts[-1], 1)
+        self.assertAlmostEqual(hist.mean, 2.501)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot().callback_time.count, 0)
+
+    def test_render_prometheus(self) -> None:
+        client = self._make_client()
+        client.device_log_queue()
+        self._deliver(client, "devices/logs/dev-1", _build_envelope(1))
+
+        text = render_prometheus(client.metrics.snapshot())
+        self.assertIn('pymbrewclient_mqtt_messages_received_total{family="logs"} 1', text)
+        self.assertIn("# TYPE pymbrewclient_mqtt_decode_seconds histogram", text)
+        self.assertIn('pymbrewclient_mqtt_decode_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('pymbrewclient_mqtt_queue_depth{queue="0"} 1', text)
+        self.assertIn("pymbrewclient_mqtt_sequence_duplicates_total 0", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_render_prometheus_escapes_topic_families(self) -> None:
+        metrics = MqttMetrics()
+        metrics.record_message('we"ird\\\nfamily', 10, callback_seconds=0.0)
+
+        text = render_prometheus(metrics.snapshot())
+        self.assertEqual(escape_label_value('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+        self.assertIn('pymbrewclient_mqtt_messages_received_total{family="we\\"ird\\\\\\nfamily"} 1', text)
+        self.assertEqual(
+            sum(line.startswith("pymbrewclient_mqtt_messages_received_total{") for line in text.splitlines()), 1
+        )
+
+    def test_metrics_server(self) -> None:
+        client = self._make_client()
+        self._deliver(client, "devices/logs/dev-1", _build_envelope(1))
+
+        with MetricsServer(client.metrics.snapshot) as server:
+            base = f"http://{server.host}:{server.port}"
+            response = requests.get(f"{base}/metrics", timeout=5)
+            missing = requests.get(f"{base}/other", timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('messages_received_total{family="logs"} 1', response.text)
+        self.assertEqual(missing.status_code, 404)
+
+
+# ---------------------------------------------------------------------------
+# Dispatch hooks
+# ---------------------------------------------------------------------------
+
+
+class _RecordingHook(DispatchHook):
+    def __init__(self) -> None:
+        self.calls: list[tuple[object, ...]] = []
+
+    def before_decode(self, msg: MqttMessage) -> None:
+        self.calls.append(("before_decode", msg.topic))
+
+    def after_decode(self, msg: MqttMessage, decoded: DeviceLogMessage, seconds: float) -> None:
+        self.calls.append(("after_decode", decoded.sequence_number))
+
+    def before_callback(self, event: str, callback: object, message: object) -> None:
+        self.calls.append(("before_callback", event))
+
+    def after_callback(
+        self, event: str, callback: object, message: object, seconds: float, error: Exception | None
+    ) -> None:
+        self.calls.append(("after_callback", event, type(error).__name__ if error else None))
+
+
+class TestDispatchHooks(unittest.TestCase):
+    def _make_client(self) -> MqttClient:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            return MqttClient(api_token="t", user_uuid="u")
+
+    def _deliver(self, client: MqttClient, payload: bytes) -> None:
+        client._handle_message("devices/logs/dev-1", payload, datetime.now(tz=timezone.utc))
+
+    def test_hooks_wrap_decode_and_each_callback(self) -> None:
+        client = self._make_client()
+        hook = _RecordingHook()
+        client.add_hook(hook)
+        client.on_device_log(lambda msg: None)
+        client.on_device_log(lambda msg: 1 / 0)
+
+        self._deliver(client, _build_envelope(3))
+
+        self.assertEqual(
+            hook.calls,
+            [
+                ("before_decode", "devices/logs/dev-1"),
+                ("after_decode", 3),
+                ("before_callback", "on_device_log"),
+                ("after_callback", "on_device_log", None),
+                ("before_callback", "on_device_log"),
+                ("after_callback", "on_device_log", "ZeroDivisionError"),
+            ],
+        )
+
+    def test_removed_hook_is_not_called(self) -> None:
+        client = self._make_client()
+        hook = _RecordingHook()
+        client.add_hook(hook)
+        client.remove_hook(hook)
+        self._deliver(client, _build_envelope(1))
+        self.assertEqual(hook.calls, [])
+
+    def test_failing_hook_does_not_break_dispatch(self) -> None:
+        class Broken(DispatchHook):
+            def before_decode(self, msg: MqttMessage) -> None:
+                raise RuntimeError("boom")
+
+        client = self._make_client()
+        client.add_hook(Broken())
+        logs: list[DeviceLogMessage] = []
+        client.on_device_log(logs.append)
+        with self.assertLogs("pymbrewclient.mqtt.client", level="WARNING") as captured:
+            self._deliver(client, _build_envelope(1))
+        self.assertEqual(len(logs), 1)
+        self.assertIn("dispatch hook", captured.output[0])
+
+    def test_callback_exceptions_are_logged_at_warning(self) -> None:
+        client = self._make_client()
+
+        def failing(msg: DeviceLogMessage) -> None:
+            raise ValueError("bad subscriber")
+
+        client.on_device_log(failing)
+        with self.assertLogs("pymbrewclient.mqtt.client", level="WARNING") as captured:
+            self._deliver(client, _build_envelope(1))
+        self.assertIn("on_device_log callback", captured.output[0])
+        self.assertIn("failing", captured.output[0])
+
+    def test_callback_timer_and_slow_logger(self) -> None:
+        client = self._make_client()
+        timer = CallbackTimer()
+        client.add_hook(timer)
+        client.add_hook(SlowCallbackLogger(threshold=0.0))
+
+        def slow(msg: DeviceLogMessage) -> None:
+            time.sleep(0.001)
+
+        client.on_device_log(slow)
+        with self.assertLogs("pymbrewclient.mqtt.hooks", level="WARNING") as captured:
+            self._deliver(client, _build_envelope(1))
+            self._deliver(client, _build_envelope(2))
+
+        self.assertIn("Slow on_device_log callback", captured.output[0])
+        (key, stats), *_ = timer.stats().items()
+        self.assertTrue(key.startswith("on_device_log:"))
+        self.assertIn("slow", key)
+        self.assertEqual(stats.calls, 2)
+        self.assertGreaterEqual(stats.max_seconds, 0.001)
+        timer.reset()
+        self.assertEqual(timer.stats(), {})
+
+
+# ---------------------------------------------------------------------------
+# Delivery policies
+# ---------------------------------------------------------------------------
+
+
+def _raw_log(device_uuid: str = "dev-1", seconds: float = 0.0) -> MqttMessage:
+    received_at = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=seconds)
+    return MqttMessage(
+        topic=f"devices/logs/{device_uuid}", payload=b"", received_at=received_at, device_uuid=device_uuid
+    )
+
+
+class TestDeliveryPolicies(unittest.TestCase):
+    def test_rate_limit_is_per_device(self) -> None:
+        policy = RateLimit(max_per_second=2)
+        offered = [policy.offer(_raw_log(seconds=t)) for t in (0.0, 0.1, 0.5, 0.6, 1.2)]
+        self.assertEqual(offered, [True, False, True, False, True])
+        self.assertTrue(policy.offer(_raw_log("dev-2", seconds=0.1)))
+
+    def test_sample_every_nth(self) -> None:
+        policy = Sample(every=3)
+        self.assertEqual([policy.offer(_raw_log()) for _ in range(7)], [True, False, False, True, False, False, True])
+
+    def test_invalid_arguments(self) -> None:
+        with self.assertRaises(ValueError):
+            RateLimit(0)
+        with self.assertRaises(ValueError):
+            Sample(0)
+        with self.assertRaises(ValueError):
+            Conflate(0)
+
+    def test_conflate_delivers_first_then_latest_per_window(self) -> None:
+        delivered: queue.Queue[MqttMessage] = queue.Queue()
+        policy = Conflate(window=0.05)
+        policy.bind(delivered.put)
+        try:
+            self.assertTrue(policy.offer(_raw_log(seconds=1)))
+            self.assertFalse(policy.offer(_raw_log(seconds=2)))
+            self.assertFalse(policy.offer(_raw_log(seconds=3)))
+            trailing = delivered.get(timeout=2)
+            self.assertEqual(trailing.received_at.second, 3)
+            # The trailing delivery opened a new window that closes empty.
+            time.sleep(0.15)
+            self.assertTrue(delivered.empty())
+            self.assertTrue(policy.offer(_raw_log(seconds=4)))
+        finally:
+            policy.close()
+
+
+class TestMqttClientDeliveryPolicies(unittest.TestCase):
+    def _make_client(self, **kwargs: object) -> MqttClient:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            return MqttClient(api_token="t", user_uuid="u", **kwargs)
+
+    def test_policy_limits_one_subscriber_only(self) -> None:
+        client = self._make_client()
+        every: list[DeviceLogMessage] = []
+        sampled: list[DeviceLogMessage] = []
+        client.on_device_log(every.append)
+        client.on_device_log(sampled.append, policy=Sample(every=2))
+
+        for sequence_number in range(1, 5):
+            client._handle_message(
+                "devices/logs/dev-1", _build_envelope(sequence_number), datetime.now(tz=timezone.utc)
+            )
+
+        self.assertEqual(len(every), 4)
+        self.assertEqual([m.sequence_number for m in sampled], [1, 3])
+
+    def test_rejected_messages_are_not_decoded(self) -> None:
+        client = self._make_client(track_shadow=False)
+        sampled: list[DeviceLogMessage] = []
+        client.on_device_log(sampled.append, policy=Sample(every=3))
+
+        with patch("pymbrewclient.mqtt.client.decode_device_log", wraps=decode_device_log) as mock_decode:
+            for sequence_number in range(1, 7):
+                client._handle_message(
+                    "devices/logs/dev-1", _build_envelope(sequence_number), datetime.now(tz=timezone.utc)
+                )
+
+        self.assertEqual(mock_decode.call_count, 2)
+        self.assertEqual(len(sampled), 2)
+        self.assertEqual(len(client.shadow), 0)
+
+    def test_conflated_queue_receives_trailing_message(self) -> None:
+        client = self._make_client()
+        policy = Conflate(window=0.05)
+        q = client.device_log_queue(policy=policy)
+        try:
+            for sequence_number in range(1, 4):
+                client._handle_message(
+                    "devices/logs/dev-1", _build_envelope(sequence_number), datetime.now(tz=timezone.utc)
+                )
+            self.assertEqual(q.get(timeout=2).sequence_number, 1)
+            self.assertEqual(q.get(timeout=2).sequence_number, 3)
+        finally:
+            policy.close()
+
+    def test_disconnect_closes_policies_and_reconnect_restarts_them(self) -> None:
+        client = self._make_client()
+        policy = Conflate(window=0.05)
+        q = client.device_log_queue(policy=policy)
+        now = datetime.now(tz=timezone.utc)
+        client._handle_message("devices/logs/dev-1", _build_envelope(1), now)
+        self.assertIsNotNone(policy._thread)
+
+        client.disconnect()
+        self.assertIsNone(policy._thread)
+
+        try:
+            client._handle_message("devices/logs/dev-1", _build_envelope(2), now)
+            client._handle_message("devices/logs/dev-1", _build_envelope(3), now)
+            self.assertEqual([q.get(timeout=2).sequence_number for _ in range(3)], [1, 2, 3])
+        finally:
+            client.disconnect()
+
+    def test_deferred_delivery_runs_hooks_and_records_metrics(self) -> None:
+        client = self._make_client(track_shadow=False)
+        policy = Conflate(window=0.05)
+        hook = MagicMock()
+        client.add_hook(hook)
+        q = client.device_log_queue(policy=policy)
+        try:
+            for sequence_number in range(1, 4):
+                client._handle_message(
+                    "devices/logs/dev-1", _build_envelope(sequence_number), datetime.now(tz=timezone.utc)
+                )
+            self.assertEqual(q.get(timeout=2).sequence_number, 1)
+            self.assertEqual(q.get(timeout=2).sequence_number, 3)
+        finally:
+            client.disconnect()
+
+        snapshot = client.metrics.snapshot()
+        # Three messages received, the trailing one delivered later by the policy.
+        self.assertEqual(snapshot.callback_time.count, 3 + 1)
+        self.assertEqual(snapshot.decode_time.count, 2)
+        self.assertEqual(hook.after_callback.call_count, 2)
+
+
+# ---------------------------------------------------------------------------
+# Filtered subscriptions
+# ---------------------------------------------------------------------------
+
+
+def _log(**fields: object) -> DeviceLogMessage:
+    msg = DeviceLogMessage(
+        topic="devices/logs/dev-1", payload=b"", received_at=datetime.now(tz=timezone.utc), device_uuid="dev-1"
+    )
+    for name, value in fields.items():
+        setattr(msg, name, value)
+    return msg
+
+
+class TestMessageFilters(unittest.TestCase):
+    def test_base_filter_is_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            MessageFilter()  # type: ignore[abstract]
+
+    def test_field_changed(self) -> None:
+        f = FieldChanged("process_state", SensorType.TEMP_LIQUID)
+        self.assertTrue(f.matches(_log(process_state=80), None))
+        self.assertFalse(f.matches(_log(process_state=80), _log(process_state=80)))
+        self.assertTrue(f.matches(_log(process_state=81), _log(process_state=80)))
+        self.assertTrue(
+            f.matches(
+                _log(process_state=80, measurements={SensorType.TEMP_LIQUID: 19.0}),
+                _log(process_state=80, measurements={SensorType.TEMP_LIQUID: 18.0}),
+            )
+        )
+        with self.assertRaises(ValueError):
+            FieldChanged()
+
+    def test_threshold_crossing(self) -> None:
+        both = Threshold("temp_control_power", 0.0)
+        rising = Threshold("temp_control_power", 0.0, direction="rising")
+        self.assertTrue(both.matches(_log(temp_control_power=5.0), _log(temp_control_power=-5.0)))
+        self.assertTrue(both.matches(_log(temp_control_power=-5.0), _log(temp_control_power=5.0)))
+        self.assertFalse(both.matches(_log(temp_control_power=6.0), _log(temp_control_power=5.0)))
+        self.assertFalse(both.matches(_log(temp_control_power=5.0), None))
+        self.assertFalse(both.matches(_log(temp_control_power=None), _log(temp_control_power=-5.0)))
+        self.assertFalse(rising.matches(_log(temp_control_power=-5.0), _log(temp_control_power=5.0)))
+        with self.assertRaises(ValueError):
+            Threshold("temp_control_power", 0.0, direction="sideways")
+
+    def test_combinators(self) -> None:
+        hot = Predicate(lambda msg: msg.current_temperature > 20)
+        changed = FieldChanged("process_state")
+        previous = _log(process_state=80, current_temperature=25.0)
+        self.assertTrue((hot & ~changed).matches(_log(process_state=80, current_temperature=25.0), previous))
+        self.assertFalse((hot & changed).matches(_log(process_state=80, current_temperature=25.0), previous))
+        self.assertTrue((hot | changed).matches(_log(process_state=81, current_temperature=15.0), previous))
+
+
+class TestMqttClientFilteredSubscriptions(unittest.TestCase):
+    def _make_client(self) -> MqttClient:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            return MqttClient(api_token="t", user_uuid="u", track_sequence=False)
+
+    def _deliver(self, client: MqttClient, **fields: object) -> None:
+        client._handle_message("devices/logs/dev-1", _build_device_log_payload(**fields), datetime.now(tz=timezone.utc))
+
+    def test_change_only_subscription(self) -> None:
+        client = self._make_client()
+        everything: list[DeviceLogMessage] = []
+        changes: list[DeviceLogMessage] = []
+        client.on_device_log(everything.append)
+        client.on_device_log(changes.append, where=FieldChanged("process_state"))
+
+        for state in (80, 80, 80, 81, 81):
+            self._deliver(client, process_state=state)
+
+        self.assertEqual(len(everything), 5)
+        self.assertEqual([m.process_state for m in changes], [80, 81])
+
+    def test_shared_filter_is_evaluated_once_per_message(self) -> None:
+        client = self._make_client()
+        calls: list[int] = []
+        hot = Predicate(lambda msg: calls.append(1) or msg.current_temperature > 20)
+        first: list[DeviceLogMessage] = []
+        second: list[DeviceLogMessage] = []
+        client.on_device_log(first.append, where=hot)
+        client.on_device_log(second.append, where=hot)
+
+        self._deliver(client, current_temperature=25.0)
+        self._deliver(client, current_temperature=15.0)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(first), 1)
+        self.assertIs(first[0], second[0])
+
+    def test_filter_then_policy(self) -> None:
+        client = self._make_client()
+        q = client.device_log_queue(where=Predicate(lambda msg: msg.current_temperature > 20), policy=Sample(every=2))
+
+        for temperature in (25.0, 15.0, 26.0, 27.0):
+            self._deliver(client, current_temperature=temperature)
+
+        self.assertEqual(q.qsize(), 2)
+        self.assertAlmostEqual(q.get_nowait().current_temperature, 25.0, places=4)
+        self.assertAlmostEqual(q.get_nowait().current_temperature, 27.0, places=4)
+
+    def test_failing_filter_and_decode_errors_do_not_match(self) -> None:
+        client = self._make_client()
+        got: list[DeviceLogMessage] = []
+        client.on_device_log(got.append, where=Predicate(lambda msg: 1 / 0))
+        client.on_device_log(got.append, where=FieldChanged("process_state"))
+
+        with self.assertLogs("pymbrewclient.mqtt.client", level="WARNING"):
+            self._deliver(client, process_state=80)
+        client._handle_message("devices/logs/dev-1", b"\xff", datetime.now(tz=timezone.utc))
+
+        self.assertEqual(len(got), 1)  # only FieldChanged on the first good message
+
+
+# ---------------------------------------------------------------------------
+# Time-series ring buffers
+# ---------------------------------------------------------------------------
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_window_matches_brute_force_across_wraparound(self) -> None:
+        rng = random.Random(7)
+        ring = RingBuffer(capacity=10)
+        points: list[tuple[float, float]] = []
+        timestamp = 0.0
+        for i in range(37):
+            timestamp += rng.choice([0.0, 0.5, 1.0, 2.0])
+            ring.append(timestamp, float(i))
+            points.append((timestamp, float(i)))
+            kept = points[-10:]
+            for since in (None, kept[0][0] - 1, kept[len(kept) // 2][0], timestamp, timestamp + 1):
+                expected = [p for p in kept if since is None or p[0] >= since]
+                timestamps, values = ring.to_lists(since=since)
+                self.assertEqual(list(zip(timestamps, values)), expected, (i, since))
+            self.assertEqual(ring.to_lists(last=3)[1], [p[1] for p in kept[-3:]])
+
+    def test_window_is_zero_copy(self) -> None:
+        ring = RingBuffer(capacity=4)
+        for i in range(6):
+            ring.append(float(i), float(i * 10))
+        segments = ring.window()
+        self.assertEqual(len(segments), 2)  # wrapped: slots 2..3 then 0..1
+        self.assertEqual([v for _, values in segments for v in values.tolist()], [20.0, 30.0, 40.0, 50.0])
+        self.assertIsInstance(segments[0][0], memoryview)
+        ring.append(6.0, 60.0)  # overwrites the oldest slot, visible through the view
+        self.assertEqual(segments[0][1][0], 60.0)
+
+    def test_buffers_grow_lazily_up_to_capacity(self) -> None:
+        ring = RingBuffer(capacity=100)
+        self.assertEqual(ring._ring.allocated, 16)
+        ring.append(0.0, 0.0)
+        before_growth = ring.window()
+        for i in range(1, 40):
+            ring.append(float(i), float(i))
+        self.assertEqual(ring._ring.allocated, 64)
+        self.assertEqual(ring.to_lists()[1], [float(i) for i in range(40)])
+        self.assertEqual(before_growth[0][1].tolist(), [0.0])  # still valid after the ring moved
+        for i in range(40, 250):
+            ring.append(float(i), float(i))
+        self.assertEqual(ring._ring.allocated, 100)
+        self.assertEqual(ring.to_lists()[1], [float(i) for i in range(150, 250)])
+
+    def test_idle_channels_do_not_allocate_full_capacity(self) -> None:
+        store = TimeSeriesStore()
+        for device in range(100):
+            store.update(_log(device_uuid=f"dev-{device}", current_temperature=20.0))
+        rings = [store.series(uuid, "current_temperature") for uuid in store.devices()]
+        allocated_bytes = sum(
+            column.buffer_info()[1] * column.itemsize for ring in rings for column in ring._ring.columns
+        )
+        self.assertLessEqual(allocated_bytes, 100 * 2 * 8 * 16)
+
+    def test_out_of_order_points_are_rejected(self) -> None:
+        ring = RingBuffer(capacity=4)
+        self.assertTrue(ring.append(2.0, 1.0))
+        self.assertFalse(ring.append(1.0, 1.0))
+        self.assertEqual(len(ring), 1)
+        self.assertEqual(ring.latest(), (2.0, 1.0))
+
+    def test_invalid_capacity(self) -> None:
+        with self.assertRaises(ValueError):
+            RingBuffer(capacity=0)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_to_numpy(self) -> None:
+        ring = RingBuffer(capacity=3)
+        for i in range(5):
+            ring.append(float(i), float(i))
+        timestamps, values = ring.to_numpy()
+        self.assertEqual(values.tolist(), [2.0, 3.0, 4.0])
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    def _msg(self, seconds: int, temperature: float, device_uuid: str = "dev-1") -> DeviceLogMessage:
+        msg = _log(
+            device_timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=seconds),
+            current_temperature=temperature,
+            measurements={SensorType.TEMP_LIQUID: temperature + 1},
+        )
+        msg.device_uuid = device_uuid
+        return msg
+
+    def test_records_measurements_and_fields_per_device(self) -> None:
+        store = TimeSeriesStore(capacity=100)
+        for second in range(0, 600, 60):
+            store.update(self._msg(second, 18.0 + second / 600))
+        store.update(self._msg(0, 5.0, device_uuid="dev-2"))
+
+        self.assertEqual(sorted(store.devices()), ["dev-1", "dev-2"])
+        self.assertIn(SensorType.TEMP_LIQUID, store.channels("dev-1"))
+        self.assertIn("current_temperature", store.channels("dev-1"))
+        last_five_minutes = store.window("dev-1", SensorType.TEMP_LIQUID, seconds=300)
+        values = [v for _, vs in last_five_minutes for v in vs.tolist()]
+        self.assertEqual(len(values), 6)
+        self.assertAlmostEqual(values[-1], 19.9)
+        self.assertEqual(store.window("dev-1", "missing"), [])
+
+        store.discard("dev-2")
+        self.assertEqual(store.devices(), ["dev-1"])
+
+    def test_channel_selection_and_decode_errors(self) -> None:
+        store = TimeSeriesStore(channels=[SensorType.TEMP_LIQUID])
+        store.update(self._msg(0, 18.0))
+        broken = self._msg(1, 18.0)
+        broken.decode_error = "bad"
+        store.update(broken)
+
+        self.assertEqual(store.channels("dev-1"), [SensorType.TEMP_LIQUID])
+        self.assertEqual(len(store.series("dev-1", SensorType.TEMP_LIQUID)), 1)
+
+    def test_attach(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u")
+        store = TimeSeriesStore()
+        store.attach(client)
+        client._handle_message(
+            "devices/logs/dev-1", _build_device_log_payload(current_temperature=17.5), datetime.now(tz=timezone.utc)
+        )
+        self.assertAlmostEqual(store.series("dev-1", "current_temperature").latest()[1], 17.5, places=4)
+
+
+# ---------------------------------------------------------------------------
+# Rollups
+# ---------------------------------------------------------------------------
+
+
+class TestRollupEngine(unittest.TestCase):
+    START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def _msg(self, seconds: float, value: float, phase: int | None = None) -> DeviceLogMessage:
+        return _log(
+            device_timestamp=self.START + timedelta(seconds=seconds),
+            measurements={SensorType.TEMP_LIQUID: value},
+            process_phase=phase,
+        )
+
+    def test_aggregates_match_brute_force(self) -> None:
+        rng = random.Random(3)
+        engine = RollupEngine(resolutions={1: 10_000, 60: 1000})
+        points = []
+        t = 0.0
+        for _ in range(2000):
+            t += rng.uniform(0.1, 2.0)
+            value = rng.uniform(10, 30)
+            points.append((self.START.timestamp() + t, value))
+            engine.update(self._msg(t, value))
+
+        minute = engine.window("dev-1", SensorType.TEMP_LIQUID, 60)
+        for i, start in enumerate(minute.start):
+            bucket = [v for ts, v in points if start <= ts < start + 60]
+            self.assertEqual(minute.count[i], len(bucket))
+            self.assertAlmostEqual(minute.min[i], min(bucket))
+            self.assertAlmostEqual(minute.max[i], max(bucket))
+            self.assertAlmostEqual(minute.mean[i], sum(bucket) / len(bucket))
+            self.assertAlmostEqual(minute.last[i], bucket[-1])
+        self.assertEqual(sum(minute.count), len(points))
+
+    def test_memory_grows_with_buckets_and_stays_bounded(self) -> None:
+        engine = RollupEngine()
+        for device in range(50):
+            engine.update(_log(device_uuid=f"idle-{device}", measurements={SensorType.TEMP_LIQUID: 20.0}))
+        for second in range(0, 3 * 3600, 2):
+            engine.update(self._msg(second, 20.0))
+
+        def allocated(device_uuid: str) -> dict[int, int]:
+            rollups = engine._rollups[device_uuid][SensorType.TEMP_LIQUID]
+            return {rollup.resolution: rollup.ring.allocated for rollup in rollups}
+
+        self.assertEqual(allocated("idle-0"), {1: 16, 60: 16, 3600: 16})
+        # Three hours of data: the one-second ring is full, 180 minute buckets, 3 hourly buckets.
+        busy = allocated("dev-1")
+        self.assertEqual(busy[1], 3600)
+        self.assertEqual(busy[60], 256)
+        self.assertEqual(busy[3600], 16)
+        for resolution, capacity in DEFAULT_RESOLUTIONS.items():
+            self.assertLessEqual(busy[resolution], capacity)
+
+    def test_oldest_buckets_are_evicted(self) -> None:
+        engine = RollupEngine(resolutions={1: 5})
+        for second in range(12):
+            engine.update(self._msg(second, float(second)))
+
+        window = engine.window("dev-1", SensorType.TEMP_LIQUID, 1)
+        self.assertEqual(window.last.tolist(), [7.0, 8.0, 9.0, 10.0, 11.0])
+        since = engine.window("dev-1", SensorType.TEMP_LIQUID, 1, since=self.START.timestamp() + 9.5)
+        self.assertEqual(since.last.tolist(), [9.0, 10.0, 11.0])
+
+    def test_late_point_updates_existing_bucket(self) -> None:
+        engine = RollupEngine(resolutions={60: 10})
+        engine.update(self._msg(10, 20.0))
+        engine.update(self._msg(70, 21.0))
+        engine.update(self._msg(20, 5.0))  # late, same bucket as the first point
+
+        window = engine.window("dev-1", SensorType.TEMP_LIQUID, 60)
+        self.assertEqual(window.min.tolist(), [5.0, 21.0])
+        self.assertEqual(window.last.tolist(), [20.0, 21.0])  # late points never replace "last"
+
+    def test_phase_filter_uses_last_reported_phase(self) -> None:
+        engine = RollupEngine(resolutions={1: 100}, phases=[ProcessPhase.FERM_PRIMARY])
+        engine.update(self._msg(0, 1.0, phase=ProcessPhase.BREW_BOILING))
+        engine.update(self._msg(1, 2.0, phase=ProcessPhase.FERM_PRIMARY))
+        engine.update(self._msg(2, 3.0))  # no phase: still primary fermentation
+        engine.update(self._msg(3, 4.0, phase=ProcessPhase.FERM_SECONDARY))
+
+        window = engine.window("dev-1", SensorType.TEMP_LIQUID, 1)
+        self.assertEqual(window.last.tolist(), [2.0, 3.0])
+
+    def test_unknown_resolution_and_missing_channel(self) -> None:
+        engine = RollupEngine()
+        self.assertIsNone(engine.window("dev-1", SensorType.TEMP_LIQUID, 60))
+        with self.assertRaises(ValueError):
+            engine.window("dev-1", SensorType.TEMP_LIQUID, 5)
+        with self.assertRaises(ValueError):
+            RollupEngine(resolutions={0: 10})
+
+
 if __name__ == "__main__":
     unittest.main()
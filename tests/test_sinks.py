@@ -0,0 +1,604 @@
+import gzip
+import importlib.util
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from pymbrewclient.mqtt.client import MqttClient
+from pymbrewclient.mqtt.enums import SensorType
+from pymbrewclient.mqtt.models import DeviceLogMessage, MqttMessage
+from pymbrewclient.mqtt.proto import decode_device_log, encode_device_log
+from pymbrewclient.mqtt.recording import MqttRecorder
+from pymbrewclient.sinks import (
+    InfluxSink,
+    ParquetSink,
+    PrometheusExporter,
+    SqliteSink,
+    export_recording,
+    format_line,
+)
+from pymbrewclient.sinks import prometheus
+from pymbrewclient.sinks._batching import _BatchingSink
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _decoded(sequence_number: int, device_uuid: str = "dev-1", temperature: float = 18.5) -> DeviceLogMessage:
+    timestamp = START + timedelta(seconds=sequence_number)
+    payload = encode_device_log(
+        sequence_number=sequence_number,
+        session_id=9,
+        timestamp_ms=int(timestamp.timestamp() * 1000),
+        current_state=1,
+        process_type=4,
+        process_state=80,
+        current_temperature=temperature,
+        target_temperature=18.0,
+        measurements={SensorType.TEMP_LIQUID: temperature},
+        process_phase=5,
+        machine_type=1,
+    )
+    raw = MqttMessage(
+        topic=f"devices/logs/{device_uuid}",
+        payload=payload,
+        received_at=timestamp + timedelta(milliseconds=250),
+        device_uuid=device_uuid,
+    )
+    return decode_device_log(raw)
+
+
+class _TempDirTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+
+# ---------------------------------------------------------------------------
+# SQLite sink
+# ---------------------------------------------------------------------------
+
+
+class TestSqliteSink(_TempDirTestCase):
+    def test_rows_are_written_in_batches(self) -> None:
+        db = self.dir / "telemetry.db"
+        with SqliteSink(db, batch_size=4, flush_interval=60) as sink:
+            for i in range(10):
+                sink.write(_decoded(i))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertEqual(sink.written, 10)
+
+        conn = sqlite3.connect(db)
+        rows = conn.execute(
+            "SELECT device_uuid, sequence_number, process_phase, current_temperature, measurements "
+            "FROM device_logs ORDER BY device_timestamp"
+        ).fetchall()
+        self.assertEqual(len(rows), 10)
+        device_uuid, sequence_number, phase, temperature, measurements = rows[3]
+        self.assertEqual((device_uuid, sequence_number, phase), ("dev-1", 3, 5))
+        self.assertAlmostEqual(temperature, 18.5, places=4)
+        self.assertAlmostEqual(json.loads(measurements)[str(int(SensorType.TEMP_LIQUID))], 18.5, places=4)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(device_logs)")]
+        self.assertIn("ix_device_logs_device_time", indexes)
+        conn.close()
+
+    def _spy_commits(self, sink: SqliteSink, gate: threading.Event | None = None) -> list[int]:
+        sizes: list[int] = []
+        commit = sink._commit
+
+        def spy(rows: list[tuple[object, ...]]) -> None:
+            if rows:
+                sizes.append(len(rows))
+                if gate is not None:
+                    gate.wait(5)
+            commit(rows)
+
+        sink._commit = spy
+        return sizes
+
+    def test_one_executemany_per_batch(self) -> None:
+        with SqliteSink(self.dir / "t.db", batch_size=5, flush_interval=60) as sink:
+            sizes = self._spy_commits(sink)
+            for i in range(12):
+                sink.write(_decoded(i))
+            sink.flush(timeout=5)
+        self.assertEqual(sizes, [5, 5, 2])
+
+    def test_flush_interval_commits_partial_batch(self) -> None:
+        with SqliteSink(self.dir / "t.db", batch_size=1000, flush_interval=0.05) as sink:
+            sink.write(_decoded(1))
+            deadline = time.monotonic() + 5
+            while sink.written == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(sink.written, 1)
+
+    def test_full_queue_drops_instead_of_blocking(self) -> None:
+        gate = threading.Event()
+        with SqliteSink(self.dir / "t.db", batch_size=1, max_queue=1) as sink:
+            self._spy_commits(sink, gate)
+            sink.write(_decoded(1))  # taken by the writer, which then stalls on the gate
+            deadline = time.monotonic() + 5
+            while not sink._queue.empty() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            sink.write(_decoded(2))  # fills the queue
+            sink.write(_decoded(3))  # dropped
+            gate.set()
+            sink.flush(timeout=5)
+            self.assertEqual((sink.written, sink.dropped), (2, 1))
+
+    def test_commit_errors_do_not_kill_the_writer(self) -> None:
+        with SqliteSink(self.dir / "t.db", batch_size=1, flush_interval=60) as sink:
+            commit = sink._commit
+            failures = [RuntimeError("boom")]
+
+            def flaky(rows: list[tuple[object, ...]]) -> None:
+                if failures:
+                    raise failures.pop()
+                commit(rows)
+
+            sink._commit = flaky
+            with self.assertLogs("pymbrewclient.sinks._batching", level="ERROR"):
+                sink.write(_decoded(1))
+                self.assertTrue(sink.flush(timeout=5))
+            sink.write(_decoded(2))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertEqual((sink.written, sink.dropped), (1, 1))
+
+    def test_flush_and_write_after_close(self) -> None:
+        sink = SqliteSink(self.dir / "t.db")
+        sink.close()
+        self.assertFalse(sink.flush())
+        sink.write(_decoded(1))
+        self.assertEqual(sink.dropped, 1)
+        sink.close()
+
+    def test_writes_racing_close_are_written_or_counted(self) -> None:
+        sink = SqliteSink(self.dir / "t.db", batch_size=7, flush_interval=60)
+        messages = [_decoded(i) for i in range(200)]
+        start = threading.Barrier(5)
+
+        def produce() -> None:
+            start.wait()
+            for msg in messages:
+                sink.write(msg)
+            sink.flush(timeout=5)
+
+        producers = [threading.Thread(target=produce) for _ in range(4)]
+        for thread in producers:
+            thread.start()
+        start.wait()
+        time.sleep(0.001)
+        sink.close()
+        for thread in producers:
+            thread.join(timeout=5)
+        self.assertFalse(any(thread.is_alive() for thread in producers))
+        self.assertEqual(sink.written + sink.dropped, 4 * len(messages))
+
+    def test_flush_times_out_on_a_full_queue(self) -> None:
+        gate = threading.Event()
+        with SqliteSink(self.dir / "t.db", batch_size=1, max_queue=1) as sink:
+            self._spy_commits(sink, gate)
+            sink.write(_decoded(1))
+            deadline = time.monotonic() + 5
+            while not sink._queue.empty() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            sink.write(_decoded(2))
+            self.assertFalse(sink.flush(timeout=0.05))
+            gate.set()
+
+    def test_batching_base_requires_row_and_commit(self) -> None:
+        class Incomplete(_BatchingSink[str]):
+            def _row(self, msg: DeviceLogMessage) -> str:
+                return ""
+
+        with self.assertRaises(TypeError):
+            Incomplete(1, 1.0, 1)  # type: ignore[abstract]
+
+    def test_skips_undecodable_messages(self) -> None:
+        broken = _decoded(1)
+        broken.decode_error = "bad"
+        with SqliteSink(self.dir / "t.db") as sink:
+            sink.write(broken)
+            sink.flush(timeout=5)
+            self.assertEqual(sink.written, 0)
+
+    def test_rejects_bad_table_name(self) -> None:
+        with self.assertRaises(ValueError):
+            SqliteSink(self.dir / "t.db", table="logs; DROP TABLE x")
+
+    def test_attach(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u")
+        with SqliteSink(self.dir / "t.db") as sink:
+            sink.attach(client)
+            client._handle_message("devices/logs/dev-1", _decoded(1).payload, datetime.now(tz=timezone.utc))
+            sink.flush(timeout=5)
+            self.assertEqual(sink.written, 1)
+
+
+# ---------------------------------------------------------------------------
+# Parquet sink
+# ---------------------------------------------------------------------------
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+class TestParquetSink(_TempDirTestCase):
+    def test_row_groups_are_bounded(self) -> None:
+        import pyarrow.parquet as pq
+
+        out = self.dir / "telemetry.parquet"
+        with ParquetSink(out, row_group_size=4, batch_size=3, flush_interval=60) as sink:
+            sizes = []
+            commit = sink._commit
+
+            def spy(rows: list[tuple[object, ...]]) -> None:
+                commit(rows)
+                sizes.append(sink.pending)
+
+            sink._commit = spy
+            for i in range(10):
+                sink.write(_decoded(i))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertTrue(all(size < 4 for size in sizes))
+            self.assertEqual((sink.written, sink.pending), (10, 0))
+        self.assertEqual((sink.written, sink.row_groups), (10, 3))
+
+        metadata = pq.ParquetFile(out).metadata
+        self.assertEqual(metadata.num_rows, 10)
+        self.assertEqual([metadata.row_group(i).num_rows for i in range(3)], [4, 4, 2])
+
+    def test_columns(self) -> None:
+        import pyarrow.parquet as pq
+
+        out = self.dir / "telemetry.parquet"
+        with ParquetSink(out) as sink:
+            sink.write(_decoded(3, temperature=64.25))
+        row = pq.read_table(out).to_pylist()[0]
+        self.assertEqual(row["device_uuid"], "dev-1")
+        self.assertEqual(row["device_timestamp"], START + timedelta(seconds=3))
+        self.assertEqual(row["received_at"], START + timedelta(seconds=3, milliseconds=250))
+        self.assertEqual((row["sequence_number"], row["session_id"], row["process_phase"]), (3, 9, 5))
+        self.assertAlmostEqual(row["current_temperature"], 64.25, places=4)
+        self.assertAlmostEqual(row["sensor_temp_liquid"], 64.25, places=4)
+        self.assertIsNone(row["sensor_pump_current"])
+
+    def test_export_recording(self) -> None:
+        import pyarrow.parquet as pq
+
+        archive = self.dir / "session.mqtt"
+        with MqttRecorder(archive) as recorder:
+            for i in range(5):
+                decoded = _decoded(i, device_uuid=f"dev-{i % 2}")
+                recorder.write(MqttMessage(decoded.topic, decoded.payload, decoded.received_at, decoded.device_uuid))
+            recorder.write(MqttMessage("devices/status/dev-1", b"{}", START, "dev-1"))
+            recorder.write(MqttMessage("devices/logs/dev-1", b"\xff\xff", START, "dev-1"))
+
+        out = self.dir / "session.parquet"
+        self.assertEqual(export_recording(archive, out, row_group_size=2), 5)
+        table = pq.read_table(out, columns=["device_uuid", "sequence_number"])
+        self.assertEqual(table.column("sequence_number").to_pylist(), [0, 1, 2, 3, 4])
+        self.assertEqual(table.column("device_uuid").to_pylist(), ["dev-0", "dev-1", "dev-0", "dev-1", "dev-0"])
+
+    def test_attach(self) -> None:
+        import pyarrow.parquet as pq
+
+        out = self.dir / "live.parquet"
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u")
+        with ParquetSink(out) as sink:
+            sink.attach(client)
+            decoded = _decoded(1)
+            client._handle_message(decoded.topic, decoded.payload, decoded.received_at)
+        self.assertEqual(pq.read_metadata(out).num_rows, 1)
+
+    def test_encoding_runs_on_the_writer_thread(self) -> None:
+        with ParquetSink(self.dir / "t.parquet", row_group_size=2, batch_size=2) as sink:
+            threads: list[str] = []
+            write_table = sink._file._writer.write_table
+
+            def spy(*args: object, **kwargs: object) -> None:
+                threads.append(threading.current_thread().name)
+                write_table(*args, **kwargs)
+
+            sink._file._writer.write_table = spy
+            sink.write(_decoded(1))
+            sink.write(_decoded(2))
+            self.assertTrue(sink.flush(timeout=5))
+        self.assertEqual(threads, ["parquet-sink"])
+
+    def test_failed_row_group_is_dropped_and_the_sink_recovers(self) -> None:
+        import pyarrow.parquet as pq
+
+        out = self.dir / "flaky.parquet"
+        with ParquetSink(out, row_group_size=2, batch_size=3, flush_interval=60) as sink:
+            write_table = sink._file._writer.write_table
+            failures = [OSError("disk full")]
+
+            def flaky(*args: object, **kwargs: object) -> None:
+                if failures:
+                    raise failures.pop()
+                write_table(*args, **kwargs)
+
+            sink._file._writer.write_table = flaky
+            with self.assertLogs("pymbrewclient.sinks._batching", level="ERROR"):
+                for i in range(3):
+                    sink.write(_decoded(i))
+                self.assertTrue(sink.flush(timeout=5))
+            # The first row group failed and the third row was never attempted.
+            self.assertEqual((sink.written, sink.dropped, sink.pending), (0, 3, 0))
+            for i in range(3, 6):
+                sink.write(_decoded(i))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertEqual((sink.written, sink.dropped), (3, 3))
+        table = pq.read_table(out, columns=["sequence_number"])
+        self.assertEqual(table.column("sequence_number").to_pylist(), [3, 4, 5])
+
+    def test_write_after_close_is_dropped(self) -> None:
+        sink = ParquetSink(self.dir / "closed.parquet")
+        sink.close()
+        self.assertTrue(sink.closed)
+        sink.write(_decoded(1))
+        self.assertEqual((sink.written, sink.dropped), (0, 1))
+
+
+class TestParquetSinkWithoutPyarrow(_TempDirTestCase):
+    def test_missing_pyarrow_raises_import_error(self) -> None:
+        with patch("pymbrewclient.sinks.parquet.pa", None):
+            with self.assertRaises(ImportError):
+                ParquetSink(self.dir / "x.parquet")
+
+
+# ---------------------------------------------------------------------------
+# InfluxDB line protocol
+# ---------------------------------------------------------------------------
+
+
+class _LineProtocolServer:
+    """A local HTTP stand-in that records line-protocol writes."""
+
+    def __init__(self, statuses: list[int] | None = None) -> None:
+        self.requests: list[tuple[str, dict[str, str], list[str]]] = []
+        self.statuses = list(statuses or [])
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                status = server.statuses.pop(0) if server.statuses else 204
+                if status == 204:
+                    server.requests.append((self.path, dict(self.headers), body.decode().split("\n")))
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/api/v2/write?bucket=b&precision=ns"
+        threading.Thread(target=self._httpd.serve_forever, args=(0.01,), daemon=True).start()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class TestFormatLine(unittest.TestCase):
+    def test_tags_fields_and_timestamp(self) -> None:
+        line = format_line(_decoded(2, temperature=64.5))
+        tags, fields, timestamp = line.split(" ")
+        self.assertEqual(tags, "minibrew,device_uuid=dev-1,machine_type=1,process_phase=5")
+        self.assertIn("current_temperature=64.5", fields.split(","))
+        self.assertIn("target_temperature=18.0", fields.split(","))
+        self.assertIn("temp_liquid=64.5", fields.split(","))
+        self.assertEqual(int(timestamp), int((START + timedelta(seconds=2)).timestamp()) * 1_000_000_000)
+
+    def test_escaping_and_unnamed_measurements(self) -> None:
+        msg = DeviceLogMessage(
+            topic="devices/logs/a b",
+            payload=b"",
+            received_at=START,
+            device_uuid="a b,c",
+            measurements={99: 1.5, int(SensorType.PUMP_CURRENT): float("nan")},
+        )
+        self.assertEqual(
+            format_line(msg, "my brew"), f"my\\ brew,device_uuid=a\\ b\\,c m99=1.5 {int(START.timestamp())}000000000"
+        )
+
+    def test_no_fields(self) -> None:
+        msg = DeviceLogMessage(topic="devices/logs/x", payload=b"", received_at=START, device_uuid="x")
+        self.assertIsNone(format_line(msg))
+
+
+class TestInfluxSink(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = _LineProtocolServer()
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def test_batches_are_gzipped_and_authorised(self) -> None:
+        with InfluxSink(self.server.url, token="influx-secret", batch_size=3, flush_interval=60) as sink:
+            for i in range(7):
+                sink.write(_decoded(i))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertEqual((sink.written, sink.dropped), (7, 0))
+
+        self.assertEqual([len(lines) for _, _, lines in self.server.requests], [3, 3, 1])
+        path, headers, lines = self.server.requests[0]
+        self.assertTrue(path.startswith("/api/v2/write?bucket=b"))
+        self.assertEqual(headers["Authorization"], "Token influx-secret")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertTrue(lines[0].startswith("minibrew,device_uuid=dev-1,"))
+
+    def test_flush_interval_sends_partial_batch(self) -> None:
+        with InfluxSink(self.server.url, compress=False, batch_size=100, flush_interval=0.05) as sink:
+            sink.write(_decoded(1))
+            deadline = time.monotonic() + 5
+            while not self.server.requests and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertNotIn("Content-Encoding", self.server.requests[0][1])
+
+    def test_retries_server_errors(self) -> None:
+        self.server.statuses = [503, 500]
+        with InfluxSink(self.server.url, batch_size=1, backoff_factor=0) as sink:
+            sink.write(_decoded(1))
+            self.assertTrue(sink.flush(timeout=5))
+            self.assertEqual((sink.written, sink.dropped), (1, 0))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_rejected_batch_is_dropped(self) -> None:
+        self.server.statuses = [400]
+        with self.assertLogs("pymbrewclient.sinks.influx", level="WARNING"):
+            with InfluxSink(self.server.url, batch_size=2, backoff_factor=0) as sink:
+                sink.write(_decoded(1))
+                sink.write(_decoded(2))
+                self.assertTrue(sink.flush(timeout=5))
+                self.assertEqual((sink.written, sink.dropped), (0, 2))
+
+
+# ---------------------------------------------------------------------------
+# Prometheus exporter
+# ---------------------------------------------------------------------------
+
+
+class TestPrometheusExporter(unittest.TestCase):
+    def test_render(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(1, temperature=64.5))
+        text = exporter.render()
+        self.assertIn("# TYPE minibrew_device_current_temperature_celsius gauge\n", text)
+        self.assertIn('minibrew_device_current_temperature_celsius{device_uuid="dev-1"} 64.5\n', text)
+        self.assertIn('minibrew_device_target_temperature_celsius{device_uuid="dev-1"} 18.0\n', text)
+        self.assertIn('minibrew_device_sensor_value{device_uuid="dev-1",sensor="temp_liquid"} 64.5\n', text)
+        self.assertIn('minibrew_device_process_state{device_uuid="dev-1"} 80\n', text)
+        # Never reported, so not exported.
+        self.assertNotIn("minibrew_device_seconds_until_next_action{", text)
+
+    def test_samples_are_grouped_by_metric(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(1, device_uuid="dev-1"))
+        exporter.update(_decoded(1, device_uuid="dev-2"))
+        lines = exporter.render().splitlines()
+        self.assertEqual(sum(line.startswith("# TYPE minibrew_device_process_state ") for line in lines), 1)
+        index = lines.index("# TYPE minibrew_device_process_state gauge")
+        self.assertEqual(
+            lines[index + 1 : index + 3],
+            [
+                'minibrew_device_process_state{device_uuid="dev-1"} 80',
+                'minibrew_device_process_state{device_uuid="dev-2"} 80',
+            ],
+        )
+
+    def test_only_changed_devices_are_reformatted(self) -> None:
+        exporter = PrometheusExporter()
+        for device in ("dev-1", "dev-2", "dev-3"):
+            exporter.update(_decoded(1, device_uuid=device))
+        first = exporter.render()
+
+        with patch("pymbrewclient.sinks.prometheus._device_fragments", wraps=prometheus._device_fragments) as fragments:
+            self.assertEqual(exporter.render(), first)
+            fragments.assert_not_called()
+
+            exporter.update(_decoded(2, device_uuid="dev-2", temperature=70.0))
+            second = exporter.render()
+            self.assertEqual(fragments.call_count, 1)
+            self.assertEqual(fragments.call_args.args[0].device_uuid, "dev-2")
+        self.assertIn('minibrew_device_current_temperature_celsius{device_uuid="dev-2"} 70.0\n', second)
+        self.assertIn('minibrew_device_current_temperature_celsius{device_uuid="dev-1"} 18.5\n', second)
+
+    def test_late_message_does_not_roll_back(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(5, temperature=60.0))
+        exporter.update(_decoded(4, temperature=10.0))
+        self.assertIn('minibrew_device_current_temperature_celsius{device_uuid="dev-1"} 60.0\n', exporter.render())
+
+    def test_discard(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(1, device_uuid="dev-1"))
+        exporter.update(_decoded(1, device_uuid="dev-2"))
+        exporter.render()
+        exporter.discard("dev-1")
+        text = exporter.render()
+        self.assertNotIn('device_uuid="dev-1"', text)
+        self.assertIn('device_uuid="dev-2"', text)
+
+    def test_seconds_until_next_action_counts_down(self) -> None:
+        now = [START]
+        exporter = PrometheusExporter(clock=lambda: now[0])
+        msg = _decoded(0)
+        msg.seconds_until_next_action = 600
+        msg.next_action_at = msg.device_timestamp + timedelta(seconds=600)
+        exporter.update(msg)
+
+        self.assertIn('minibrew_device_seconds_until_next_action{device_uuid="dev-1"} 600\n', exporter.render())
+        now[0] = START + timedelta(seconds=90)
+        self.assertIn('minibrew_device_seconds_until_next_action{device_uuid="dev-1"} 510\n', exporter.render())
+        now[0] = START + timedelta(hours=1)
+        self.assertIn('minibrew_device_seconds_until_next_action{device_uuid="dev-1"} 0\n', exporter.render())
+
+    def test_attach_reads_the_client_shadow(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u")
+        exporter = PrometheusExporter()
+        exporter.attach(client)
+        self.assertEqual(client._on_device_log_callbacks, [])
+
+        decoded = _decoded(1, temperature=21.5)
+        client._handle_message(decoded.topic, decoded.payload, decoded.received_at)
+        self.assertIn('minibrew_device_current_temperature_celsius{device_uuid="dev-1"} 21.5\n', exporter.render())
+        self.assertEqual(len(exporter._own), 0)
+
+    def test_attach_without_client_shadow_subscribes(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u", track_shadow=False)
+        exporter = PrometheusExporter()
+        exporter.attach(client)
+        decoded = _decoded(1)
+        client._handle_message(decoded.topic, decoded.payload, decoded.received_at)
+        self.assertIn('device_uuid="dev-1"', exporter.render())
+
+    def test_discarded_device_returns_when_it_reports_again(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(1))
+        exporter.discard("dev-1")
+        self.assertEqual(exporter.render(), "")
+        exporter.update(_decoded(2))
+        self.assertIn('device_uuid="dev-1"', exporter.render())
+
+    def test_label_escaping(self) -> None:
+        exporter = PrometheusExporter()
+        exporter.update(_decoded(1, device_uuid='odd"uuid\\'))
+        self.assertIn('device_uuid="odd\\"uuid\\\\"', exporter.render())
+
+    def test_serve(self) -> None:
+        with patch("pymbrewclient.mqtt.client._paho.Client"):
+            client = MqttClient(api_token="t", user_uuid="u")
+        exporter = PrometheusExporter()
+        exporter.attach(client)
+        decoded = _decoded(1)
+        client._handle_message(decoded.topic, decoded.payload, decoded.received_at)
+
+        with exporter.serve() as server:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+                body = response.read().decode()
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('minibrew_device_process_state{device_uuid="dev-1"} 80\n', body)
+
+
+if __name__ == "__main__":
+    unittest.main()